@@ -0,0 +1,203 @@
+#!/usr/bin/python3
+
+
+"""
+End-to-end load test of a crawl. Runs the full crawl and download path against
+a local FakeServer, and reports files and bytes downloaded per second, and
+time spent sleeping for politeness. Run it from the repository root:
+
+python3 -m benchmarks.bench_crawl
+python3 -m benchmarks.bench_crawl --pages 8 --workers 8 --latency 0.1
+python3 -m benchmarks.bench_crawl --error-rate 0.05 --stall-rate 0.02 --read-timeout 1
+python3 -m benchmarks.bench_crawl --backend json --burst 100
+python3 -m benchmarks.bench_crawl --formats gif,mp4 --smallest-format
+
+The browser backend gets listing pages over HTTP instead of from PhantomJS,
+see HttpDriver. Sleeping is summed over all threads, so it can be longer than
+the crawl.
+"""
+
+
+import os
+import shutil
+import tempfile
+import threading
+from argparse import ArgumentParser
+from time import perf_counter
+from time import sleep
+from selenium.common.exceptions import NoSuchElementException
+from benchmarks.fakesite import FakeServer
+from benchmarks.fakesite import FakeSite
+from domainparsers import reddit as reddit_module
+from domainparsers.formats import FormatPolicy
+from domainparsers.formats import parse_preference
+from domainparsers.reddit import Reddit
+from domainparsers.reddit_json import RedditJson
+from utils import downloader as downloader_module
+from utils import politeness as politeness_module
+from utils.downloader import Downloader
+from utils.httpclient import default_client
+from utils.politeness import DomainBudgets
+
+
+__author__ = 'petarGitNik'
+__copyright__ = 'Copyright (c) 2017 petarGitNik petargitnik@gmail.com'
+__version__ = 'v0.1.0'
+__license__ = 'MIT'
+__email__ = 'petargitnik@gmail.com'
+__status__ = 'Development'
+
+
+SUBREDDIT = 'https://www.reddit.com/r/fake/'
+
+# Files the downloader keeps next to downloaded media
+BOOKKEEPING = ('db.sqlite', 'failures.jsonl', 'cache.sqlite', 'queue.sqlite')
+
+
+class HttpDriver(object):
+    """
+    Stand-in for a selenium driver, which gets pages with the shared HTTP
+    client instead of rendering them. Pages of a FakeSite need no rendering.
+    """
+
+    def __init__(self):
+        self.page_source = ''
+
+    def get(self, url):
+        with default_client.open(url, compressed=True) as r:
+            self.page_source = r.read().decode('utf-8')
+
+    def find_element_by_xpath(self, xpath):
+        raise NoSuchElementException(xpath)
+
+    def close(self):
+        pass
+
+    def quit(self):
+        pass
+
+
+class SleepMeter(object):
+    """
+    Measures time slept by the crawler and the downloader. Install() replaces
+    sleep in their modules, and uninstall() restores it.
+    """
+    MODULES = (reddit_module, downloader_module, politeness_module)
+
+    def __init__(self):
+        self.slept = 0
+        self.lock = threading.Lock()
+
+    def sleep(self, seconds):
+        start = perf_counter()
+        sleep(seconds)
+        with self.lock:
+            self.slept += perf_counter() - start
+
+    def install(self):
+        for module in self.MODULES:
+            module.sleep = self.sleep
+
+    def uninstall(self):
+        for module in self.MODULES:
+            module.sleep = sleep
+
+
+def media_files(directory):
+    """
+    Return the number and total size of downloaded media files.
+    """
+    files, size = 0, 0
+    for entry in os.scandir(directory):
+        if entry.is_file() and entry.name not in BOOKKEEPING and not entry.name.endswith('.part'):
+            files += 1
+            size += entry.stat().st_size
+    return (files, size)
+
+
+def run_crawl(args, destination):
+    """
+    Crawl the fake subreddit, and download its media to destination. Return
+    seconds taken by the crawl.
+    """
+    budgets = DomainBudgets(burst=args.burst)
+    formats = FormatPolicy(args.formats, smallest=args.smallest_format)
+    if args.backend == 'json':
+        reddit = RedditJson(SUBREDDIT, args.pages, budgets=budgets, formats=formats)
+    else:
+        reddit = Reddit(SUBREDDIT, args.pages, budgets=budgets, driver=HttpDriver(),
+                        formats=formats)
+
+    downloader = Downloader(reddit, destination, workers=args.workers,
+                            domain_limit=args.domain_limit, budgets=budgets)
+    start = perf_counter()
+    downloader.download_stream(reddit.iter_posts())
+    return perf_counter() - start
+
+
+def parse_arguments():
+    parser = ArgumentParser(description='end-to-end crawl load test')
+    parser.add_argument('-p', '--pages', help='crawl P listing pages', type=int,
+                        default=2)
+    parser.add_argument('-b', '--backend', choices=['browser', 'json'],
+                        default='browser')
+    parser.add_argument('-w', '--workers', help='download W files at the same time',
+                        type=int, default=4)
+    parser.add_argument('--domain-limit', help='files from a domain at the same time',
+                        type=int, default=1)
+    parser.add_argument('--burst', help='requests a host gets without waiting '
+                                        '(default: 1, as in a real crawl)',
+                        type=int, default=1)
+    parser.add_argument('--formats', help='formats of animations, in order of '
+                                          'preference (default: webm,mp4,gif)',
+                        type=parse_preference)
+    parser.add_argument('--smallest-format', help='download the smallest rendition '
+                                                  'of every animation',
+                        action='store_true')
+    parser.add_argument('--latency', help='seconds before every response',
+                        type=float, default=0.05)
+    parser.add_argument('--bandwidth', help='KiB/s of every response (default: unlimited)',
+                        type=float)
+    parser.add_argument('--error-rate', help='share of 429 and 5xx responses',
+                        type=float, default=0)
+    parser.add_argument('--stall-rate', help='share of responses which stall halfway',
+                        type=float, default=0)
+    parser.add_argument('--stall-time', help='seconds a stalled response hangs',
+                        type=float, default=5)
+    parser.add_argument('--read-timeout', help='seconds the client waits for data',
+                        type=float, default=30)
+    parser.add_argument('--seed', help='seed of the site and of faults', type=int,
+                        default=0)
+    return parser.parse_args()
+
+
+if __name__ == '__main__':
+    args = parse_arguments()
+
+    server = FakeServer(
+        FakeSite(pages=args.pages, seed=args.seed), latency=args.latency,
+        bandwidth=args.bandwidth * 1024 if args.bandwidth else None,
+        error_rate=args.error_rate, stall_rate=args.stall_rate,
+        stall_time=args.stall_time, seed=args.seed,
+    )
+    server.start()
+    default_client.hosts.update(server.hosts())
+    default_client.read_timeout = args.read_timeout
+
+    meter = SleepMeter()
+    meter.install()
+    destination = tempfile.mkdtemp(prefix='crawlddit-')
+    try:
+        elapsed = run_crawl(args, destination)
+        files, size = media_files(destination)
+    finally:
+        meter.uninstall()
+        shutil.rmtree(destination)
+        default_client.close()
+        server.stop()
+
+    stats = server.stats()
+    print('{} files, {:.1f} MiB in {:.1f} s'.format(files, size / 2**20, elapsed))
+    print('{:.2f} files/sec, {:.1f} KiB/sec'.format(files / elapsed, size / 1024 / elapsed))
+    print('{:.1f} s spent sleeping'.format(meter.slept))
+    print('{requests} requests, {errors} errors and {stalls} stalls injected'.format(**stats))
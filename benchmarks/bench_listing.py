@@ -0,0 +1,149 @@
+#!/usr/bin/python3
+
+
+"""
+Benchmark of listing page extraction. Compares Reddit.get_files_from_a_page()
+with the BeautifulSoup based extraction it replaced, on a saved listing page.
+Run it from the repository root:
+
+python3 -m benchmarks.bench_listing
+python3 -m benchmarks.bench_listing --repeat 200 path/to/listing.html
+"""
+
+
+import os
+import re
+from argparse import ArgumentParser
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from resource import getrusage
+from resource import RUSAGE_SELF
+from time import perf_counter
+from bs4 import BeautifulSoup
+from domainparsers.reddit import Reddit
+
+
+__author__ = 'petarGitNik'
+__copyright__ = 'Copyright (c) 2017 petarGitNik petargitnik@gmail.com'
+__version__ = 'v0.1.0'
+__license__ = 'MIT'
+__email__ = 'petargitnik@gmail.com'
+__status__ = 'Development'
+
+
+FIXTURES = os.path.join(os.path.dirname(__file__), 'fixtures')
+URL = 'https://www.reddit.com/r/MemeEconomy/'
+
+
+class SoupReddit(Reddit):
+    """
+    Reddit with the BeautifulSoup based extraction, kept as a baseline.
+    """
+
+    def get_files_from_a_page(self, html, url=None):
+        soup = BeautifulSoup(html, 'lxml')
+        # Newer BeautifulSoup matches the regex only against single classes,
+        # so it is matched against the whole class attribute explicitly
+        things = soup.find_all(lambda tag: tag.name == 'div' and re.search(
+            r'\sthing\sid-t3.+', ' '.join([''] + tag.get('class', []))
+        ))
+        images = deque(self.post_dictionary(
+                url=self.get_post_url(div),
+                domain=self.get_post_domain(div),
+                post_title=self.get_post_title(div),
+                posted_on=self.get_post_timestamp(div),
+                link_to_comments=self.get_link_to_comments(div),
+                on_page=url,
+            ) for div in things
+        )
+
+        next_page_span = soup.find('span', attrs={'class' : 'next-button'})
+        next_page = next_page_span.a['href'] if next_page_span else None
+
+        return (images, next_page)
+
+    def get_link_to_comments(self, div):
+        li = div.find('li', attrs={'class' : 'first'})
+        return li.a['href']
+
+    def get_post_timestamp(self, div):
+        time = div.find('time')
+        return time['datetime'] if time.has_attr('datetime') else None
+
+    def get_p_title_tag(self, div):
+        return div.find('p', attrs={'class' : 'title'})
+
+    def get_post_url(self, div):
+        p = self.get_p_title_tag(div)
+        return p.a['href']
+
+    def get_post_domain(self, div):
+        p = self.get_p_title_tag(div)
+        span = p.find('span', attrs={'class' : 'domain'})
+        return span.a.string
+
+    def get_post_title(self, div):
+        return self.get_p_title_tag(div).a.string
+
+
+EXTRACTORS = {
+    'beautifulsoup' : SoupReddit,
+    'lxml' : Reddit,
+}
+
+
+def measure_speed(name, html, repeat):
+    """
+    Return posts extracted per second.
+    """
+    reddit = EXTRACTORS[name](URL, None)
+    posts, _ = reddit.get_files_from_a_page(html, URL)
+
+    start = perf_counter()
+    for _ in range(repeat):
+        reddit.get_files_from_a_page(html, URL)
+    elapsed = perf_counter() - start
+
+    return len(posts) * repeat / elapsed
+
+
+def measure_memory(name, html):
+    """
+    Return peak memory in KiB of a single extraction. Runs in a fresh process,
+    so memory allocated by lxml and libxml2 is counted as well.
+    """
+    reddit = EXTRACTORS[name](URL, None)
+    before = getrusage(RUSAGE_SELF).ru_maxrss
+    reddit.get_files_from_a_page(html, URL)
+    return getrusage(RUSAGE_SELF).ru_maxrss - before
+
+
+def parse_arguments():
+    parser = ArgumentParser(description='listing page extraction benchmark')
+    parser.add_argument('-r', '--repeat', help='extract the page R times',
+                        type=int, default=50)
+    parser.add_argument('page', help='saved listing page', nargs='?',
+                        default=os.path.join(FIXTURES, 'listing.html'))
+    return parser.parse_args()
+
+
+if __name__ == '__main__':
+    args = parse_arguments()
+    with open(args.page) as f:
+        html = f.read()
+
+    results = {}
+    for name in EXTRACTORS:
+        with ProcessPoolExecutor(max_workers=1) as pool:
+            peak = pool.submit(measure_memory, name, html).result()
+        results[name] = (measure_speed(name, html, args.repeat), peak)
+
+    print('{:<15}{:>15}{:>18}'.format('extractor', 'posts/sec', 'peak memory KiB'))
+    for name, (speed, peak) in results.items():
+        print('{:<15}{:>15.0f}{:>18}'.format(name, speed, peak))
+
+    old_speed, old_peak = results['beautifulsoup']
+    new_speed, new_peak = results['lxml']
+    print('speedup: {:.1f}x, peak memory: {} KiB less'.format(
+        new_speed / old_speed, old_peak - new_peak
+    ))
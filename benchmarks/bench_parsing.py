@@ -0,0 +1,81 @@
+#!/usr/bin/python3
+
+
+"""
+Benchmark of listing page parsing from many threads at the same time, as
+pages are parsed when they are fetched concurrently. Compares parsing in the
+fetching threads with parsing in a ProcessParser. Run it from the repository
+root:
+
+python3 -m benchmarks.bench_parsing
+python3 -m benchmarks.bench_parsing --threads 8 --processes 8 --pages 400
+"""
+
+
+import os
+from argparse import ArgumentParser
+from concurrent.futures import ThreadPoolExecutor
+from time import perf_counter
+from domainparsers.parsing import InlineParser
+from domainparsers.parsing import ProcessParser
+
+
+__author__ = 'petarGitNik'
+__copyright__ = 'Copyright (c) 2017 petarGitNik petargitnik@gmail.com'
+__version__ = 'v0.1.0'
+__license__ = 'MIT'
+__email__ = 'petargitnik@gmail.com'
+__status__ = 'Development'
+
+
+FIXTURES = os.path.join(os.path.dirname(__file__), 'fixtures')
+
+
+def measure_speed(parser, html, pages, threads):
+    """
+    Return pages parsed per second, when pages are parsed by threads at the
+    same time.
+    """
+    parser.extract_posts(html)
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        start = perf_counter()
+        for _ in pool.map(parser.extract_posts, [html] * pages):
+            pass
+        elapsed = perf_counter() - start
+    return pages / elapsed
+
+
+def parse_arguments():
+    parser = ArgumentParser(description='concurrent page parsing benchmark')
+    parser.add_argument('-n', '--pages', help='parse N pages', type=int,
+                        default=200)
+    parser.add_argument('-t', '--threads', help='parse from T threads',
+                        type=int, default=os.cpu_count())
+    parser.add_argument('-p', '--processes', help='size of the process pool',
+                        type=int, default=os.cpu_count())
+    parser.add_argument('page', help='saved listing page', nargs='?',
+                        default=os.path.join(FIXTURES, 'listing.html'))
+    return parser.parse_args()
+
+
+if __name__ == '__main__':
+    args = parse_arguments()
+    with open(args.page) as f:
+        html = f.read()
+
+    process_parser = ProcessParser(args.processes)
+    try:
+        results = {
+            'threads' : measure_speed(InlineParser(), html, args.pages, args.threads),
+            'processes' : measure_speed(process_parser, html, args.pages, args.threads),
+        }
+    finally:
+        process_parser.close()
+
+    print('{:<15}{:>15}'.format('parser', 'pages/sec'))
+    for name, speed in results.items():
+        print('{:<15}{:>15.1f}'.format(name, speed))
+
+    print('{} threads, {} processes: {:.1f}x'.format(
+        args.threads, args.processes, results['processes'] / results['threads']
+    ))
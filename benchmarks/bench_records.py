@@ -0,0 +1,98 @@
+#!/usr/bin/python3
+
+
+"""
+Benchmark of memory taken by crawled posts. Compares Post and MediaItem records
+with the dictionaries they replaced. Field values are shared by both kinds of
+posts, so only the containers are measured. Run it from the repository root:
+
+python3 -m benchmarks.bench_records
+python3 -m benchmarks.bench_records --posts 500000
+"""
+
+
+import tracemalloc
+from argparse import ArgumentParser
+from collections import deque
+from domainparsers.records import MediaItem
+from domainparsers.records import Post
+
+
+__author__ = 'petarGitNik'
+__copyright__ = 'Copyright (c) 2017 petarGitNik petargitnik@gmail.com'
+__version__ = 'v0.1.0'
+__license__ = 'MIT'
+__email__ = 'petargitnik@gmail.com'
+__status__ = 'Development'
+
+
+def make_fields(number):
+    """
+    Return field values of a post, in order of Post.__slots__.
+    """
+    url = 'https://i.imgur.com/{:07d}.jpg'.format(number)
+    return (
+        url,
+        (url, '{:07d}.jpg'.format(number)),
+        'i.imgur.com',
+        'reddit',
+        'Post {}'.format(number),
+        '2017-08-01T12:00:00+00:00',
+        'https://www.reddit.com/r/MemeEconomy/comments/{}/'.format(number),
+        'https://www.reddit.com/r/MemeEconomy/',
+        None,
+        0,
+    )
+
+
+def make_dictionary(fields):
+    post = dict(zip(Post.__slots__, fields))
+    post['image'] = dict(zip(MediaItem.__slots__, fields[1]))
+    return post
+
+
+def make_record(fields):
+    return Post(fields[0], MediaItem(*fields[1]), *fields[2:])
+
+
+POST_TYPES = {
+    'dict' : make_dictionary,
+    'Post' : make_record,
+}
+
+
+def measure_memory(make_post, fields):
+    """
+    Return bytes allocated by a deque of posts built from fields.
+    """
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    posts = deque(make_post(values) for values in fields)
+    allocated = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+
+    del posts
+    return allocated
+
+
+def parse_arguments():
+    parser = ArgumentParser(description='crawled posts memory benchmark')
+    parser.add_argument('-n', '--posts', help='build N posts', type=int,
+                        default=100000)
+    return parser.parse_args()
+
+
+if __name__ == '__main__':
+    args = parse_arguments()
+    fields = [make_fields(number) for number in range(args.posts)]
+
+    results = {name : measure_memory(make_post, fields)
+               for name, make_post in POST_TYPES.items()}
+
+    print('{:<10}{:>15}{:>15}'.format('post', 'total MiB', 'bytes/post'))
+    for name, allocated in results.items():
+        print('{:<10}{:>15.1f}{:>15.0f}'.format(
+            name, allocated / 2**20, allocated / args.posts
+        ))
+
+    print('records take {:.1f}x less memory'.format(results['dict'] / results['Post']))
@@ -0,0 +1,230 @@
+#!/usr/bin/python3
+
+
+"""
+Offline micro-benchmarks of parsers and url classification. Fetched pages are
+served from saved fixtures instead of the network, so results depend only on
+the code and on the machine. Every case reports operations per second and
+bytes allocated per operation. Run it from the repository root:
+
+python3 -m benchmarks.bench_suite
+python3 -m benchmarks.bench_suite --save baseline.json
+python3 -m benchmarks.bench_suite --baseline baseline.json --max-regression 10
+python3 -m benchmarks.bench_suite listing imgur_album
+
+With --baseline, the suite exits with status 1 if the throughput of any case
+dropped by more than --max-regression percent. Baselines are only comparable
+on the same machine.
+"""
+
+
+import json
+import os
+import sys
+import tracemalloc
+from argparse import ArgumentParser
+from contextlib import contextmanager
+from statistics import median
+from time import perf_counter
+from domainparsers.gfycat import Gfycat
+from domainparsers.imgur import Imgur
+from domainparsers.listing import extract_posts
+from domainparsers.reddit import Reddit
+from utils.httpclient import default_client
+
+
+__author__ = 'petarGitNik'
+__copyright__ = 'Copyright (c) 2017 petarGitNik petargitnik@gmail.com'
+__version__ = 'v0.1.0'
+__license__ = 'MIT'
+__email__ = 'petargitnik@gmail.com'
+__status__ = 'Development'
+
+
+FIXTURES = os.path.join(os.path.dirname(__file__), 'fixtures')
+LISTING_URL = 'https://www.reddit.com/r/MemeEconomy/'
+ALBUM_URL = 'http://imgur.com/a/vTTHZ?grid'
+GFYCAT_URL = 'https://gfycat.com/ImpressiveGoodnaturedAmazonparrot'
+
+
+def read_fixture(name):
+    with open(os.path.join(FIXTURES, name)) as f:
+        return f.read()
+
+
+class FixtureResponse(object):
+    """
+    Response with a saved page, in place of an HttpResponse.
+    """
+
+    def __init__(self, body):
+        self.body = body
+        self.status = 200
+
+    def read(self):
+        return self.body
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        pass
+
+
+@contextmanager
+def offline(pages):
+    """
+    Serve pages, a dictionary from url to page body, instead of requesting
+    them with the shared HTTP client.
+    """
+    default_client.open = lambda url, *args, **kwargs: FixtureResponse(pages[url])
+    try:
+        yield
+    finally:
+        del default_client.open
+
+
+class Case(object):
+    """
+    A benchmarked function, and the number of operations done by one call.
+    """
+
+    def __init__(self, function, operations=1):
+        self.function = function
+        self.operations = operations
+
+
+def make_cases():
+    """
+    Return a dictionary of benchmark cases. Url classification is measured
+    on urls of posts from the saved listing page.
+    """
+    listing = read_fixture('listing.html')
+    reddit = Reddit(LISTING_URL, None)
+    urls = [post[0] for post in extract_posts(listing)[0]]
+    image_urls = [url for url in urls if reddit.known_file_format(url)]
+
+    def classify(method, urls):
+        def run():
+            for url in urls:
+                method(url)
+        return Case(run, len(urls))
+
+    return {
+        'listing' : Case(lambda: reddit.get_files_from_a_page(listing, LISTING_URL)),
+        'imgur_album' : Case(lambda: Imgur(ALBUM_URL).parse_and_prepare_images(ALBUM_URL)),
+        'gfycat' : Case(lambda: Gfycat(GFYCAT_URL).parse_gfycat()),
+        'known_domain' : classify(reddit.known_domain, urls),
+        'known_file_format' : classify(reddit.known_file_format, urls),
+        'get_image_filename' : classify(reddit.get_image_filename, image_urls),
+    }
+
+
+def measure_speed(case, rounds, min_time):
+    """
+    Return the median of operations per second over rounds. Each round calls
+    the function enough times to take at least min_time seconds.
+    """
+    calls = 1
+    while True:
+        start = perf_counter()
+        for _ in range(calls):
+            case.function()
+        if perf_counter() - start >= min_time:
+            break
+        calls *= 2
+
+    speeds = []
+    for _ in range(rounds):
+        start = perf_counter()
+        for _ in range(calls):
+            case.function()
+        speeds.append(calls * case.operations / (perf_counter() - start))
+    return median(speeds)
+
+
+def measure_memory(case):
+    """
+    Return peak bytes allocated per operation by a single call.
+    """
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    case.function()
+    peak = tracemalloc.get_traced_memory()[1] - before
+    tracemalloc.stop()
+    return peak / case.operations
+
+
+def regressions(results, baseline, max_regression):
+    """
+    Return (name, drop) of cases whose operations per second dropped by more
+    than max_regression percent from the baseline. Cases missing from the
+    baseline are not compared.
+    """
+    slower = []
+    for name, result in results.items():
+        if name not in baseline:
+            continue
+        drop = 100 * (1 - result['ops_per_sec'] / baseline[name]['ops_per_sec'])
+        if drop > max_regression:
+            slower.append((name, drop))
+    return slower
+
+
+def parse_arguments(names):
+    parser = ArgumentParser(description='offline parser micro-benchmarks')
+    parser.add_argument('cases', help='run only these cases, one of: {}'.format(
+                            ', '.join(sorted(names))), nargs='*')
+    parser.add_argument('-r', '--rounds', help='measure R rounds of each case',
+                        type=int, default=5)
+    parser.add_argument('--min-time', help='seconds taken by a round',
+                        type=float, default=0.2)
+    parser.add_argument('--save', help='save results to a baseline FILE',
+                        metavar='FILE')
+    parser.add_argument('--baseline', help='compare results with a baseline FILE',
+                        metavar='FILE')
+    parser.add_argument('--max-regression',
+                        help='fail if throughput dropped by more than P percent '
+                             '(default: 10)',
+                        type=float, default=10, metavar='P')
+
+    args = parser.parse_args()
+    unknown = set(args.cases) - set(names)
+    if unknown:
+        parser.error('unknown cases: {}'.format(', '.join(sorted(unknown))))
+    return args
+
+
+if __name__ == '__main__':
+    cases = make_cases()
+    args = parse_arguments(cases)
+    pages = {
+        ALBUM_URL : read_fixture('imgur_album.html').encode(),
+        GFYCAT_URL : read_fixture('gfycat.html').encode(),
+    }
+
+    results = {}
+    with offline(pages):
+        for name in args.cases or sorted(cases):
+            results[name] = {
+                'ops_per_sec' : measure_speed(cases[name], args.rounds, args.min_time),
+                'bytes_per_op' : measure_memory(cases[name]),
+            }
+
+    print('{:<22}{:>15}{:>15}'.format('case', 'ops/sec', 'bytes/op'))
+    for name, result in results.items():
+        print('{:<22}{ops_per_sec:>15.0f}{bytes_per_op:>15.0f}'.format(name, **result))
+
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        slower = regressions(results, baseline, args.max_regression)
+        for name, drop in slower:
+            print('REGRESSION: {} is {:.1f}% slower than the baseline'.format(name, drop))
+        if slower:
+            sys.exit(1)
+        print('no case is more than {:.0f}% slower than the baseline'.format(args.max_regression))
@@ -0,0 +1,423 @@
+#!/usr/bin/python3
+
+
+"""
+Local stand-in for reddit, imgur and gfycat, used to run a full crawl without
+touching the live sites. FakeSite is a synthetic subreddit: listing pages (as
+rendered HTML with a next-button, and in JSON format), imgur image and album
+pages, imgur .gifv animations, gfycat pages, and the media files they link to. FakeServer serves it
+over plain HTTP, and can be made slow or unreliable. Example usage:
+
+```python3
+server = FakeServer(FakeSite(pages=4), latency=0.05, error_rate=0.02)
+server.start()
+default_client.hosts.update(server.hosts())
+
+reddit = RedditJson('https://www.reddit.com/r/fake/', 4)
+...
+server.stop()
+```
+
+Every subreddit has the same posts. The same seed gives the same site, and
+the same sequence of injected faults.
+"""
+
+
+import hashlib
+import json
+import random
+import threading
+from datetime import datetime
+from datetime import timezone
+from http.server import BaseHTTPRequestHandler
+from http.server import HTTPServer
+from socketserver import ThreadingMixIn
+from time import sleep
+from urllib.parse import parse_qs
+
+
+__author__ = 'petarGitNik'
+__copyright__ = 'Copyright (c) 2017 petarGitNik petargitnik@gmail.com'
+__version__ = 'v0.1.0'
+__license__ = 'MIT'
+__email__ = 'petargitnik@gmail.com'
+__status__ = 'Development'
+
+
+ALPHABET = 'abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789'
+GFYCAT_WORDS = ('Impressive', 'Goodnatured', 'Amazon', 'Parrot', 'Lazy', 'Brave',
+                'Tiny', 'Happy', 'Gecko', 'Otter', 'Falcon', 'Wombat')
+
+LISTING_PAGE = (
+    '<!doctype html><html><head><title>{subreddit}</title></head>'
+    '<body class="listing-page"><div class="content" role="main">'
+    '<div class="sitetable linklisting">{things}</div>{next_button}</div>'
+    '</body></html>'
+)
+THING = (
+    '<div class=" thing id-t3_{id} link " data-fullname="t3_{id}">'
+    '<div class="entry unvoted"><div class="top-matter"><p class="title">'
+    '<a class="title may-blank outbound" href="{url}">{title}</a> '
+    '<span class="domain">(<a href="/domain/{domain}/">{domain}</a>)</span></p>'
+    '<p class="tagline">submitted <time datetime="{posted_on}">1 hour ago</time></p>'
+    '<ul class="flat-list buttons"><li class="first">'
+    '<a href="https://www.reddit.com{permalink}">comments</a></li></ul>'
+    '</div></div></div>'
+)
+NEXT_BUTTON = (
+    '<div class="nav-buttons"><span class="nextprev">view more: '
+    '<span class="next-button"><a href="https://www.reddit.com/r/{subreddit}/'
+    '?count={count}&amp;after=t3_{after}" rel="nofollow next">next</a></span>'
+    '</span></div>'
+)
+IMGUR_PAGE = (
+    '<!DOCTYPE html><html><head><title>Imgur</title></head><body>'
+    '<div class="post-images">{images}</div><script>var album = {album};</script>'
+    '</body></html>'
+)
+GFYCAT_PAGE = (
+    '<!DOCTYPE html><html><head><title>{name} | Gfycat</title></head><body>'
+    '<video class="video media" autoplay loop muted>'
+    '<source id="webmSource" src="https://zippy.gfycat.com/{name}.webm" type="video/webm">'
+    '<source id="mp4Source" src="https://zippy.gfycat.com/{name}.mp4" type="video/mp4">'
+    '</video></body></html>'
+)
+
+
+class FakeSite(object):
+    """
+    Synthetic subreddit with pages of posts_per_page posts. Posts link to
+    imgur images directly, to imgur image pages, to imgur albums of
+    album_size images, to imgur .gifv animations, to gfycat pages, or to the
+    comments of the post, in proportions of KINDS. Media files are between
+    min_size and max_size bytes long, except the .gif rendition of a .gifv,
+    which is GIF_SCALE times longer than its .mp4, as on imgur.
+    """
+    HOSTS = ('www.reddit.com', 'imgur.com', 'i.imgur.com', 'gfycat.com',
+             'zippy.gfycat.com')
+    KINDS = (('image', 45), ('imgur', 20), ('album', 10), ('gifv', 5), ('gfycat', 15),
+             ('self', 5))
+    GIF_SCALE = 8
+    IMAGE_EXTENSIONS = ('.jpg', '.jpg', '.png', '.gif')
+
+    def __init__(self, pages=4, posts_per_page=25, album_size=5,
+                 min_size=20 * 1024, max_size=200 * 1024, seed=0):
+        self.pages = pages
+        self.posts_per_page = posts_per_page
+        self.album_size = album_size
+        self.min_size = min_size
+        self.max_size = max_size
+
+        self.rng = random.Random(seed)
+        self.media = {}     # (host, path) -> size
+        self.images = {}    # imgur hash -> extension
+        self.albums = {}    # album hash -> list of (hash, extension)
+        self.gfycats = set()
+        self.posts = [self.make_post(number) for number in range(pages * posts_per_page)]
+        self.page_of = {post[0] : number // posts_per_page
+                        for number, post in enumerate(self.posts)}
+
+    def make_hash(self, length=7):
+        return ''.join(self.rng.choice(ALPHABET) for _ in range(length))
+
+    def add_image(self):
+        """
+        Add an imgur image and its media file. Return its (hash, extension).
+        """
+        image = (self.make_hash(), self.rng.choice(self.IMAGE_EXTENSIONS))
+        self.images[image[0]] = image[1]
+        self.add_media('i.imgur.com', '/{}{}'.format(*image))
+        return image
+
+    def add_media(self, host, path, scale=1):
+        self.media[(host, path)] = self.rng.randint(self.min_size, self.max_size) * scale
+
+    def make_post(self, number):
+        """
+        Return (id, url, domain, title, created_utc) of a post.
+        """
+        kind = self.rng.choice([kind for kind, weight in self.KINDS for _ in range(weight)])
+        post_id = '{:06x}'.format(number)
+
+        if kind == 'image':
+            url, domain = 'https://i.imgur.com/{}{}'.format(*self.add_image()), 'i.imgur.com'
+        elif kind == 'imgur':
+            url, domain = 'https://imgur.com/{}'.format(self.add_image()[0]), 'imgur.com'
+        elif kind == 'album':
+            album = self.make_hash(5)
+            self.albums[album] = [self.add_image() for _ in range(self.album_size)]
+            url, domain = 'https://imgur.com/a/{}'.format(album), 'imgur.com'
+        elif kind == 'gifv':
+            image = self.make_hash()
+            self.add_media('i.imgur.com', '/{}.mp4'.format(image))
+            self.add_media('i.imgur.com', '/{}.gif'.format(image), self.GIF_SCALE)
+            url, domain = 'https://i.imgur.com/{}.gifv'.format(image), 'i.imgur.com'
+        elif kind == 'gfycat':
+            name = ''.join(self.rng.sample(GFYCAT_WORDS, 3))
+            self.gfycats.add(name)
+            self.add_media('zippy.gfycat.com', '/{}.webm'.format(name))
+            self.add_media('zippy.gfycat.com', '/{}.mp4'.format(name))
+            url, domain = 'https://gfycat.com/{}'.format(name), 'gfycat.com'
+        else:
+            url, domain = None, 'self.fake'
+
+        # posts get older down the listing
+        created = 1501588800 - number * 60
+        return (post_id, url, domain, 'Post {} ({})'.format(number, kind), created)
+
+    def permalink(self, subreddit, post):
+        return '/r/{}/comments/{}/post_{}/'.format(subreddit, post[0], post[0])
+
+    def page_posts(self, after):
+        """
+        Return posts of the listing page after the post 'after', and the id of
+        the last post if there is a next page. Unknown posts have no page after
+        them.
+        """
+        if after and after[3:] not in self.page_of:
+            return ([], None)
+        page = self.page_of[after[3:]] + 1 if after else 0
+        if page >= self.pages:
+            return ([], None)
+        start = page * self.posts_per_page
+        posts = self.posts[start:start + self.posts_per_page]
+        last = posts[-1][0] if page + 1 < self.pages else None
+        return (posts, last)
+
+    def listing_html(self, subreddit, after):
+        posts, last = self.page_posts(after)
+        things = ''.join(THING.format(
+            id=post[0], url=post[1] or 'https://www.reddit.com' + self.permalink(subreddit, post),
+            title=post[3], domain=post[2], posted_on=self.timestamp(post[4]),
+            permalink=self.permalink(subreddit, post),
+        ) for post in posts)
+        next_button = NEXT_BUTTON.format(
+            subreddit=subreddit, count=self.posts_per_page, after=last
+        ) if last else ''
+        return LISTING_PAGE.format(subreddit=subreddit, things=things, next_button=next_button)
+
+    def listing_json(self, subreddit, after):
+        posts, last = self.page_posts(after)
+        children = [{'kind' : 't3', 'data' : {
+            'url' : post[1] or 'https://www.reddit.com' + self.permalink(subreddit, post),
+            'domain' : post[2],
+            'title' : post[3],
+            'created_utc' : post[4],
+            'permalink' : self.permalink(subreddit, post),
+        }} for post in posts]
+        return json.dumps({'kind' : 'Listing', 'data' : {
+            'children' : children, 'after' : 't3_' + last if last else None,
+        }})
+
+    def imgur_page(self, images):
+        return IMGUR_PAGE.format(
+            images=''.join('<img src="//i.imgur.com/{}{}">'.format(*image) for image in images),
+            album=json.dumps({'images' : [
+                {'hash' : image[0], 'title' : '', 'ext' : image[1]} for image in images
+            ]}, separators=(',', ':')),
+        )
+
+    def timestamp(self, created):
+        return datetime.fromtimestamp(created, timezone.utc).isoformat()
+
+    def page(self, host, path, query):
+        """
+        Return (content type, body) of a page, or None if there is no such
+        page.
+        """
+        parts = path.strip('/').split('/')
+        after = query.get('after', [None])[0]
+
+        if host == 'www.reddit.com' and len(parts) in (2, 3) and parts[0] == 'r':
+            if len(parts) == 3 and parts[2] == '.json':
+                return ('application/json', self.listing_json(parts[1], after))
+            if len(parts) == 2:
+                return ('text/html', self.listing_html(parts[1], after))
+        elif host == 'imgur.com' and len(parts) == 2 and parts[0] in ('a', 'gallery'):
+            if parts[1] in self.albums:
+                return ('text/html', self.imgur_page(self.albums[parts[1]]))
+        elif host == 'imgur.com' and len(parts) == 1 and parts[0] in self.images:
+            return ('text/html', self.imgur_page([(parts[0], self.images[parts[0]])]))
+        elif host == 'gfycat.com' and len(parts) == 1 and parts[0] in self.gfycats:
+            return ('text/html', GFYCAT_PAGE.format(name=parts[0]))
+        return None
+
+    def media_size(self, host, path):
+        """
+        Return the size of a media file, or None if there is no such file.
+        """
+        return self.media.get((host, path))
+
+    def media_body(self, host, path):
+        """
+        Return the content of a media file. Content is derived from the path,
+        so different files have different content.
+        """
+        size = self.media[(host, path)]
+        block = hashlib.sha256(path.encode()).digest()
+        return (block * (size // len(block) + 1))[:size]
+
+
+class FakeHandler(BaseHTTPRequestHandler):
+    """
+    Serves the pages and media of the FakeSite of the server. The site is
+    chosen by the Host header. HEAD requests get the headers of a GET.
+    """
+    protocol_version = 'HTTP/1.1'
+    CHUNK_SIZE = 16 * 1024
+
+    def do_GET(self):
+        server = self.server
+        if server.latency: sleep(server.latency)
+
+        fault = server.fault()
+        if fault in server.ERROR_STATUSES:
+            self.reply(fault, b'injected error', {'Retry-After' : '1'})
+            return
+
+        host = self.headers.get('Host', '').split(':')[0]
+        path, _, query = self.path.partition('?')
+        stall = fault == 'stall'
+
+        if server.site.media_size(host, path) is not None:
+            self.send_media(host, path, stall)
+            return
+
+        page = server.site.page(host, path, parse_qs(query))
+        if page is None:
+            self.reply(404, b'not found')
+        else:
+            self.reply(200, page[1].encode('utf-8'), {'Content-Type' : page[0]}, stall)
+
+    do_HEAD = do_GET
+
+    def send_media(self, host, path, stall):
+        """
+        Send a media file, or its tail if a Range is requested.
+        """
+        body = self.server.site.media_body(host, path)
+        headers = {
+            'Content-Type' : 'application/octet-stream',
+            'Accept-Ranges' : 'bytes',
+            'ETag' : '"{}"'.format(hashlib.md5(body).hexdigest()),
+        }
+
+        offset = self.range_offset()
+        if offset is None:
+            self.reply(200, body, headers, stall)
+        elif offset >= len(body):
+            headers['Content-Range'] = 'bytes */{}'.format(len(body))
+            self.reply(416, b'', headers)
+        else:
+            headers['Content-Range'] = 'bytes {}-{}/{}'.format(offset, len(body) - 1, len(body))
+            self.reply(206, body[offset:], headers, stall)
+
+    def range_offset(self):
+        """
+        Return the first byte of a 'bytes=N-' Range, or None.
+        """
+        value = self.headers.get('Range', '')
+        if value.startswith('bytes=') and value.endswith('-'):
+            try:
+                return int(value[6:-1])
+            except ValueError:
+                return None
+        return None
+
+    def reply(self, status, body, headers=None, stall=False):
+        """
+        Send a response at the bandwidth of the server. A stalled response
+        stops after half of the body, and its connection is closed after
+        stall_time seconds.
+        """
+        self.send_response(status)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+
+        if self.command == 'HEAD':
+            return
+        if stall:
+            body = body[:len(body) // 2]
+        for start in range(0, len(body), self.CHUNK_SIZE):
+            chunk = body[start:start + self.CHUNK_SIZE]
+            self.wfile.write(chunk)
+            if self.server.bandwidth: sleep(len(chunk) / self.server.bandwidth)
+        self.server.count('bytes', len(body))
+
+        if stall:
+            self.wfile.flush()
+            sleep(self.server.stall_time)
+            self.close_connection = True
+
+    def log_message(self, *args):
+        pass
+
+
+class FakeServer(ThreadingMixIn, HTTPServer):
+    """
+    Threaded server of a FakeSite. Every response is delayed by latency
+    seconds, and bodies are sent at bandwidth bytes per second (unlimited if
+    None). A share of error_rate responses are 429 or 5xx errors, and a share
+    of stall_rate responses stall halfway for stall_time seconds.
+    """
+    daemon_threads = True
+    ERROR_STATUSES = (429, 500, 502, 503)
+
+    def __init__(self, site, latency=0, bandwidth=None, error_rate=0,
+                 stall_rate=0, stall_time=5, seed=0, address=('127.0.0.1', 0)):
+        super().__init__(address, FakeHandler)
+        self.site = site
+        self.latency = latency
+        self.bandwidth = bandwidth
+        self.error_rate = error_rate
+        self.stall_rate = stall_rate
+        self.stall_time = stall_time
+
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.counters = {'requests' : 0, 'errors' : 0, 'stalls' : 0, 'bytes' : 0}
+        self.thread = None
+
+    def fault(self):
+        """
+        Draw the fault of the next response: an error status, 'stall', or None.
+        """
+        with self.lock:
+            self.counters['requests'] += 1
+            draw = self.rng.random()
+            if draw < self.error_rate:
+                self.counters['errors'] += 1
+                return self.rng.choice(self.ERROR_STATUSES)
+            if draw < self.error_rate + self.stall_rate:
+                self.counters['stalls'] += 1
+                return 'stall'
+        return None
+
+    def count(self, name, value=1):
+        with self.lock:
+            self.counters[name] += value
+
+    def stats(self):
+        """
+        Return the number of requests, injected errors and stalls, and bytes
+        sent.
+        """
+        with self.lock:
+            return dict(self.counters)
+
+    def hosts(self):
+        """
+        Return hosts of the site mapped to the address of the server, see
+        HttpClient.hosts.
+        """
+        return {host : self.server_address for host in self.site.HOSTS}
+
+    def start(self):
+        self.thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
@@ -1,9 +1,27 @@
 #!/usr/bin/python3
 
 
+import os
 from argparse import ArgumentParser
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import as_completed
+from selenium import webdriver
 from utils.downloader import Downloader
+from utils.httpclient import default_client
+from utils.crawlstate import CrawlState
+from utils.cache import ResolutionCache
+from utils.cache import DeadLinks
+from utils.jobqueue import JobQueue
+from utils.politeness import DomainBudgets
+from utils.metrics import Metrics
+from utils.profiling import StageProfiler
 from domainparsers.reddit import Reddit
+from domainparsers.reddit import RedditException
+from domainparsers.reddit import chronological_listing
+from domainparsers.reddit_json import RedditJson
+from domainparsers.parsing import ProcessParser
+from domainparsers.formats import FormatPolicy
+from domainparsers.formats import parse_preference
 
 
 __author__ = 'petarGitNik'
@@ -14,13 +32,20 @@ __email__ = 'petargitnik@gmail.com'
 __status__ = 'Development'
 
 
+BACKENDS = {
+    'browser' : Reddit,
+    'json' : RedditJson,
+}
+
+
 def parse_arguments():
     """
     Parse input arguments of the program. Two positional arguments are
-    mandatory: 'URL' and destination 'directory'. 'verbose' is optional.
-    Example:
+    mandatory: 'URL' and destination 'directory', unless subreddits are listed
+    in a batch file. 'verbose' is optional. Example:
 
     crawlddit.py -v https://www.reddit.com/r/MemeEconomy/ ./memes
+    crawlddit.py -v --batch subreddits.txt
 
     For more information type:
 
@@ -32,27 +57,285 @@ def parse_arguments():
                         help='display download progress and information',
                         action='store_true')
     parser.add_argument('-p', help='crawl P number of pages', type=int)
-    parser.add_argument('URL', help='source link')
-    parser.add_argument('directory', help='destination directory')
+    parser.add_argument('-w', '--workers',
+                        help='download W files at the same time (default: 1)',
+                        type=int, default=1)
+    parser.add_argument('--domain-limit',
+                        help='download at most N files from a single domain '
+                             'at the same time (default: 1)',
+                        type=int, default=1)
+    parser.add_argument('-r', '--resume',
+                        help='skip files which were already downloaded to '
+                             'the destination directory',
+                        action='store_true')
+    parser.add_argument('-i', '--incremental',
+                        help='crawl only posts which are newer than the newest '
+                             'post of the previous crawl, from the listing '
+                             'sorted by new',
+                        action='store_true')
+    parser.add_argument('-b', '--backend',
+                        help='read listing pages by rendering them in a browser, '
+                             'or in JSON format (default: browser)',
+                        choices=sorted(BACKENDS), default='browser')
+    parser.add_argument('-q', '--queue',
+                        help='keep crawled posts in a queue in the destination '
+                             'directory, so an interrupted run continues where '
+                             'it stopped',
+                        action='store_true')
+    parser.add_argument('--dedup',
+                        help='replace files with the same content as an already '
+                             'downloaded file with a hard link, delete them, or '
+                             'keep them (default: link)',
+                        choices=['link', 'skip', 'off'], default='link')
+    parser.add_argument('--no-cache',
+                        help='fetch every imgur and gfycat page, even if it was '
+                             'resolved by a previous crawl, and retry links '
+                             'which failed permanently',
+                        action='store_true')
+    parser.add_argument('--cache-ttl',
+                        help='days for which a resolved link is cached '
+                             '(default: 7)',
+                        type=float, default=7)
+    parser.add_argument('--connect-timeout',
+                        help='seconds to wait for a connection (default: 10)',
+                        type=float, default=10)
+    parser.add_argument('--read-timeout',
+                        help='seconds to wait for data from a server (default: 30)',
+                        type=float, default=30)
+    parser.add_argument('--batch',
+                        help='download subreddits listed in a file at the same '
+                             'time, one "URL directory [pages]" per line',
+                        metavar='FILE')
+    parser.add_argument('--parallel',
+                        help='download at most N subreddits of a batch at the '
+                             'same time (default: 4)',
+                        type=int, default=4)
+    parser.add_argument('--parse-processes',
+                        help='parse listing and imgur pages in N processes, '
+                             '0 parses them in the threads which fetch them '
+                             '(default: 0)',
+                        type=int, default=0, metavar='N')
+    parser.add_argument('--metrics',
+                        help='write request, latency and politeness metrics '
+                             'of the run to FILE',
+                        metavar='FILE')
+    parser.add_argument('--metrics-format',
+                        help='format of the metrics file (default: json)',
+                        choices=['json', 'prometheus'], default='json')
+    parser.add_argument('--profile',
+                        help='crawl all pages before downloading, and write '
+                             'a CPU profile of crawling, resolving and '
+                             'downloading to the destination directory',
+                        action='store_true')
+    parser.add_argument('--profile-memory',
+                        help='with --profile, also record memory allocated '
+                             'while crawling and downloading',
+                        action='store_true')
+    parser.add_argument('--formats',
+                        help='comma separated formats of gfycat videos and '
+                             'imgur .gifv animations, in order of preference '
+                             '(default: webm,mp4,gif)',
+                        type=parse_preference, default=None, metavar='LIST')
+    parser.add_argument('--smallest-format',
+                        help='ask for the size of every format, and download '
+                             'the smallest one',
+                        action='store_true')
+    parser.add_argument('URL', help='source link', nargs='?')
+    parser.add_argument('directory', help='destination directory', nargs='?')
 
     args = parser.parse_args()
+    if not args.batch and not (args.URL and args.directory):
+        parser.error('URL and directory are required without --batch')
+    if args.incremental and args.URL:
+        try:
+            chronological_listing(args.URL)
+        except RedditException as e:
+            parser.error(str(e))
+    return args
 
-    return (args.verbose, args.p, args.URL, args.directory)
 
+def download_subreddit(args, url, directory, pages, budgets=None, driver=None,
+                       parser=None, metrics=None):
+    """
+    Crawl a subreddit and download its images to directory. Budgets, driver,
+    parser and metrics are shared by subreddits downloaded at the same time.
+    """
+    verbose = args.verbose
 
-if __name__ == '__main__':
-    verbose, pages, url, destination = parse_arguments()
+    state = CrawlState(directory) if args.incremental else None
+    stop_at = state.load(url) if state else None
+    # the mark is kept under the given url, but posts are crawled newest first
+    listing = chronological_listing(url) if state else url
+
+    cache_path = os.path.join(directory, 'cache.sqlite')
+    cache = None if args.no_cache else ResolutionCache(
+        cache_path, ttl=args.cache_ttl * 24 * 3600
+    )
+    dead_links = None if args.no_cache else DeadLinks(cache_path)
+
+    queue = None
+    if args.queue and os.path.isdir(directory):
+        queue = JobQueue(os.path.join(directory, 'queue.sqlite'))
+
+    profiler = None
+    if args.profile:
+        profiler = StageProfiler(directory, memory=args.profile_memory)
 
     if verbose: print('Fetching available links...')
-    reddit = Reddit(url, pages)
-    reddit.get_all_posts()
-    images = reddit.images
+    reddit = BACKENDS[args.backend](
+        listing, pages, stop_at=stop_at, cache=cache, dead_links=dead_links,
+        queue=queue, budgets=budgets, driver=driver, parser=parser,
+        profiler=profiler,
+        formats=FormatPolicy(args.formats, smallest=args.smallest_format)
+    )
+    if metrics: reddit.register(metrics)
+
+    try:
+        if profiler:
+            # stages are run one after another, so they can be told apart
+            profiler.run('crawl', reddit.get_all_posts)
+
+        downloader = Downloader(
+            reddit, directory, verbose, args.workers, args.domain_limit,
+            resume=args.resume, dead_links=dead_links,
+            dedup=None if args.dedup == 'off' else args.dedup, queue=queue,
+            budgets=budgets, profiler=profiler
+        )
+        if metrics: downloader.register(metrics)
+
+        if profiler:
+            profiler.run('download', downloader.download_files)
+        else:
+            downloader.download_stream(reddit.iter_posts())
+    finally:
+        if cache: cache.close()
+        if dead_links: dead_links.close()
+        if profiler:
+            summary = profiler.write()
+            if verbose: print('Profile written to', summary)
+
+    # a crawl which stopped at a page it could not fetch keeps the old mark
+    if state and reddit.newest and reddit.complete:
+        state.save(url, reddit.newest)
 
     if verbose: print(
-        '{}/{} images available for download.'.format(
-            reddit.count_downloadable_images() , len(images)
+        '{}/{} images were available for download.'.format(
+            downloader.total, downloader.received
+        )
+    )
+
+    if verbose and downloader.failures.count: print(
+        '{} images could not be downloaded, see failures.jsonl.'.format(
+            downloader.failures.count
+        )
+    )
+
+    if verbose and downloader.duplicates: print(
+        '{} duplicates found, {:.1f} MiB saved.'.format(
+            downloader.duplicates, downloader.bytes_saved / 2**20
         )
     )
 
-    downloader = Downloader(reddit, destination, verbose)
-    downloader.download_files()
+    if verbose and args.resume: print(
+        '{} images were already downloaded.'.format(downloader.skipped)
+    )
+
+    if verbose and cache: print(
+        '{hits} links resolved from cache, {misses} fetched.'.format(**cache.stats())
+    )
+
+    if verbose and dead_links: print(
+        '{hits} dead links were not requested.'.format(**dead_links.stats())
+    )
+
+    if queue:
+        if verbose: print(
+            '{done} posts done, {failed} failed, and {resolved} left in the '
+            'queue.'.format(**queue.stats())
+        )
+        queue.close()
+
+
+def read_batch(path, pages=None):
+    """
+    Read a batch file. Each line holds a subreddit url, its destination
+    directory, and optionally the number of pages to crawl, which is pages
+    by default. Empty lines, and lines starting with '#' are skipped. Example:
+
+    https://www.reddit.com/r/MemeEconomy/ ./memes 2
+    https://www.reddit.com/r/pics/ ./pics
+
+    Return a list of (url, directory, pages) tuples.
+    """
+    jobs = []
+    with open(path) as f:
+        for number, line in enumerate(f, start=1):
+            fields = line.split()
+            if not fields or fields[0].startswith('#'):
+                continue
+            if len(fields) not in (2, 3):
+                raise ValueError('{}:{}: expected URL directory [pages]'.format(path, number))
+            jobs.append((
+                fields[0], fields[1], int(fields[2]) if len(fields) == 3 else pages
+            ))
+    return jobs
+
+
+def download_batch(args, jobs, parser=None, metrics=None):
+    """
+    Download subreddits of a batch at the same time, at most args.parallel of
+    them. All of them share one budget per host, so hosts are not requested
+    more often than when a single subreddit is downloaded, and the browser
+    backend starts a single browser.
+    """
+    budgets = DomainBudgets()
+    driver = webdriver.PhantomJS() if args.backend == 'browser' else None
+    try:
+        with ThreadPoolExecutor(max_workers=max(1, args.parallel)) as pool:
+            futures = {
+                pool.submit(download_subreddit, args, url, directory, pages,
+                            budgets, driver, parser, metrics) : url
+                for url, directory, pages in jobs
+            }
+            for future in as_completed(futures):
+                try:
+                    future.result()
+                    print('Finished:', futures[future])
+                except Exception as e:
+                    print('Could not download {}: {}'.format(futures[future], e))
+    finally:
+        if driver is not None: driver.quit()
+
+
+def write_metrics(metrics, path, format='json'):
+    """
+    Write metrics collected during the run to a file, as JSON or in the
+    Prometheus text format.
+    """
+    with open(path, 'w') as f:
+        f.write(metrics.to_prometheus() if format == 'prometheus' else metrics.to_json())
+
+
+if __name__ == '__main__':
+    args = parse_arguments()
+
+    default_client.connect_timeout = args.connect_timeout
+    default_client.read_timeout = args.read_timeout
+
+    # processes are started before any threads, and shared by all subreddits
+    parser = ProcessParser(args.parse_processes) if args.parse_processes > 0 else None
+    metrics = Metrics() if args.metrics else None
+    try:
+        if args.batch:
+            download_batch(args, read_batch(args.batch, args.p), parser, metrics)
+        else:
+            download_subreddit(args, args.URL, args.directory, args.p,
+                               parser=parser, metrics=metrics)
+    finally:
+        if parser: parser.close()
+        if metrics: write_metrics(metrics, args.metrics, args.metrics_format)
+
+    if args.verbose: print(
+        '{requests} requests made, {opened} connections opened, '
+        '{reused} connections reused.'.format(**default_client.stats())
+    )
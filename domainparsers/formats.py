@@ -0,0 +1,115 @@
+#!/usr/bin/python3
+
+
+"""
+Chooses which rendition of an animation is downloaded. Gfycat serves every
+video as .webm and .mp4, and imgur serves a .gifv as .mp4 and as .gif, which
+is often many times larger. Example usage:
+
+```python3
+policy = FormatPolicy(preference=['.mp4', '.webm', '.gif'])
+policy.choose(Gfycat(url).renditions())
+
+policy = FormatPolicy(smallest=True)
+policy.choose(gifv_renditions('https://i.imgur.com/jedEzFL.gifv'))
+```
+
+By default the rendition whose format comes first in the preference is
+chosen. If smallest is True, the size of every rendition is requested with a
+HEAD request, and the smallest one is chosen. Renditions of the same size, or
+of an unknown size, are chosen by preference.
+"""
+
+
+from urllib.error import HTTPError
+from urllib.error import URLError
+from domainparsers.common import FileFormats
+from utils.httpclient import default_client
+
+
+__author__ = 'petarGitNik'
+__copyright__ = 'Copyright (c) 2017 petarGitNik petargitnik@gmail.com'
+__version__ = 'v0.1.0'
+__license__ = 'MIT'
+__email__ = 'petargitnik@gmail.com'
+__status__ = 'Development'
+
+
+class FormatPolicy(object):
+    """
+    Policy of choosing one of the renditions of an animation. Preference is a
+    list of extensions, formats which are not in it come last.
+    """
+    PREFERENCE = (FileFormats.WEBM, FileFormats.MP4, FileFormats.GIF)
+
+    def __init__(self, preference=None, smallest=False):
+        self.preference = tuple(preference or self.PREFERENCE)
+        self.smallest = smallest
+
+    def choose(self, renditions, before_request=None):
+        """
+        Return the direct link of the chosen rendition, or None if there are
+        no renditions. Before_request is called with the url of every HEAD
+        request before it is made, e.g. to wait for the budget of its host.
+        """
+        renditions = [url for url in renditions if url]
+        if not renditions:
+            return None
+        if not self.smallest or len(renditions) == 1:
+            return min(renditions, key=self.rank)
+
+        sizes = {}
+        for url in renditions:
+            if before_request: before_request(url)
+            sizes[url] = self.size(url)
+        return min(renditions, key=lambda url: (
+            sizes[url] is None, sizes[url] or 0, self.rank(url)
+        ))
+
+    def rank(self, url):
+        """
+        Return the position of the format of url in the preference.
+        """
+        extension = extension_of(url)
+        if extension in self.preference:
+            return self.preference.index(extension)
+        return len(self.preference)
+
+    def size(self, url):
+        """
+        Return the Content-Length of url, or None if it is not known.
+        """
+        try:
+            with default_client.open(url, method='HEAD') as r:
+                r.read()
+                length = r.getheader('Content-Length')
+        except (HTTPError, URLError):
+            return None
+        return int(length) if length and length.isdigit() else None
+
+
+def extension_of(url):
+    """
+    Return the extension of the file url points to, e.g. '.mp4', or None.
+    """
+    filename = url.split('?')[0].split('/')[-1]
+    if '.' not in filename:
+        return None
+    return filename[filename.rindex('.'):].lower()
+
+
+def format_of(url):
+    """
+    Return the name of the format of the file url points to, e.g. 'mp4', as
+    it is recorded in the database, or None.
+    """
+    extension = extension_of(url) if url else None
+    return extension[1:] if extension else None
+
+
+def parse_preference(text):
+    """
+    Parse a comma separated list of formats, e.g. 'mp4,webm,gif', into a list
+    of extensions.
+    """
+    return ['.' + name.strip().lstrip('.').lower() for name in text.split(',') if name.strip()]
@@ -3,13 +3,14 @@
 
 """
 Parser for gfycat site. For now, it can only parse direct links to videos.
-By default, it only downloads .webm format.
+Every video is available as .webm and as .mp4. By default the .webm format is
+downloaded, see domainparsers.formats for choosing another one.
 """
 
 
-from urllib.request import urlopen
-from selenium import webdriver
 from bs4 import BeautifulSoup
+from domainparsers.formats import FormatPolicy
+from utils.httpclient import default_client
 
 
 __author__ = 'petarGitNik'
@@ -21,6 +22,8 @@ __status__ = 'Development'
 
 
 class Gfycat(object):
+    # Sources of full-size renditions, the mobile one is of lower quality
+    SOURCES = ('webmSource', 'mp4Source')
 
     def __init__(self, url):
         self.url = url
@@ -28,14 +31,28 @@ class Gfycat(object):
     def make_soup(self, parser='lxml'):
         """
         Return a soup object. Default parser is lxml. Requests are made by
-        default using url.request library.
+        the shared HTTP client, and the page is transferred compressed.
         """
-        return BeautifulSoup(urlopen(self.url).read(), parser)
+        with default_client.open(self.url, compressed=True) as r:
+            return BeautifulSoup(r.read(), parser)
 
-    def parse_gfycat(self):
+    def parse_gfycat(self, policy=None, before_request=None):
         """
-        Get direct link for post image/video from gfycat.
+        Get direct link for post image/video from gfycat. Policy is a
+        FormatPolicy which chooses one of the renditions, see
+        FormatPolicy.choose() for before_request.
+        """
+        policy = policy or FormatPolicy()
+        return policy.choose(self.renditions(), before_request)
+
+    def renditions(self):
+        """
+        Get direct links to all full-size renditions of the video.
         """
         soup = self.make_soup()
-        source = soup.find('source', attrs={'id' : 'webmSource'})
-        return source['src'] if source else None
+        renditions = []
+        for source_id in self.SOURCES:
+            source = soup.find('source', attrs={'id' : source_id})
+            if source and source.get('src'):
+                renditions.append(source['src'])
+        return renditions
@@ -18,7 +18,8 @@ imgur.prepare_images()
 images = imgur.images
 ```
 
-imgur.images is a deque of two keyed dictionaries. Example usage:
+imgur.images is a deque of MediaItem records, which can be used as two keyed
+dictionaries. Example usage:
 
 ```python3
 for image in images:
@@ -44,15 +45,57 @@ https://github.com/petarGitNik/imgur-downloader
 
 import re
 from collections import deque
-from urllib.request import urlopen
 from urllib.error import HTTPError
 from urllib.error import URLError
+from utils.httpclient import default_client
+from domainparsers.records import MediaItem
 
 
 __version__ = 'v0.2'
 __status__ = 'Development'
 
 
+IMAGE_PATTERN = re.compile(
+    '\{"hash":"([a-zA-Z0-9]+)".*?"ext":"([\.a-zA-Z0-9\?\#]+)".*?\}'
+)
+
+
+def extract_images(html):
+    """
+    Get (hash, extension) tuples of all images on an imgur page, in order of
+    appearance, e.g. [('jedEzFL', '.jpg'), ('lciC5G8', '.jpg')]. It is a
+    function, so pages can be parsed in other processes, see
+    domainparsers.parsing.
+    """
+    return IMAGE_PATTERN.findall(html)
+
+
+def gifv_renditions(url):
+    """
+    Get direct links to the renditions of a .gifv, which imgur serves as .mp4
+    and as .gif. Example:
+
+    https://i.imgur.com/jedEzFL.gifv  ->  [https://i.imgur.com/jedEzFL.mp4,
+                                          https://i.imgur.com/jedEzFL.gif]
+    """
+    match = re.match('(https?\:\/\/i\.imgur\.com\/[a-zA-Z0-9]+)\.gifv', url)
+    if not match:
+        return []
+    return [match.group(1) + '.mp4', match.group(1) + '.gif']
+
+
+def numerate(images):
+    """
+    Prefix filenames of images with their ordinal number, padded to the same
+    width, so they sort in album order. Example:
+
+    ['jedEzFL.jpg', 'lciC5G8.jpg']  ->  ['1-jedEzFL.jpg', '2-lciC5G8.jpg']
+    """
+    ordinal = '{0:0%dd}' % len(str(len(images)))
+    for index, image in enumerate(images, start=1):
+        image['filename'] = ''.join([ordinal.format(index), '-', image['filename']])
+
+
 class ImgurException(Exception):
     """
     This exception is raised if supplied link is invalid.
@@ -102,12 +145,15 @@ class Imgur(object):
     imgur link.
     """
 
-    def __init__(self, url):
+    def __init__(self, url, parser=None):
         """
-        Initiate Imgur object.
+        Initiate Imgur object. Parser extracts images from fetched pages, see
+        domainparsers.parsing. By default pages are parsed in this thread.
         """
         self.url = self.sanitize(url)
+        self.parser = parser
         self.images = deque()
+        self.error = None
 
     def sanitize(self, url):
         """
@@ -201,11 +247,15 @@ class Imgur(object):
     def parse_and_prepare_images(self, url):
         """
         Obtain and parse html, and append image dictionaries to image deque.
+        If the page cannot be obtained, the error is kept in self.error.
         """
-        pattern = '\{"hash":"([a-zA-Z0-9]+)".*?"ext":"([\.a-zA-Z0-9\?\#]+)".*?\}'
         try:
-            html = urlopen(url).read().decode('utf-8')
-            filenames_with_duplicates = re.findall(pattern, html)
+            with default_client.open(url, compressed=True) as r:
+                html = r.read().decode('utf-8')
+            if self.parser:
+                filenames_with_duplicates = self.parser.extract_images(html)
+            else:
+                filenames_with_duplicates = extract_images(html)
             filenames_clean = self.remove_duplicates(filenames_with_duplicates)
             urls = self.build_image_url_list(filenames_clean)
             for url in urls:
@@ -213,8 +263,10 @@ class Imgur(object):
                     self.pack_image(url, self.get_image_filename(url))
                 )
         except HTTPError as e:
+            self.error = e
             print(e.status)
         except URLError as e:
+            self.error = e
             print(e.reason)
 
     def build_image_url_list(self, filenames):
@@ -232,11 +284,13 @@ class Imgur(object):
     def remove_duplicates(self, filenames):
         """
         Remove duplicates from a list of tuples containing filenames with
-        extensions.
+        extensions. The first occurrence of each filename is kept in place.
         """
+        seen = set()
         clean = []
         for filename in filenames:
-            if filename not in clean:
+            if filename not in seen:
+                seen.add(filename)
                 clean.append(filename)
         return clean
 
@@ -264,9 +318,10 @@ class Imgur(object):
 
     def pack_image(self, url, filename):
         """
-        Returns a dictionary with image url and corresponding filename.
+        Returns a MediaItem with image url and corresponding filename. It can
+        be used as a dictionary.
         """
-        return {'url' : url, 'filename' : filename}
+        return MediaItem(url, filename)
 
     def number_of_images(self):
         """
@@ -278,12 +333,7 @@ class Imgur(object):
         """
         Append ordinal number to image filename.
         """
-        total = self.digits_in_a_number(len(self.images))
-        ordinal = '{0:0%dd}' % total
-        for index, image in enumerate(self.images, start=1):
-            image['filename'] = ''.join([
-                    ordinal.format(index), '-', image['filename']
-                ])
+        numerate(self.images)
 
     def digits_in_a_number(self, number):
         """
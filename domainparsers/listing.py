@@ -0,0 +1,94 @@
+#!/usr/bin/python3
+
+
+"""
+Extracts posts from a rendered reddit listing page. The page is parsed once
+with lxml, and every post ('thing' element) is visited once with precompiled
+XPath selectors. Example usage:
+
+```python3
+posts, next_page = extract_posts(driver.page_source)
+for url, domain, title, posted_on, link_to_comments in posts:
+    print(url)
+```
+
+Posts are returned as compact tuples, so they are cheap to keep and to send
+between processes. See Reddit.get_files_from_a_page() for post dictionaries.
+"""
+
+
+from lxml import etree
+
+
+__author__ = 'petarGitNik'
+__copyright__ = 'Copyright (c) 2017 petarGitNik petargitnik@gmail.com'
+__version__ = 'v0.1.0'
+__license__ = 'MIT'
+__email__ = 'petargitnik@gmail.com'
+__status__ = 'Development'
+
+
+def has_class(name):
+    """
+    Return XPath predicate which is true if an element has a class 'name'.
+    """
+    return "contains(concat(' ', normalize-space(@class), ' '), ' {} ')".format(name)
+
+
+def selector(path):
+    """
+    Compile an XPath selector. Strings it returns do not keep the parsed page
+    alive.
+    """
+    return etree.XPath(path, smart_strings=False)
+
+
+THINGS = selector("//div[{} and contains(@class, 'id-t3')]".format(has_class('thing')))
+TITLE = selector("(.//p[{}])[1]".format(has_class('title')))
+TITLE_LINK = selector("(.//a)[1]")
+DOMAIN = selector("string((.//span[{}]/a)[1])".format(has_class('domain')))
+TIMESTAMP = selector("(.//time/@datetime)[1]")
+COMMENTS = selector("(.//li[{}]/a/@href)[1]".format(has_class('first')))
+NEXT_PAGE = selector("(//span[{}]/a/@href)[1]".format(has_class('next-button')))
+
+
+def extract_posts(html):
+    """
+    Get (url, domain, title, posted_on, link_to_comments) tuples of all posts
+    on a listing page, and the link to the next page, or None. The parsed page
+    is freed before returning.
+    """
+    root = etree.fromstring(html, etree.HTMLParser())
+    if root is None:
+        return ([], None)
+
+    posts = []
+    for thing in THINGS(root):
+        posts.append(extract_post(thing))
+        thing.clear()
+
+    next_page = first(NEXT_PAGE(root))
+    root.clear()
+    return (posts, next_page)
+
+
+def extract_post(thing):
+    """
+    Get (url, domain, title, posted_on, link_to_comments) of a single post.
+    """
+    title = TITLE(thing)[0]
+    link = TITLE_LINK(title)[0]
+    return (
+        link.get('href'),
+        DOMAIN(title) or None,
+        link.text,
+        first(TIMESTAMP(thing)),
+        first(COMMENTS(thing)),
+    )
+
+
+def first(results):
+    """
+    Return the first result of an XPath selector, or None.
+    """
+    return results[0] if results else None
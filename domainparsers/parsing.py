@@ -0,0 +1,82 @@
+#!/usr/bin/python3
+
+
+"""
+Parsers of fetched pages. Extraction of posts from listing pages and of images
+from imgur pages is CPU bound, so when many pages are fetched at the same time
+it is limited to a single core by the GIL. ProcessParser sends raw page HTML to
+a pool of processes instead, and gets back compact tuples. Example usage:
+
+```python3
+parser = ProcessParser(processes=4)
+reddit = Reddit(url, pages, parser=parser)
+...
+parser.close()
+```
+
+Threads which use the parser wait for their page only, so pages fetched by
+different threads (e.g. Resolver threads, or subreddits of a batch) are parsed
+on different cores.
+"""
+
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+from domainparsers.listing import extract_posts
+from domainparsers.imgur import extract_images
+
+
+__author__ = 'petarGitNik'
+__copyright__ = 'Copyright (c) 2017 petarGitNik petargitnik@gmail.com'
+__version__ = 'v0.1.0'
+__license__ = 'MIT'
+__email__ = 'petargitnik@gmail.com'
+__status__ = 'Development'
+
+
+class InlineParser(object):
+    """
+    Parses pages in the calling thread. It is used when no parser is given.
+    """
+
+    def extract_posts(self, html):
+        """
+        See domainparsers.listing.extract_posts().
+        """
+        return extract_posts(html)
+
+    def extract_images(self, html):
+        """
+        See domainparsers.imgur.extract_images().
+        """
+        return extract_images(html)
+
+    def close(self):
+        pass
+
+
+class ProcessParser(InlineParser):
+    """
+    Parses pages in a pool of processes. It can be shared between threads, and
+    between Reddit objects. Processes is the size of the pool, by default the
+    number of cores. Processes are started right away, so a ProcessParser
+    should be created before the caller starts any threads.
+    """
+
+    def __init__(self, processes=None):
+        self.processes = processes or os.cpu_count() or 1
+        self.pool = ProcessPoolExecutor(max_workers=self.processes)
+        # the pool starts all of its processes with the first task
+        self.pool.submit(int).result()
+
+    def extract_posts(self, html):
+        return self.pool.submit(extract_posts, html).result()
+
+    def extract_images(self, html):
+        return self.pool.submit(extract_images, html).result()
+
+    def close(self):
+        """
+        Stop the processes of the pool.
+        """
+        self.pool.shutdown()
@@ -0,0 +1,134 @@
+#!/usr/bin/python3
+
+
+"""
+Compact records of crawled posts and of their media. Records keep their fields
+in __slots__ instead of a per-object dictionary, so a crawl of hundreds of
+thousands of posts takes a fraction of the memory. Example usage:
+
+```python3
+post = Post(url='https://i.imgur.com/jedEzFL.jpg', domain='i.imgur.com')
+post.image = MediaItem('https://i.imgur.com/jedEzFL.jpg', 'jedEzFL.jpg')
+print(post.image.filename)
+```
+
+Records can also be used as dictionaries, as posts used to be:
+
+```python3
+post['image']['filename']
+post['http_status_token'] += 1
+dict(post['image']) == {'url' : 'https://i.imgur.com/jedEzFL.jpg',
+                        'filename' : 'jedEzFL.jpg'}
+```
+
+Fields cannot be added or removed, only changed.
+"""
+
+
+__author__ = 'petarGitNik'
+__copyright__ = 'Copyright (c) 2017 petarGitNik petargitnik@gmail.com'
+__version__ = 'v0.1.0'
+__license__ = 'MIT'
+__email__ = 'petargitnik@gmail.com'
+__status__ = 'Development'
+
+
+class Record(object):
+    """
+    Base class of records with a dictionary interface. Subclasses list their
+    fields in __slots__. A record is equal to another record of the same type,
+    or to a dictionary, with the same fields and values.
+    """
+    __slots__ = ()
+
+    def __init__(self, *args, **kwargs):
+        """
+        Fields are given in order of __slots__, or by name. Missing fields are
+        None.
+        """
+        for name in self.__slots__:
+            setattr(self, name, None)
+        for name, value in zip(self.__slots__, args):
+            setattr(self, name, value)
+        for name, value in kwargs.items():
+            self[name] = value
+
+    def __getitem__(self, name):
+        if name not in self.__slots__:
+            raise KeyError(name)
+        return getattr(self, name)
+
+    def __setitem__(self, name, value):
+        if name not in self.__slots__:
+            raise KeyError(name)
+        setattr(self, name, value)
+
+    def __contains__(self, name):
+        return name in self.__slots__
+
+    def __iter__(self):
+        return iter(self.__slots__)
+
+    def __len__(self):
+        return len(self.__slots__)
+
+    def get(self, name, default=None):
+        return getattr(self, name) if name in self.__slots__ else default
+
+    def keys(self):
+        return list(self.__slots__)
+
+    def values(self):
+        return [getattr(self, name) for name in self.__slots__]
+
+    def items(self):
+        return [(name, getattr(self, name)) for name in self.__slots__]
+
+    def copy(self):
+        """
+        Return a shallow copy of the record.
+        """
+        return type(self)(*self.values())
+
+    def __eq__(self, other):
+        if isinstance(other, Record):
+            return type(self) is type(other) and self.values() == other.values()
+        if isinstance(other, dict):
+            return dict(self.items()) == other
+        return NotImplemented
+
+    def __ne__(self, other):
+        equal = self.__eq__(other)
+        return equal if equal is NotImplemented else not equal
+
+    # Records are mutable, so they are not hashable
+    __hash__ = None
+
+    def __repr__(self):
+        return '{}({})'.format(type(self).__name__, ', '.join(
+            '{}={!r}'.format(name, value) for name, value in self.items()
+        ))
+
+
+class MediaItem(Record):
+    """
+    Direct link to an image or a video, and the filename it is saved under.
+    Both are None if the direct link is not known.
+    """
+    __slots__ = ('url', 'filename')
+
+
+class Post(Record):
+    """
+    A post from a subreddit listing. Image is the MediaItem of the post,
+    second_level_domain_name is the known domain of the listing page (on_page),
+    and last_http_status and http_status_token are updated by the Downloader
+    while the image is downloaded and retried. An album post is split into
+    one post per image, and part is the number of the image in the album.
+    Part is None for other posts.
+    """
+    __slots__ = (
+        'url', 'image', 'domain', 'second_level_domain_name', 'post_title',
+        'posted_on', 'link_to_comments', 'on_page', 'last_http_status',
+        'http_status_token', 'part',
+    )
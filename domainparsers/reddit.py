@@ -17,28 +17,51 @@ reddit.get_all_posts()
 images = reddit.images
 ```
 
-reddit.images is a deque consisting of dictionaries. For more information about
-this structure, see get_files_from_a_page() method.
+reddit.images is a deque consisting of Post records, which can be used as
+dictionaries. For more information about this structure, see
+get_files_from_a_page() method and domainparsers.records.
+
+Posts can also be consumed while the subreddit is still being crawled:
+
+```python3
+for post in reddit.iter_posts():
+    print(post['url'])
+```
 """
 
 
 import re
+import threading
 from contextlib import suppress
-from bs4 import BeautifulSoup
 from selenium import webdriver
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.common.by import By
 from selenium.common.exceptions import TimeoutException
 from selenium.common.exceptions import NoSuchElementException
+from domainparsers.formats import FormatPolicy
 from domainparsers.gfycat import Gfycat
 from domainparsers.imgur import Imgur
+from domainparsers.imgur import ImgurException
+from domainparsers.imgur import gifv_renditions
+from domainparsers.imgur import numerate
 from domainparsers.common import FileFormats
 from domainparsers.common import Domains
+from domainparsers.resolver import Resolver
+from domainparsers.parsing import InlineParser
+from domainparsers.records import Post
+from domainparsers.records import MediaItem
 from utils.politeness import get_politeness_factor
+from utils.metrics import Measurement
+from utils.metrics import COUNT
+from utils.metrics import OBSERVE
+from utils.crawlstate import Mark
 from collections import deque
 from itertools import groupby
+from time import perf_counter
 from time import sleep
+from urllib.parse import urlsplit
+from urllib.parse import urlunsplit
 
 
 __author__ = 'petarGitNik'
@@ -72,12 +95,50 @@ class RedditException(Exception):
 
 class Reddit(object):
 
-    def __init__(self, url, pages):
-        """
-        If variable fetch is set to False, then stop fetching pages.
+    # Domains whose pages have to be fetched to get a direct image link
+    RESOLVABLE_DOMAINS = (Domains.IMGUR, Domains.GFYCAT)
+
+    # A browser can render only one page at a time, also when it is shared
+    DRIVER_LOCK = threading.Lock()
+
+    def __init__(self, url, pages, resolvers=4, stop_at=None, cache=None,
+                 dead_links=None, queue=None, budgets=None, driver=None,
+                 parser=None, profiler=None, formats=None):
+        """
+        If variable fetch is set to False, then stop fetching pages. Resolvers
+        is the number of threads used to resolve links to direct image links.
+        Stop_at is the Mark of the newest post from a previous crawl. If it is
+        given, only newer posts are crawled. The newest crawled post is kept
+        in self.newest. Cache is a ResolutionCache of links resolved by
+        previous crawls, and dead_links is a DeadLinks cache of links which are
+        not fetched at all. If queue is a JobQueue, crawled posts are stored in
+        it, and an interrupted crawl continues where it stopped.
+
+        Budgets are DomainBudgets shared with other crawls. If they are given,
+        listing pages and pages on allowed domains are fetched within the
+        budget of their host. Driver is a browser shared with other crawls.
+        Pages are rendered in it one at a time, and it is not closed. Parser
+        extracts posts and images from fetched pages, e.g. a ProcessParser
+        which parses them on other cores, see domainparsers.parsing. By default
+        pages are parsed in the thread which fetched them. Profiler is a
+        StageProfiler which profiles Resolver threads, see utils.profiling.
+        Formats is a FormatPolicy which chooses the rendition of gfycat videos
+        and imgur .gifv animations, see domainparsers.formats.
         """
         self.url = self.sanitize(url)
         self.pages = self.normalize_pages(pages)
+        self.resolvers = resolvers
+        self.stop_at = stop_at
+        self.cache = cache
+        self.dead_links = dead_links
+        self.queue = queue
+        self.budgets = budgets
+        self.driver = driver
+        self.parser = parser or InlineParser()
+        self.profiler = profiler
+        self.formats = formats or FormatPolicy()
+        self.newest = None
+        self.complete = True
         self.images = deque() # consider changing images to posts
 
         self.fetch = True
@@ -97,9 +158,9 @@ class Reddit(object):
         """
         return 0 if not pages else pages
 
-    def make_beautiful_soup(self, url, driver, parser='lxml'):
+    def get_page_source(self, url, driver):
         """
-        Get soup object from url using selenium driver. If request is
+        Get HTML of a page from url using selenium driver. If request is
         redirected, then confirm redirect dialog.
         """
         driver.get(url)
@@ -111,7 +172,7 @@ class Reddit(object):
 
             self.confirm_redirect_dialog(driver)
 
-        return BeautifulSoup(driver.page_source, parser)
+        return driver.page_source
 
     def confirm_redirect_dialog(self, driver):
         """
@@ -135,73 +196,286 @@ class Reddit(object):
     def get_all_posts(self):
         """
         Crawl links of all posts, or posts from P number of pages. If P
-        i.e. 'pages' is 0, then crawl all pages.
+        i.e. 'pages' is 0, then crawl all pages. All posts are collected in
+        self.images. Use iter_posts() to process posts while crawling.
         """
-        driver = webdriver.PhantomJS()
+        self.images.extend(self.iter_posts())
+        return
 
+    def iter_posts(self):
+        """
+        Yield posts as soon as their page is parsed and their links are
+        resolved. Links to pages on allowed domains are resolved in the
+        background while next pages are crawled. The next page is crawled only
+        when the consumer asks for more posts, so posts are not accumulated in
+        memory. Observers are notified about the number of downloadable posts
+        after every page, and once more when fetching is finished.
+        """
+        resolver = Resolver(self, workers=self.resolvers)
+        self.downloadable = 0
+
+        try:
+            if self.queue:
+                # posts of an interrupted crawl which were not resolved
+                for post in self.queue.unresolved():
+                    resolver.submit(post)
+
+            for pictures in self.listing_pages():
+                for post in pictures:
+                    resolver.submit(post)
+                yield from self.count_downloadable(self.save_resolved(resolver.ready()))
+
+                if self.observers:
+                    self.update_observers(maximum=self.downloadable)
+
+            if not self.fetch:
+                resolver.cancel()
+            yield from self.count_downloadable(self.save_resolved(resolver.drain()))
+        finally:
+            resolver.close()
+
+        if self.fetch and self.observers:
+            # If fetching is not interupted, and there are observers
+            self.update_observers(fetched=True, maximum=self.downloadable)
+
+    def listing_pages(self):
+        """
+        Yield posts of every crawled listing page. Pages are rendered by
+        PhantomJS.
+        """
+        driver = self.driver or webdriver.PhantomJS()
+
+        def fetch_page(url):
+            with self.DRIVER_LOCK:
+                started = perf_counter()
+                html = self.get_page_source(url, driver)
+                self.measure_request('listing', url, perf_counter() - started, len(html))
+            return self.parse_page(self.get_files_from_a_page, html, url)
+
+        try:
+            yield from self.crawl_listing(fetch_page)
+        finally:
+            if self.driver is None: driver.close()
+
+    def crawl_listing(self, fetch_page):
+        """
+        Follow listing pages starting from self.url, and yield posts of each
+        page. Fetch_page takes a page url, and returns posts from that page and
+        the url of the next page. If 'pages' is 0, then crawl all pages.
+
+        If there is a mark from a previous crawl, posts which are not newer
+        than the mark are dropped, and crawling stops after the page whose
+        last post is not newer. Pinned posts at the top of a listing do not
+        stop the crawl this way.
+
+        If there is a queue, posts of each page are added to it, and only
+        posts which were not in the queue yet are yielded. An unfinished
+        crawl continues from the page where it stopped.
+
+        Fetch_page sets self.complete to False if a page could not be fetched.
+        Crawling stops there, and neither the frontier in the queue nor the
+        newest post moves past the page, so the next crawl fetches it again.
+        Any other error also leaves the crawl incomplete before it is raised.
+        """
+        self.complete = True
         crawl = True
         crawl_time = get_politeness_factor(Domains.REDDIT)
         page = 1 if self.pages else 0
         url = self.url # starting page
+        crawled = 0
 
-        while self.fetch and (page <= self.pages) and crawl:
-            soup = self.make_beautiful_soup(url, driver)
-            pictures, next_page = self.get_files_from_a_page(soup, url)
+        frontier = self.queue.frontier(self.url) if self.queue else None
+        if frontier:
+            url, crawled = frontier
+            if self.pages: page += crawled
+            if not url: crawl = False
 
-            self.images.extend(pictures)
-            url = next_page
+        try:
+            while self.fetch and (page <= self.pages) and crawl:
+                if self.budgets: self.wait_for_budget(url, 'listing')
+                pictures, next_page = fetch_page(url)
+                if not self.complete:
+                    break
+                crawled += 1
 
-            if self.pages: page += 1
-            if not next_page: crawl = False
+                if self.stop_at and pictures:
+                    if not self.is_new(pictures[-1]): next_page = None
+                    pictures = deque(post for post in pictures if self.is_new(post))
+                self.update_newest(pictures)
 
-            sleep(crawl_time)
+                if self.queue:
+                    pictures = self.queue.discover(pictures, self.url, next_page, crawled)
 
-        if self.fetch and self.observers:
-            # If fetching is not interupted, and there are observers
-            self.update_observers(
-                fetched=True,
-                maximum=self.count_downloadable_images()
-            )
+                yield pictures
+                url = next_page
 
-        driver.close()
-        return
+                if self.pages: page += 1
+                if not next_page: crawl = False
+
+                if crawl and not self.budgets:
+                    sleep(crawl_time)
+                    self.measure(COUNT, 'sleep_seconds_total', crawl_time, 'listing',
+                                 urlsplit(self.url).netloc)
+        except Exception:
+            self.complete = False
+            raise
+
+        if self.queue and self.fetch and self.complete:
+            self.queue.finish_listing(self.url)
+
+    def is_new(self, post):
+        """
+        Check if the post is newer than the mark from a previous crawl. Posts
+        without a timestamp are considered new.
+        """
+        posted_on = post['posted_on']
+        if posted_on and self.stop_at.posted_on and posted_on != self.stop_at.posted_on:
+            return posted_on > self.stop_at.posted_on
+        return post['link_to_comments'] != self.stop_at.url
+
+    def update_newest(self, posts):
+        """
+        Remember the newest of the crawled posts.
+        """
+        for post in posts:
+            posted_on = post['posted_on']
+            if posted_on and (not self.newest or posted_on > self.newest.posted_on):
+                self.newest = Mark(post['link_to_comments'], posted_on)
+
+    def save_resolved(self, posts):
+        """
+        Pass posts through, and mark them resolved in the queue.
+        """
+        for post in posts:
+            if self.queue: self.queue.resolve(post)
+            yield post
+
+    def count_downloadable(self, posts):
+        """
+        Pass posts through, and count those which have a direct link.
+        """
+        for post in posts:
+            if post['image']['url']: self.downloadable += 1
+            yield post
 
-    def get_files_from_a_page(self, soup, url=None):
+    def get_files_from_a_page(self, html, url=None):
         """
         Get links and other information to all files from a single page.
         Return link for next page if it exists.
         """
-        things = soup.find_all('div', attrs={'class' : re.compile(r'\sthing\sid-t3.+')})
-        images = deque({
-                'url' : self.get_post_url(div),
-                'image' : self.get_image(div),
-                'domain' : self.get_post_domain(div),
-                'second_level_domain_name' : self.known_domain(url),
-                'post_title' : self.get_post_title(div),
-                'posted_on' : self.get_post_timestamp(div),
-                'link_to_comments' : self.get_link_to_comments(div),
-                'on_page' : url,
-                'last_http_status' : None,
-                'http_status_token' : 0,
-            } for div in things
+        posts, next_page = self.parser.extract_posts(html)
+        images = deque(self.post_dictionary(
+                url=post_url,
+                domain=domain,
+                post_title=title,
+                posted_on=posted_on,
+                link_to_comments=link_to_comments,
+                on_page=url,
+            ) for post_url, domain, title, posted_on, link_to_comments in posts
         )
 
-        next_page_span = soup.find('span', attrs={'class' : 'next-button'})
-        next_page = next_page_span.a['href'] if next_page_span else None
-
         return (images, next_page)
 
-    def get_image(self, div):
+    def post_dictionary(self, url, domain, post_title, posted_on,
+                        link_to_comments, on_page):
+        """
+        Returns a Post describing a single post. Image is filled in only if
+        the post is a direct link to an image. Posts can be used as
+        dictionaries, see domainparsers.records.
+        """
+        return Post(
+            url=url,
+            image=self.get_image(url),
+            domain=domain,
+            second_level_domain_name=self.known_domain(on_page),
+            post_title=post_title,
+            posted_on=posted_on,
+            link_to_comments=link_to_comments,
+            on_page=on_page,
+            last_http_status=None,
+            http_status_token=0,
+        )
+
+    def get_image(self, url):
         """
-        Get image url and image filename.
+        Get image url and image filename. Only direct links are recognized
+        here, links to pages on allowed domains are left for the Resolver. The
+        format of a .gifv is chosen here, unless the format policy has to ask
+        for sizes, which is left for the Resolver as well.
         """
-        url = self.get_post_url(div)
+        renditions = gifv_renditions(url)
+        if renditions:
+            if self.formats.smallest:
+                return self.image_dictionary(None, None)
+            url = self.formats.choose(renditions)
         if self.known_file_format(url):
             return self.image_dictionary(url, self.get_image_filename(url))
+        return self.image_dictionary(None, None)
+
+    def needs_resolving(self, post):
+        """
+        Check if the post links to a page from which a direct image link can be
+        obtained.
+        """
+        return (not post['image']['url'] and
+                self.known_domain(post['url']) in self.RESOLVABLE_DOMAINS)
+
+    def resolve_image(self, url):
+        """
+        Get image url and image filename from a page on an allowed domain. This
+        method fetches the page, and is called by the Resolver.
+        """
         image_url = self.get_image_link_from_allowed_domain(url, self.known_domain(url))
+        return self.resolved_image(image_url)
+
+    def resolved_image(self, image_url):
+        """
+        Get image url and image filename from a resolved direct link, or None.
+        """
         filename = self.get_image_filename(image_url) if image_url else None
         return self.image_dictionary(image_url, filename)
 
+    def resolve_media(self, url):
+        """
+        Get all images from a page on an allowed domain, as a list of
+        MediaItems. An imgur album gives one MediaItem per image, in album
+        order, and other pages give a single MediaItem. This method fetches
+        the page, and is called by the Resolver.
+        """
+        if self.is_album(url):
+            return self.resolved_media(self.get_album_links(url))
+        return [self.resolve_image(url)]
+
+    def resolved_media(self, image_urls):
+        """
+        Get MediaItems from resolved direct links. Filenames of images from
+        an album are numbered, as by Imgur.numerate_images().
+        """
+        images = [self.resolved_image(image_url) for image_url in image_urls]
+        if len(images) > 1: numerate(images)
+        return images
+
+    def is_album(self, url):
+        """
+        Check if the url points to an imgur album.
+        """
+        if self.known_domain(url) != Domains.IMGUR or 'www.imgur' in url:
+            return False
+        try:
+            return Imgur(url).is_it_album()
+        except ImgurException:
+            return False
+
+    def get_album_links(self, url):
+        """
+        Get direct links to all images of an imgur album, in album order.
+        """
+        imgur = Imgur(url, parser=self.parser)
+        imgur.prepare_images()
+        if imgur.error:
+            raise imgur.error
+        return [image['url'] for image in imgur.images]
+
     def get_image_link_from_allowed_domain(self, url, domain):
         """
         Use correct domain parser.
@@ -214,15 +488,19 @@ class Reddit(object):
             # of that type. This is because when a user visits a link such as this:
             # www.imgur.com/album_hash they are re-directed to imgur.com/album_hash
             if 'www.imgur' in url: return None
+            if gifv_renditions(url):
+                return self.formats.choose(gifv_renditions(url), self.before_head_request)
 
-            imgur = Imgur(url)
+            imgur = Imgur(url, parser=self.parser)
             if imgur.is_it_image():
                 imgur.prepare_images()
+                if imgur.error:
+                    raise imgur.error
                 return imgur.images[0]['url']
             return None
 
         elif domain == Domains.GFYCAT:
-            return Gfycat(url).parse_gfycat()
+            return Gfycat(url).parse_gfycat(self.formats, self.before_head_request)
 
         elif domain == Domains.TUMBLR:
             return None
@@ -252,9 +530,9 @@ class Reddit(object):
 
     def image_dictionary(self, url, filename):
         """
-        Returns a dictionary with image url and corresponding filename.
+        Returns a MediaItem with image url and corresponding filename.
         """
-        return {'url' : url, 'filename' : filename}
+        return MediaItem(url, filename)
 
     def known_file_format(self, url):
         """
@@ -265,47 +543,6 @@ class Reddit(object):
                 return extension
         return None
 
-    def get_link_to_comments(self, div):
-        """
-        Get a link to a comment section.
-        """
-        li = div.find('li', attrs={'class' : 'first'})
-        return li.a['href']
-
-    def get_post_timestamp(self, div):
-        """
-        Get time and date when post was created.
-        """
-        time = div.find('time')
-        return time['datetime'] if time.has_attr('datetime') else None
-
-    def get_p_title_tag(self, div):
-        """
-        Get <p> tag with class="title".
-        """
-        return div.find('p', attrs={'class' : 'title'})
-
-    def get_post_url(self, div):
-        """
-        Get url of a post.
-        """
-        p = self.get_p_title_tag(div)
-        return p.a['href']
-
-    def get_post_domain(self, div):
-        """
-        Get domain of a post.
-        """
-        p = self.get_p_title_tag(div)
-        span = p.find('span', attrs={'class' : 'domain'})
-        return span.a.string
-
-    def get_post_title(self, div):
-        """
-        Get title of a post.
-        """
-        return self.get_p_title_tag(div).a.string
-
     def get_all_domains(self):
         """
         Get all domains from list of files.
@@ -360,3 +597,73 @@ class Reddit(object):
         """
         for observer in self.observers:
             observer.update(**kwargs)
+
+    def measure(self, kind, name, value, stage, domain=None):
+        """
+        Report a measurement to observers, see utils.metrics. Measurements are
+        reported from the crawling thread and from Resolver threads.
+        """
+        if self.observers:
+            self.update_observers(measurement=Measurement(kind, name, value, stage, domain))
+
+    def measure_request(self, stage, url, elapsed, size=None):
+        """
+        Report the duration, and the size if it is known, of a fetched page.
+        """
+        host = urlsplit(url).netloc
+        self.measure(COUNT, 'requests_total', 1, stage, host)
+        self.measure(OBSERVE, 'latency_seconds', elapsed, stage, host)
+        if size is not None:
+            self.measure(COUNT, 'bytes_total', size, stage, host)
+
+    def wait_for_budget(self, url, stage):
+        """
+        Wait until the host of url may be requested, and report the time
+        spent waiting.
+        """
+        started = perf_counter()
+        self.budgets.acquire(urlsplit(url).netloc)
+        self.measure(COUNT, 'sleep_seconds_total', perf_counter() - started, stage,
+                     urlsplit(url).netloc)
+
+    def before_head_request(self, url):
+        """
+        Wait for the budget of a host whose rendition is asked for its size by
+        the format policy, and count the request.
+        """
+        if self.budgets:
+            self.wait_for_budget(url, 'resolve')
+        self.measure(COUNT, 'requests_total', 1, 'resolve', urlsplit(url).netloc)
+
+    def parse_page(self, parse, page, url):
+        """
+        Get posts from a fetched listing page with parse, and report the time
+        it took.
+        """
+        started = perf_counter()
+        posts, next_page = parse(page, url)
+        self.measure(OBSERVE, 'latency_seconds', perf_counter() - started, 'parse')
+        return (posts, next_page)
+
+
+def chronological_listing(url):
+    """
+    Return the listing of a subreddit sorted by new, which an incremental
+    crawl needs to stop at the newest post of the previous crawl. The front
+    page of a subreddit, and its hot listing, are rewritten. Examples:
+
+    https://www.reddit.com/r/MemeEconomy/      ->  https://www.reddit.com/r/MemeEconomy/new/
+    https://www.reddit.com/r/MemeEconomy/hot/  ->  https://www.reddit.com/r/MemeEconomy/new/
+
+    Other sort orders (e.g. top, rising) raise RedditException.
+    """
+    parts = urlsplit(url)
+    path = [segment for segment in parts.path.split('/') if segment]
+    if len(path) < 2 or path[0] != 'r':
+        raise RedditException('Incremental crawls need a subreddit: {}'.format(url))
+    if len(path) > 3 or (len(path) == 3 and path[2] not in ('hot', 'new')):
+        raise RedditException(
+            'Incremental crawls need posts sorted by new: {}'.format(url)
+        )
+    return urlunsplit((parts.scheme, parts.netloc, '/r/{}/new/'.format(path[1]),
+                       parts.query, ''))
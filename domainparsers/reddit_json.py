@@ -0,0 +1,148 @@
+#!/usr/bin/python3
+
+
+"""
+This module contains a listing backend for Reddit which does not need a
+browser. Listing pages are read in reddit's JSON format over plain HTTP, and
+the 'after' cursor is followed to get the next page. Example usage:
+
+```python3
+reddit = RedditJson('https://www.reddit.com/r/MemeEconomy/', 2)
+reddit.get_all_posts()
+images = reddit.images
+```
+
+Posts have the same structure as posts from the Reddit class.
+"""
+
+
+import json
+from datetime import datetime
+from datetime import timezone
+from html import unescape
+from urllib.parse import urlsplit
+from urllib.parse import urlunsplit
+from urllib.parse import parse_qsl
+from urllib.parse import urlencode
+from urllib.error import HTTPError
+from urllib.error import URLError
+from collections import deque
+from time import perf_counter
+from domainparsers.reddit import Reddit
+from utils.metrics import COUNT
+from utils.httpclient import default_client
+
+
+__author__ = 'petarGitNik'
+__copyright__ = 'Copyright (c) 2017 petarGitNik petargitnik@gmail.com'
+__version__ = 'v0.1.0'
+__license__ = 'MIT'
+__email__ = 'petargitnik@gmail.com'
+__status__ = 'Development'
+
+
+class RedditJson(Reddit):
+    """
+    Reddit which crawls listing pages in JSON format instead of rendering them
+    in PhantomJS.
+    """
+
+    # Number of posts on a listing page, same as on a rendered listing page
+    POSTS_PER_PAGE = 25
+
+    def listing_pages(self):
+        """
+        Yield posts of every crawled listing page.
+        """
+        yield from self.crawl_listing(self.get_files_from_a_json_page)
+
+    def get_files_from_a_json_page(self, url):
+        """
+        Fetch a listing page in JSON format. Return posts from that page, and
+        the url of the next page. If the page cannot be fetched, crawling stops,
+        and the crawl is marked incomplete, see crawl_listing().
+        """
+        try:
+            listing = self.fetch_json(self.json_url(url))
+        except HTTPError as e:
+            print('Could not fetch listing, error status:', e.code)
+            self.measure(COUNT, 'errors_total', 1, 'listing', urlsplit(url).netloc)
+            self.complete = False
+            return (deque(), None)
+        except URLError as e:
+            print('Could not fetch listing:', e.reason)
+            self.measure(COUNT, 'errors_total', 1, 'listing', urlsplit(url).netloc)
+            self.complete = False
+            return (deque(), None)
+        return self.parse_page(self.get_files_from_json, listing, url)
+
+    def fetch_json(self, url):
+        """
+        Get a decoded JSON document from url. The listing is transferred
+        compressed, on a pooled connection of the shared HTTP client.
+        """
+        started = perf_counter()
+        with default_client.open(url, compressed=True) as r:
+            body = r.read()
+        self.measure_request('listing', url, perf_counter() - started, len(body))
+        return json.loads(body.decode('utf-8'))
+
+    def get_files_from_json(self, listing, url):
+        """
+        Get links and other information to all files from a decoded listing.
+        Return link for next page if it exists.
+        """
+        data = listing['data']
+        images = deque(self.post_dictionary(
+                url=unescape(child['data']['url']),
+                domain=child['data']['domain'],
+                post_title=unescape(child['data']['title']),
+                posted_on=self.get_json_timestamp(child['data']),
+                link_to_comments=self.get_json_link_to_comments(child['data']),
+                on_page=url,
+            ) for child in data['children'] if child['kind'] == 't3'
+        )
+
+        after = data.get('after')
+        next_page = self.page_url(after) if after else None
+
+        return (images, next_page)
+
+    def get_json_timestamp(self, post):
+        """
+        Get time and date when post was created, in the same format as the
+        datetime attribute of a rendered listing page.
+        """
+        created = post.get('created_utc')
+        if created is None:
+            return None
+        return datetime.fromtimestamp(created, timezone.utc).isoformat()
+
+    def get_json_link_to_comments(self, post):
+        """
+        Get a link to a comment section.
+        """
+        return ''.join(['https://www.reddit.com', post['permalink']])
+
+    def page_url(self, after):
+        """
+        Get the url of the listing page which follows the post 'after'.
+        """
+        scheme, netloc, path, query, fragment = urlsplit(self.url)
+        query = dict(parse_qsl(query))
+        query['after'] = after
+        return urlunsplit((scheme, netloc, path, urlencode(query), fragment))
+
+    def json_url(self, url):
+        """
+        Get the url of a listing page in JSON format. Examples:
+
+        https://www.reddit.com/r/pics/              ->  https://www.reddit.com/r/pics/.json?limit=25
+        https://www.reddit.com/r/pics/?after=t3_x   ->  https://www.reddit.com/r/pics/.json?after=t3_x&limit=25
+        """
+        scheme, netloc, path, query, fragment = urlsplit(url)
+        if not path.endswith('.json'):
+            path = ''.join([path, '.json'])
+        query = dict(parse_qsl(query))
+        query['limit'] = self.POSTS_PER_PAGE
+        return urlunsplit((scheme, netloc, path, urlencode(query), fragment))
@@ -0,0 +1,324 @@
+#!/usr/bin/python3
+
+
+"""
+Resolver turns posts which link to a page on an allowed domain (e.g. an imgur
+image page, or a gfycat page) into posts with direct image links. Pages are
+fetched by a bounded pool of threads, so listing pages can be crawled while
+links from previous pages are still being resolved. Example usage:
+
+```python3
+resolver = Resolver(reddit)
+for post in posts:
+    resolver.submit(post)
+
+resolved = list(resolver.drain())
+resolver.close()
+```
+
+Posts are yielded in the order they were submitted. If a link cannot be
+resolved in time after its page is requested, its post is yielded with the
+image url set to None. Time spent waiting for a free slot of the domain does
+not count, and neither does waiting for the budget of its host. A post which
+links to an imgur album is yielded once for every image of the album, see
+expand().
+
+A link is fetched only once, even if it is posted (e.g. crossposted) several
+times among the last RECENT_LINKS links, so memory does not grow with the
+length of a crawl. If the reddit object has a ResolutionCache, links resolved by earlier
+crawls are not fetched at all. If it has a DeadLinks cache, links which failed
+permanently are not fetched either, and new permanent failures are recorded.
+If it has DomainBudgets, pages are fetched within the budget of their host.
+Durations of fetched pages are reported as measurements of the 'resolve'
+stage to observers of the reddit object, see utils.metrics.
+"""
+
+
+import threading
+from collections import OrderedDict
+from collections import defaultdict
+from collections import deque
+from concurrent.futures import Future
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import TimeoutError
+from time import monotonic
+from time import perf_counter
+from urllib.parse import urlsplit
+from utils.metrics import Measurement
+from utils.metrics import COUNT
+from utils.metrics import OBSERVE
+
+
+__author__ = 'petarGitNik'
+__copyright__ = 'Copyright (c) 2017 petarGitNik petargitnik@gmail.com'
+__version__ = 'v0.1.0'
+__license__ = 'MIT'
+__email__ = 'petargitnik@gmail.com'
+__status__ = 'Development'
+
+
+class Resolution(Future):
+    """
+    Future of the images of a link. Its deadline is set when the link starts
+    being resolved, and is None while the link waits for a free slot.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.started = threading.Event()
+        self.deadline = None
+
+    def start(self, timeout):
+        self.deadline = monotonic() + timeout
+        self.started.set()
+
+
+class Resolver(object):
+    """
+    Resolves direct image links of posts in a pool of threads. At most
+    domain_limit links from the same domain are resolved at the same time, and
+    each link is given timeout seconds from the moment its page is requested,
+    after it got a free slot and the budget of its host.
+    """
+    # Number of links whose futures are kept for repeated posts
+    RECENT_LINKS = 1000
+
+    def __init__(self, reddit, workers=4, domain_limit=2, timeout=30):
+        self.reddit = reddit
+        self.domain_limit = domain_limit
+        self.timeout = timeout
+        self.cache = getattr(reddit, 'cache', None)
+        self.dead_links = getattr(reddit, 'dead_links', None)
+        self.budgets = getattr(reddit, 'budgets', None)
+        self.observers = getattr(reddit, 'observers', None)
+        profiler = getattr(reddit, 'profiler', None)
+        self.task = profiler.wrap('resolve', self.resolve) if profiler else self.resolve
+
+        self.pool = ThreadPoolExecutor(max_workers=workers)
+        self.lock = threading.Lock()
+        self.pending = defaultdict(deque)
+        self.active = defaultdict(int)
+
+        # (post, future) in order of submission
+        self.submitted = deque()
+        # futures of recently submitted links, by link
+        self.futures = OrderedDict()
+        # recently submitted links which are in the cache already
+        self.cached = OrderedDict()
+
+    def submit(self, post):
+        """
+        Queue a post for resolution. Posts which already have a direct link are
+        only kept in order.
+        """
+        if not self.reddit.needs_resolving(post):
+            self.submitted.append((post, None))
+            return
+
+        url = post['url']
+        future = self.futures.get(url)
+        if future is None:
+            future = self.lookup(url)
+
+        if future is None:
+            domain = self.reddit.known_domain(url)
+            future = Resolution()
+            with self.lock:
+                self.pending[domain].append((url, future))
+                self.start_next(domain)
+        self.keep(self.futures, url, future)
+        self.submitted.append((post, future))
+        self.measure(OBSERVE, 'queue_depth', len(self.submitted))
+
+    def lookup(self, url):
+        """
+        Return a finished future with the images of a link from the cache, or
+        None if the link has to be fetched. Dead links are finished without
+        images.
+        """
+        if self.dead_links is not None and self.dead_links.is_dead(url):
+            future = Future()
+            future.set_result([])
+            return future
+
+        if self.cache is None:
+            return None
+        media = self.cache.get(url)
+        if not media:
+            return None
+
+        self.keep(self.cached, url, True)
+        future = Future()
+        future.set_result(self.reddit.resolved_media(media))
+        return future
+
+    def start_next(self, domain):
+        """
+        Start resolving queued links of a domain while it has free slots. Lock
+        must be held by the caller.
+        """
+        queue = self.pending[domain]
+        while queue and self.active[domain] < self.domain_limit:
+            url, future = queue.popleft()
+            self.active[domain] += 1
+            self.pool.submit(self.run, domain, url, future)
+
+    def run(self, domain, url, future):
+        """
+        Resolve a single link, and free its slot. This method runs in a worker
+        thread. If the task fails before the link is resolved, e.g. because it
+        could not be profiled, the link fails.
+        """
+        try:
+            self.task(url, future)
+        except Exception as e:
+            if not future.done(): future.set_exception(e)
+        finally:
+            with self.lock:
+                self.active[domain] -= 1
+                self.start_next(domain)
+
+    def resolve(self, url, future):
+        """
+        Resolve a single link, and set the result of its future.
+        """
+        if not future.set_running_or_notify_cancel():
+            return
+        host = urlsplit(url).netloc
+        try:
+            if self.budgets:
+                started = perf_counter()
+                self.budgets.acquire(host)
+                self.measure(COUNT, 'sleep_seconds_total', perf_counter() - started, host)
+            # waiting for the budget of the host does not count
+            future.start(self.timeout)
+
+            started = perf_counter()
+            try:
+                future.set_result(self.reddit.resolve_media(url))
+            finally:
+                self.measure(COUNT, 'requests_total', 1, host)
+                self.measure(OBSERVE, 'latency_seconds', perf_counter() - started, host)
+        except Exception as e:
+            self.measure(COUNT, 'errors_total', 1, host)
+            future.set_exception(e)
+
+    def ready(self):
+        """
+        Yield submitted posts which are done, in order of submission, without
+        waiting for the rest.
+        """
+        while self.submitted:
+            post, future = self.submitted[0]
+            if future is not None and not future.done():
+                if future.deadline is None or monotonic() < future.deadline:
+                    return
+            self.submitted.popleft()
+            yield from self.finish(post, future)
+
+    def drain(self):
+        """
+        Yield all submitted posts in order of submission, waiting for each of
+        them until its deadline.
+        """
+        while self.submitted:
+            post, future = self.submitted.popleft()
+            yield from self.finish(post, future)
+
+    def finish(self, post, future):
+        """
+        Yield a post once its link is resolved, with its image filled in. A
+        link which waits for a free slot is waited for until it starts. If
+        resolution failed or timed out, the post is left without a direct
+        link.
+        """
+        if future is None:
+            yield post
+            return
+
+        images = []
+        try:
+            images = future.result(timeout=self.time_left(future))
+            self.remember(post['url'], images)
+        except TimeoutError:
+            future.cancel()
+            print('Resolving took too much time:', post['url'])
+        except Exception as e:
+            print('Could not resolve {}: {}'.format(post['url'], e))
+            if self.dead_links is not None:
+                self.dead_links.record(post['url'], e)
+        yield from self.expand(post, images)
+
+    def time_left(self, future):
+        """
+        Wait until a link starts being resolved, and return seconds left until
+        its deadline. Links which are done have no deadline.
+        """
+        while not future.done() and not future.started.wait(0.1):
+            pass
+        if future.done():
+            return None
+        return max(0, future.deadline - monotonic())
+
+    def expand(self, post, images):
+        """
+        Yield a post with a single image, or a copy of the post for every
+        image of an album. Copies are numbered by their part, starting from 1,
+        so each of them is downloaded as a job of its own.
+        """
+        if len(images) <= 1:
+            # a link posted several times gets a separate record each time
+            if images: post['image'] = images[0].copy()
+            yield post
+            return
+
+        for part, image in enumerate(images, start=1):
+            album_post = post.copy()
+            album_post['image'] = image.copy()
+            album_post['part'] = part
+            yield album_post
+
+    def remember(self, url, images):
+        """
+        Put a resolved link into the cache. Links which were not resolved to a
+        direct link are not cached.
+        """
+        urls = [image['url'] for image in images]
+        if self.cache is not None and urls and all(urls) and url not in self.cached:
+            self.cache.put(url, urls)
+        self.keep(self.cached, url, True)
+
+    def keep(self, links, url, value):
+        """
+        Put a link into an OrderedDict of recent links, and forget the least
+        recently used link when there are more than RECENT_LINKS.
+        """
+        links[url] = value
+        links.move_to_end(url)
+        if len(links) > self.RECENT_LINKS:
+            links.popitem(last=False)
+
+    def measure(self, kind, name, value, domain=None):
+        """
+        Report a measurement of the resolve stage to observers of the reddit
+        object.
+        """
+        if self.observers:
+            measurement = Measurement(kind, name, value, 'resolve', domain)
+            for observer in self.observers:
+                observer.update(measurement=measurement)
+
+    def cancel(self):
+        """
+        Cancel resolution of all links which have not been started yet.
+        """
+        for _, future in self.submitted:
+            if future is not None:
+                future.cancel()
+
+    def close(self):
+        """
+        Shut down the thread pool without waiting for running resolutions.
+        """
+        self.cancel()
+        self.pool.shutdown(wait=False)
@@ -237,13 +237,16 @@ class RedditApp(Frame):
 
             print(msg)
         except queue.Empty:
-            if getattr(self.reddit_listener, 'fetched', None):
-                print(self.reddit_listener.maximum)
-
-                self.progress_bar.configure(mode='determinate')
-                self.progress_bar['value'] = 0
+            if getattr(self.reddit_listener, 'maximum', None):
+                # Maximum grows while pages are fetched and downloaded
+                if str(self.progress_bar['mode']) != 'determinate':
+                    self.progress_bar.stop()
+                    self.progress_bar.configure(mode='determinate')
+                    self.progress_bar['value'] = 0
                 self.progress_bar['maximum'] = self.reddit_listener.maximum
 
+            if getattr(self.reddit_listener, 'fetched', None):
+                print(self.reddit_listener.maximum)
                 self.reddit_listener.fetched = False
 
             if (getattr(self.downloader_listener, 'currently_at', None) and
@@ -280,9 +283,9 @@ class DownloadThread(threading.Thread):
     def run(self):
         """
         Fetching of download links and downloading process are located here.
+        Downloading starts as soon as the first page is fetched.
         """
-        self.reddit.get_all_posts()
-        self.downloader.download_files()
+        self.downloader.download_stream(self.reddit.iter_posts())
 
         self.queue.put('Downloading finished')
 
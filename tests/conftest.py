@@ -0,0 +1,18 @@
+#!/usr/bin/python3
+
+
+import pytest
+from tests.helpers import FakeClock
+
+
+__author__ = 'petarGitNik'
+__copyright__ = 'Copyright (c) 2017 petarGitNik petargitnik@gmail.com'
+__version__ = 'v0.1.0'
+__license__ = 'MIT'
+__email__ = 'petargitnik@gmail.com'
+__status__ = 'Development'
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
@@ -0,0 +1,57 @@
+#!/usr/bin/python3
+
+
+import sqlite3
+from domainparsers.records import MediaItem
+from domainparsers.records import Post
+
+
+__author__ = 'petarGitNik'
+__copyright__ = 'Copyright (c) 2017 petarGitNik petargitnik@gmail.com'
+__version__ = 'v0.1.0'
+__license__ = 'MIT'
+__email__ = 'petargitnik@gmail.com'
+__status__ = 'Development'
+
+
+class FakeClock(object):
+    """
+    Clock which moves only when told to.
+    """
+
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+def make_post(number, host='i.redd.it', url=None, resolved=True, **fields):
+    """
+    Make a post whose direct link is image number on host. The post links to
+    url instead of the image if url is given, and its image is not known yet
+    if resolved is False. Any other field of the post is given by name.
+    """
+    direct = 'https://{}/{}.jpg'.format(host, number)
+    post = Post(
+        url=url or direct,
+        image=MediaItem(direct, '{}.jpg'.format(number)) if resolved else MediaItem(),
+        domain=host,
+        post_title='Post {}'.format(number),
+        link_to_comments='https://www.reddit.com/r/test/comments/{}/'.format(number),
+        on_page='https://www.reddit.com/r/test/',
+        http_status_token=0,
+    )
+    for name, value in fields.items():
+        post[name] = value
+    return post
+
+
+def count_rows(path):
+    """
+    Return the number of records committed to the database at path.
+    """
+    conn = sqlite3.connect(path)
+    count = conn.execute('SELECT COUNT(*) FROM images').fetchone()[0]
+    conn.close()
+    return count
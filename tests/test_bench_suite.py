@@ -0,0 +1,41 @@
+#!/usr/bin/python3
+
+
+from benchmarks.bench_suite import regressions
+
+
+__author__ = 'petarGitNik'
+__copyright__ = 'Copyright (c) 2017 petarGitNik petargitnik@gmail.com'
+__version__ = 'v0.1.0'
+__license__ = 'MIT'
+__email__ = 'petargitnik@gmail.com'
+__status__ = 'Development'
+
+
+BASELINE = {
+    'listing' : {'ops_per_sec' : 1000.0},
+    'imgur' : {'ops_per_sec' : 200.0},
+}
+
+
+def test_drop_beyond_limit_is_reported():
+    """
+    Test if only cases which dropped by more than max_regression percent from
+    the baseline are reported, together with the drop.
+    """
+    results = {
+        'listing' : {'ops_per_sec' : 750.0},
+        'imgur' : {'ops_per_sec' : 190.0},
+    }
+    assert regressions(results, BASELINE, max_regression=10) == [('listing', 25.0)]
+    assert regressions(results, BASELINE, max_regression=30) == []
+
+def test_cases_missing_from_baseline_are_ignored():
+    """
+    Test if cases which are not in the baseline are not compared.
+    """
+    results = {
+        'listing' : {'ops_per_sec' : 1000.0},
+        'gfycat' : {'ops_per_sec' : 1.0},
+    }
+    assert regressions(results, BASELINE, max_regression=10) == []
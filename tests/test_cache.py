@@ -0,0 +1,146 @@
+#!/usr/bin/python3
+
+
+import pytest
+import socket
+from urllib.error import HTTPError
+from urllib.error import URLError
+from utils.cache import ResolutionCache
+from utils.cache import DeadLinks
+from utils.cache import canonical_url
+
+
+__author__ = 'petarGitNik'
+__copyright__ = 'Copyright (c) 2017 petarGitNik petargitnik@gmail.com'
+__version__ = 'v0.1.0'
+__license__ = 'MIT'
+__email__ = 'petargitnik@gmail.com'
+__status__ = 'Development'
+
+
+@pytest.fixture
+def cache_path(tmp_path):
+    return str(tmp_path / 'cache.sqlite')
+
+def test_entries_persist(cache_path, clock):
+    """
+    Test if an entry is found by a later run.
+    """
+    cache = ResolutionCache(cache_path, clock=clock)
+    cache.put('https://imgur.com/a', ['https://i.imgur.com/a.jpg'])
+    cache.close()
+
+    cache = ResolutionCache(cache_path, clock=clock)
+    assert cache.get('https://imgur.com/a') == ['https://i.imgur.com/a.jpg']
+    assert cache.get('https://imgur.com/b') == None
+    assert cache.stats() == {'hits' : 1, 'misses' : 1, 'evictions' : 0}
+    cache.close()
+
+def test_entries_expire(cache_path, clock):
+    """
+    Test if an entry older than ttl is a miss.
+    """
+    cache = ResolutionCache(cache_path, ttl=60, clock=clock)
+    cache.put('https://imgur.com/a', ['https://i.imgur.com/a.jpg'])
+
+    clock.now += 59
+    assert cache.get('https://imgur.com/a') != None
+    clock.now += 2
+    assert cache.get('https://imgur.com/a') == None
+    cache.close()
+
+def test_least_recently_used_is_evicted(cache_path, clock):
+    """
+    Test if the least recently used entry is evicted when the cache is full.
+    """
+    cache = ResolutionCache(cache_path, max_entries=2, clock=clock)
+    for name in 'abc':
+        if name == 'c':
+            # a is used after b was stored, so b is the least recently used
+            cache.get('https://imgur.com/a')
+        cache.put('https://imgur.com/' + name, ['https://i.imgur.com/{}.jpg'.format(name)])
+        clock.now += 1
+
+    assert cache.get('https://imgur.com/a') != None
+    assert cache.get('https://imgur.com/b') == None
+    assert cache.get('https://imgur.com/c') != None
+    assert cache.stats()['evictions'] == 1
+    cache.close()
+
+def test_nothing_is_created_before_use(tmp_path, cache_path):
+    """
+    Test if the database is created only when the cache is used.
+    """
+    cache = ResolutionCache(cache_path)
+    cache.close()
+    assert not (tmp_path / 'cache.sqlite').exists()
+
+def test_canonical_url():
+    """
+    Test if variants of a link have the same canonical form.
+    """
+    assert canonical_url('http://I.imgur.com/jedEzFL.jpg?1') == 'https://i.imgur.com/jedEzFL.jpg'
+    assert canonical_url('https://i.imgur.com/jedEzFL.jpg#top') == 'https://i.imgur.com/jedEzFL.jpg'
+
+def test_dead_links_expire(cache_path, clock):
+    """
+    Test if a dead link is dead until its entry expires.
+    """
+    dead_links = DeadLinks(cache_path, ttl=60, clock=clock)
+    dead_links.add('https://i.imgur.com/a.jpg', 404)
+
+    assert dead_links.is_dead('http://i.imgur.com/a.jpg?1') == True
+    assert dead_links.is_dead('https://i.imgur.com/b.jpg') == False
+    clock.now += 61
+    assert dead_links.is_dead('https://i.imgur.com/a.jpg') == False
+    dead_links.close()
+
+def test_only_permanent_failures_are_recorded(cache_path, clock):
+    """
+    Test if only permanent statuses and missing hosts are recorded.
+    """
+    dead_links = DeadLinks(cache_path, clock=clock)
+
+    def http_error(url, status):
+        return HTTPError(url, status, 'error', None, None)
+
+    assert dead_links.record('https://a.com/1.jpg', http_error('https://a.com/1.jpg', 403)) == True
+    assert dead_links.record('https://a.com/2.jpg', http_error('https://a.com/2.jpg', 429)) == False
+    assert dead_links.record('https://a.com/3.jpg', http_error('https://a.com/3.jpg', 500)) == False
+    assert dead_links.record('https://a.com/4.jpg', URLError('timed out')) == False
+    missing = URLError(socket.gaierror(socket.EAI_NONAME, 'Name or service not known'))
+    assert [dead_links.record('https://gone.com/5.jpg', missing) for _ in range(3)] == [
+        False, False, True
+    ]
+
+    assert dead_links.is_dead('https://a.com/1.jpg') == True
+    assert dead_links.is_dead('https://a.com/2.jpg') == False
+    assert dead_links.is_dead('https://gone.com/any.jpg') == True
+    dead_links.close()
+
+def test_temporary_lookup_failure_is_not_recorded(cache_path, clock):
+    """
+    Test if a host is not taken as missing when its name could not be looked
+    up for the time being, e.g. while the network is down.
+    """
+    dead_links = DeadLinks(cache_path, clock=clock)
+    outage = URLError(socket.gaierror(socket.EAI_AGAIN, 'Temporary failure in name resolution'))
+    for _ in range(5):
+        assert dead_links.record('https://i.imgur.com/a.jpg', outage) == False
+
+    assert dead_links.is_dead('https://i.imgur.com/other.jpg') == False
+    dead_links.close()
+
+def test_caches_share_a_database(cache_path):
+    """
+    Test if both caches can be kept in the same database.
+    """
+    cache = ResolutionCache(cache_path)
+    dead_links = DeadLinks(cache_path)
+    cache.put('https://imgur.com/a', ['https://i.imgur.com/a.jpg'])
+    dead_links.add('https://i.imgur.com/b.jpg', 404)
+
+    assert cache.get('https://imgur.com/a') == ['https://i.imgur.com/a.jpg']
+    assert dead_links.is_dead('https://i.imgur.com/b.jpg') == True
+    cache.close()
+    dead_links.close()
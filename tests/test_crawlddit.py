@@ -0,0 +1,42 @@
+#!/usr/bin/python3
+
+
+import pytest
+from crawlddit import read_batch
+
+
+__author__ = 'petarGitNik'
+__copyright__ = 'Copyright (c) 2017 petarGitNik petargitnik@gmail.com'
+__version__ = 'v0.1.0'
+__license__ = 'MIT'
+__email__ = 'petargitnik@gmail.com'
+__status__ = 'Development'
+
+
+def test_read_batch(tmp_path):
+    """
+    Test if subreddits of a batch file are read with their page limits.
+    """
+    batch = tmp_path / 'subreddits.txt'
+    batch.write_text(
+        '# url directory [pages]\n'
+        'https://www.reddit.com/r/MemeEconomy/ ./memes 2\n'
+        '\n'
+        'https://www.reddit.com/r/pics/   ./pics\n'
+    )
+
+    assert read_batch(str(batch), pages=5) == [
+        ('https://www.reddit.com/r/MemeEconomy/', './memes', 2),
+        ('https://www.reddit.com/r/pics/', './pics', 5),
+    ]
+
+def test_invalid_batch_line(tmp_path):
+    """
+    Test if a line without a directory is reported with its line number.
+    """
+    batch = tmp_path / 'subreddits.txt'
+    batch.write_text('https://www.reddit.com/r/pics/\n')
+
+    with pytest.raises(ValueError) as e:
+        read_batch(str(batch))
+    assert ':1:' in str(e.value)
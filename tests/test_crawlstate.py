@@ -0,0 +1,50 @@
+#!/usr/bin/python3
+
+
+import pytest
+from utils.crawlstate import CrawlState
+from utils.crawlstate import Mark
+
+
+__author__ = 'petarGitNik'
+__copyright__ = 'Copyright (c) 2017 petarGitNik petargitnik@gmail.com'
+__version__ = 'v0.1.0'
+__license__ = 'MIT'
+__email__ = 'petargitnik@gmail.com'
+__status__ = 'Development'
+
+
+@pytest.fixture
+def mark():
+    return Mark('https://www.reddit.com/r/MemeEconomy/comments/6qx1a1/buy/',
+                '2017-08-01T12:00:00+00:00')
+
+def test_load_without_database(tmp_path):
+    """
+    Test if loading a mark does not create a database.
+    """
+    state = CrawlState(str(tmp_path))
+    assert state.load('https://www.reddit.com/r/MemeEconomy/') == None
+    assert not (tmp_path / 'db.sqlite').exists()
+
+def test_save_and_load(tmp_path, mark):
+    """
+    Test if a saved mark is loaded for the same listing only.
+    """
+    state = CrawlState(str(tmp_path))
+    state.save('https://www.reddit.com/r/MemeEconomy/new/', mark)
+
+    assert state.load('http://www.reddit.com/r/memeeconomy/new') == mark
+    assert state.load('https://www.reddit.com/r/MemeEconomy/') == None
+
+def test_save_replaces_mark(tmp_path, mark):
+    """
+    Test if a listing keeps only its latest mark.
+    """
+    state = CrawlState(str(tmp_path))
+    newer = Mark('https://www.reddit.com/r/MemeEconomy/comments/6qx1b2/sell/',
+                 '2017-08-01T13:00:00+00:00')
+    state.save('https://www.reddit.com/r/MemeEconomy/', mark)
+    state.save('https://www.reddit.com/r/MemeEconomy/', newer)
+
+    assert state.load('https://www.reddit.com/r/MemeEconomy/') == newer
@@ -0,0 +1,521 @@
+#!/usr/bin/python3
+
+
+import hashlib
+import io
+import os
+import pytest
+import sqlite3
+import threading
+from collections import deque
+from http.server import BaseHTTPRequestHandler
+from http.server import HTTPServer
+from socketserver import ThreadingMixIn
+from time import sleep
+from urllib.error import HTTPError
+from urllib.error import URLError
+from utils.downloader import Downloader
+from utils.downloader import DownloaderListener
+from utils.downloader import DownloaderException
+from utils.downloader import Content
+from utils.failurelog import FailureLog
+from utils.failurelog import load_failures
+from utils.cache import DeadLinks
+from utils.metadata import MetadataWriter
+from utils.politeness import DomainBudgets
+from tests.helpers import count_rows
+from tests.helpers import make_post
+
+
+__author__ = 'petarGitNik'
+__copyright__ = 'Copyright (c) 2017 petarGitNik petargitnik@gmail.com'
+__version__ = 'v0.1.0'
+__license__ = 'MIT'
+__email__ = 'petargitnik@gmail.com'
+__status__ = 'Development'
+
+
+class FakeReddit(object):
+    """
+    Stands in for Reddit, so no page has to be crawled.
+    """
+
+    def __init__(self, images):
+        self.images = deque(images)
+
+    def count_downloadable_images(self):
+        return len([post for post in self.images if post['image']['url']])
+
+
+@pytest.fixture
+def posts():
+    return [make_post(number, 'host{}.com'.format(number)) for number in range(6)]
+
+
+def fake_write(downloader, fail=None, content=lambda url: url.encode()):
+    """
+    Replace network access with writing the url, or content of the url, into
+    the file.
+    """
+    lock = threading.Lock()
+    downloader.calls = []
+
+    def write_file_to_filesystem(url, filename, previous=None):
+        with lock:
+            downloader.calls.append(url)
+        if fail and fail(url):
+            raise HTTPError(url, 404, 'Not Found', None, None)
+        with open(filename, 'wb') as f:
+            digest, size = downloader.copy_file(io.BytesIO(content(url)), f)
+        return Content(200, digest, size, None, None)
+
+    downloader.write_file_to_filesystem = write_file_to_filesystem
+
+
+def test_invalid_destination(tmp_path):
+    """
+    Test if the downloader refuses a destination which does not exist.
+    """
+    with pytest.raises(DownloaderException):
+        Downloader(FakeReddit([]), str(tmp_path / 'missing'))
+
+def test_concurrent_download(tmp_path, posts):
+    """
+    Test if all files are downloaded and recorded in db by a pool of workers.
+    """
+    downloader = Downloader(FakeReddit(posts), str(tmp_path), workers=4)
+    fake_write(downloader)
+    downloader.download_files()
+
+    assert sorted(downloader.calls) == sorted(post['url'] for post in posts)
+    for post in posts:
+        assert (tmp_path / post['image']['filename']).exists()
+
+    conn = sqlite3.connect(str(tmp_path / 'db.sqlite'))
+    rows = conn.execute('SELECT Downloaded FROM images').fetchall()
+    conn.close()
+    assert rows == [(1,)] * len(posts)
+
+def test_records_are_committed_during_long_download(tmp_path, posts, monkeypatch):
+    """
+    Test if the record of a finished download is committed in time while
+    another download still runs.
+    """
+    monkeypatch.setattr('utils.downloader.MetadataWriter',
+                        lambda path: MetadataWriter(path, commit_interval=0.2))
+    db_path = str(tmp_path / 'db.sqlite')
+    committed = []
+
+    def content(url):
+        if url == posts[1]['url']:
+            for _ in range(30):
+                if count_rows(db_path): break
+                sleep(0.1)
+            committed.append(count_rows(db_path))
+        return url.encode()
+
+    downloader = Downloader(FakeReddit(posts[:2]), str(tmp_path), workers=2)
+    fake_write(downloader, content=content)
+    downloader.download_files()
+
+    assert committed == [1]
+
+def test_failures_are_written_during_long_download(tmp_path, posts, monkeypatch):
+    """
+    Test if a failure is written to the log in time while another download
+    still runs.
+    """
+    monkeypatch.setattr('utils.downloader.FailureLog',
+                        lambda path: FailureLog(path, flush_interval=0.2))
+    log_path = str(tmp_path / 'failures.jsonl')
+    logged = []
+
+    def content(url):
+        if url == posts[1]['url']:
+            for _ in range(30):
+                if load_failures(log_path): break
+                sleep(0.1)
+            logged.append(len(load_failures(log_path)))
+        return url.encode()
+
+    downloader = Downloader(FakeReddit(posts[:2]), str(tmp_path), workers=2)
+    fake_write(downloader, fail=lambda url: url == posts[0]['url'], content=content)
+    downloader.download_files()
+
+    assert logged == [1]
+
+def test_failed_download_is_logged(tmp_path, posts):
+    """
+    Test if a missing file is recorded as not downloaded and logged.
+    """
+    downloader = Downloader(FakeReddit(posts), str(tmp_path), workers=2)
+    fake_write(downloader, fail=lambda url: url.endswith('/3.jpg'))
+    downloader.download_files()
+
+    conn = sqlite3.connect(str(tmp_path / 'db.sqlite'))
+    rows = conn.execute(
+        'SELECT LastHtmlStatusCode FROM images WHERE Downloaded = 0'
+    ).fetchall()
+    conn.close()
+    assert rows == [(404,)]
+    failures = load_failures(str(tmp_path / 'failures.jsonl'))
+    assert [f['post_url'] for f in failures] == [posts[3]['url']]
+    assert failures[0]['status'] == 404
+
+def test_same_filename_is_not_written_at_once(tmp_path):
+    """
+    Test if two files with the same filename, e.g. from two hosts, are never
+    downloaded at the same time, so they do not share a .part file.
+    """
+    posts = [make_post(number, 'host{}.com'.format(number)) for number in range(3)]
+    for post in posts[:2]:
+        post['image']['filename'] = 'same.jpg'
+    downloader = Downloader(FakeReddit(posts), str(tmp_path), workers=3)
+    lock = threading.Lock()
+    writing = []
+    overlaps = []
+
+    def write_file_to_filesystem(url, filename, previous=None):
+        with lock:
+            overlaps.append(filename in writing)
+            writing.append(filename)
+        sleep(0.05)
+        with lock:
+            writing.remove(filename)
+        return Content(200, url, 1, None, None)
+
+    downloader.write_file_to_filesystem = write_file_to_filesystem
+    downloader.download_files()
+
+    assert len(overlaps) == 3
+    assert not any(overlaps)
+
+def test_write_error_fails_only_the_file(tmp_path, posts):
+    """
+    Test if a file which cannot be written is logged as failed, and other
+    files are still downloaded.
+    """
+    downloader = Downloader(FakeReddit(posts), str(tmp_path), workers=2)
+    fake_write(downloader)
+    write = downloader.write_file_to_filesystem
+
+    def write_file_to_filesystem(url, filename, previous=None):
+        if url.endswith('/2.jpg'):
+            raise FileNotFoundError(2, 'No such file or directory', filename + '.part')
+        return write(url, filename, previous)
+
+    downloader.write_file_to_filesystem = write_file_to_filesystem
+    downloader.download_files()
+
+    failures = load_failures(str(tmp_path / 'failures.jsonl'))
+    assert [f['post_url'] for f in failures] == [posts[2]['url']]
+    assert len(downloader.calls) == len(posts) - 1
+
+def test_progress_is_reported(tmp_path, posts):
+    """
+    Test if observers are notified about download progress.
+    """
+    downloader = Downloader(FakeReddit(posts), str(tmp_path), workers=3)
+    listener = DownloaderListener()
+    downloader.register(listener)
+    fake_write(downloader)
+    downloader.download_files()
+
+    assert listener.currently_at == len(posts) + 1
+
+def test_download_stream(tmp_path, posts):
+    """
+    Test if posts are downloaded while they are still being produced, and if
+    the producer never runs far ahead of downloads.
+    """
+    downloader = Downloader(FakeReddit([]), str(tmp_path), workers=2, buffer_size=2)
+    fake_write(downloader)
+    ahead = []
+
+    def produce():
+        for number, post in enumerate(posts):
+            ahead.append(number - len(downloader.calls))
+            yield post
+
+    downloader.download_stream(produce())
+
+    assert sorted(downloader.calls) == sorted(post['url'] for post in posts)
+    assert downloader.total == downloader.received == len(posts)
+    # buffer, queue of the feed, post being put, and posts in flight
+    assert max(ahead) <= 2 + 2 + 1 + 2
+
+def test_download_stream_raises_error_of_producer(tmp_path, posts):
+    """
+    Test if posts produced before the producer failed are downloaded, and the
+    failure is raised afterwards.
+    """
+    downloader = Downloader(FakeReddit([]), str(tmp_path), workers=2)
+    fake_write(downloader)
+
+    def produce():
+        yield from posts[:2]
+        raise ValueError('page 2 is not a listing')
+
+    with pytest.raises(ValueError):
+        downloader.download_stream(produce())
+
+    assert sorted(downloader.calls) == sorted(post['url'] for post in posts[:2])
+
+def test_resume_skips_downloaded_files(tmp_path, posts):
+    """
+    Test if files recorded as downloaded are skipped without a request.
+    """
+    downloader = Downloader(FakeReddit(posts[:3]), str(tmp_path))
+    fake_write(downloader)
+    downloader.download_files()
+
+    renamed = make_post(7, 'other.com')
+    renamed['image']['filename'] = posts[0]['image']['filename']
+    downloader = Downloader(FakeReddit(posts + [renamed]), str(tmp_path),
+                            workers=3, resume=True)
+    fake_write(downloader)
+    downloader.download_files()
+
+    assert sorted(downloader.calls) == sorted([
+        posts[3]['url'], posts[4]['url'], posts[5]['url']
+    ])
+    assert downloader.skipped == 4
+
+def test_dead_links_are_not_requested(tmp_path, posts):
+    """
+    Test if a file which was missing in a previous run is not requested again.
+    """
+    dead_links = DeadLinks(str(tmp_path / 'cache.sqlite'))
+    for run in range(2):
+        downloader = Downloader(FakeReddit([dict(post) for post in posts]),
+                                str(tmp_path), workers=3, dead_links=dead_links)
+        fake_write(downloader, fail=lambda url: url.endswith('/3.jpg'))
+        downloader.download_files()
+
+    assert posts[3]['url'] not in downloader.calls
+    assert len(downloader.calls) == len(posts) - 1
+    assert downloader.dead == 1
+    assert downloader.currently_downloading == len(posts) + 1
+    dead_links.close()
+
+def test_duplicates_are_linked(tmp_path, posts):
+    """
+    Test if files with the same content are hard linked, and bytes saved are
+    counted.
+    """
+    downloader = Downloader(FakeReddit(posts), str(tmp_path), workers=3)
+    fake_write(downloader, content=lambda url: b'meme' * (url.endswith('/5.jpg') + 1))
+    downloader.download_files()
+
+    inodes = {os.stat(str(tmp_path / post['image']['filename'])).st_ino for post in posts}
+    assert len(inodes) == 2
+    assert downloader.duplicates == 4
+    assert downloader.bytes_saved == 4 * len(b'meme')
+    assert (tmp_path / '0.jpg').read_bytes() == b'meme'
+
+    conn = sqlite3.connect(str(tmp_path / 'db.sqlite'))
+    digests = conn.execute('SELECT DISTINCT Sha256 FROM images').fetchall()
+    conn.close()
+    assert len(digests) == 2
+
+def test_duplicates_are_skipped(tmp_path, posts):
+    """
+    Test if duplicates are deleted, and recorded with the original filename.
+    """
+    downloader = Downloader(FakeReddit(posts[:3]), str(tmp_path), dedup='skip')
+    fake_write(downloader, content=lambda url: b'meme')
+    downloader.download_files()
+
+    assert sorted(os.listdir(str(tmp_path))) == ['0.jpg', 'db.sqlite']
+    assert downloader.bytes_saved == 2 * len(b'meme')
+
+    conn = sqlite3.connect(str(tmp_path / 'db.sqlite'))
+    filenames = conn.execute('SELECT Filename FROM images').fetchall()
+    conn.close()
+    assert filenames == [('0.jpg',)] * 3
+
+
+def test_downloaders_run_at_the_same_time(tmp_path, posts):
+    """
+    Test if downloaders in separate threads write into their own directories,
+    share budgets, and leave the working directory alone.
+    """
+    budgets = DomainBudgets()
+    cwd = os.getcwd()
+    downloaders = []
+    for name in ('first', 'second'):
+        (tmp_path / name).mkdir()
+        group = [dict(post, image=dict(post['image'])) for post in posts]
+        if name == 'second':
+            for post in group:
+                post['image']['url'] = post['image']['url'].replace('host', 'other')
+        downloader = Downloader(FakeReddit(group), str(tmp_path / name),
+                                workers=3, budgets=budgets)
+        fake_write(downloader)
+        downloaders.append(downloader)
+
+    threads = [threading.Thread(target=d.download_files) for d in downloaders]
+    for thread in threads: thread.start()
+    for thread in threads: thread.join()
+
+    assert os.getcwd() == cwd
+    for downloader in downloaders:
+        assert downloader.scheduler.budgets is budgets
+        assert sorted(os.listdir(downloader.destination)) == sorted(
+            ['db.sqlite'] + [post['image']['filename'] for post in posts]
+        )
+
+
+DATA = bytes(range(256)) * 400
+ETAG = '"v1"'
+
+
+class Handler(BaseHTTPRequestHandler):
+    """
+    Server of a file which supports Range, If-Range and If-None-Match
+    requests. The file at /truncated is always cut short, and the file at
+    /flaky is cut short unless a part of it is requested. The file at /shifted
+    sends the whole file as a part of it.
+    """
+    protocol_version = 'HTTP/1.1'
+    requests = []
+
+    def do_GET(self):
+        self.requests.append((self.path, dict(self.headers)))
+        if self.headers.get('If-None-Match') == ETAG:
+            self.send_response(304)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+
+        offset = 0
+        if self.headers.get('Range') and self.headers.get('If-Range') == ETAG:
+            offset = int(self.headers['Range'][len('bytes='):-1])
+        partial = bool(offset)
+        if self.path == '/shifted': offset = 0
+        body = DATA[offset:]
+
+        self.send_response(206 if partial else 200)
+        if partial:
+            self.send_header('Content-Range', 'bytes {}-{}/{}'.format(
+                offset, len(DATA) - 1, len(DATA)))
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('ETag', ETAG)
+        self.end_headers()
+        if self.path == '/truncated' or (self.path == '/flaky' and not offset):
+            self.wfile.write(body[:len(body) // 2])
+            self.close_connection = True
+        else:
+            self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class Server(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+
+@pytest.fixture(scope='module')
+def server():
+    server = Server(('127.0.0.1', 0), Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield 'http://127.0.0.1:{}'.format(server.server_address[1])
+    server.shutdown()
+    server.server_close()
+
+@pytest.fixture
+def downloader(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    del Handler.requests[:]
+    return Downloader(FakeReddit([]), str(tmp_path))
+
+def test_partial_file_is_resumed(tmp_path, server, downloader):
+    """
+    Test if a .part file left by an interrupted download is continued with a
+    Range request if the file did not change, and renamed when it is complete.
+    """
+    (tmp_path / 'a.jpg.part').write_bytes(DATA[:1000])
+    downloader.save_validators('a.jpg', server + '/file', ETAG, None)
+    content = downloader.write_file_to_filesystem(server + '/file', 'a.jpg')
+
+    assert Handler.requests[0][1]['Range'] == 'bytes=1000-'
+    assert Handler.requests[0][1]['If-Range'] == ETAG
+    assert (tmp_path / 'a.jpg').read_bytes() == DATA
+    assert sorted(os.listdir(str(tmp_path))) == ['a.jpg']
+    assert content == Content(206, hashlib.sha256(DATA).hexdigest(), len(DATA), ETAG, None)
+
+def test_changed_file_is_not_resumed(tmp_path, server, downloader):
+    """
+    Test if a .part file of a file which changed on the server is replaced by
+    the whole new file.
+    """
+    (tmp_path / 'a.jpg.part').write_bytes(b'x' * 1000)
+    downloader.save_validators('a.jpg', server + '/file', '"v0"', None)
+    content = downloader.write_file_to_filesystem(server + '/file', 'a.jpg')
+
+    assert Handler.requests[0][1]['If-Range'] == '"v0"'
+    assert (tmp_path / 'a.jpg').read_bytes() == DATA
+    assert content.status == 200
+
+def test_partial_file_of_unknown_response_is_not_resumed(tmp_path, server, downloader):
+    """
+    Test if a .part file is not continued if it is not known which response
+    it came from, e.g. a .part of another url with the same filename.
+    """
+    (tmp_path / 'a.jpg.part').write_bytes(b'x' * 1000)
+    downloader.save_validators('a.jpg', server + '/other', ETAG, None)
+    downloader.write_file_to_filesystem(server + '/file', 'a.jpg')
+
+    assert 'Range' not in Handler.requests[0][1]
+    assert (tmp_path / 'a.jpg').read_bytes() == DATA
+
+def test_misplaced_range_is_not_appended(tmp_path, server, downloader):
+    """
+    Test if a part which does not start at the end of the .part file starts
+    the download over.
+    """
+    (tmp_path / 'a.jpg.part').write_bytes(DATA[:1000])
+    downloader.save_validators('a.jpg', server + '/shifted', ETAG, None)
+    downloader.write_file_to_filesystem(server + '/shifted', 'a.jpg')
+
+    assert [headers.get('Range') for _, headers in Handler.requests] == ['bytes=1000-', None]
+    assert (tmp_path / 'a.jpg').read_bytes() == DATA
+
+def test_truncated_file_is_not_renamed(tmp_path, server, downloader):
+    """
+    Test if a file which did not arrive completely is left as a .part file.
+    """
+    with pytest.raises(URLError):
+        downloader.write_file_to_filesystem(server + '/truncated', 'a.jpg')
+
+    assert not (tmp_path / 'a.jpg').exists()
+    assert (tmp_path / 'a.jpg.part').read_bytes() == DATA[:len(DATA) // 2]
+
+def test_dropped_connection_is_resumed(tmp_path, server, downloader):
+    """
+    Test if a download which made progress is continued after the connection
+    dropped.
+    """
+    post = make_post(1, 'example.com')
+    post['image']['url'] = server + '/flaky'
+    error, content = downloader.download_file(post)
+
+    assert error == None
+    assert [path for path, _ in Handler.requests] == ['/flaky', '/flaky']
+    assert (tmp_path / '1.jpg').read_bytes() == DATA
+    assert content.digest == hashlib.sha256(DATA).hexdigest()
+
+def test_unchanged_file_is_not_fetched(tmp_path, server, downloader):
+    """
+    Test if a file downloaded before is requested conditionally, and kept if
+    it did not change.
+    """
+    (tmp_path / 'a.jpg').write_bytes(b'old')
+    previous = Content(304, 'digest', 3, ETAG, None)
+    content = downloader.write_file_to_filesystem(server + '/file', 'a.jpg', previous)
+
+    assert Handler.requests[0][1]['If-None-Match'] == ETAG
+    assert content == previous
+    assert (tmp_path / 'a.jpg').read_bytes() == b'old'
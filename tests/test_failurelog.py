@@ -0,0 +1,103 @@
+#!/usr/bin/python3
+
+
+import pytest
+from utils.failurelog import FailureLog
+from utils.failurelog import load_failures
+from tests.helpers import make_post
+
+
+__author__ = 'petarGitNik'
+__copyright__ = 'Copyright (c) 2017 petarGitNik petargitnik@gmail.com'
+__version__ = 'v0.1.0'
+__license__ = 'MIT'
+__email__ = 'petargitnik@gmail.com'
+__status__ = 'Development'
+
+
+def failed_post(number, status=404, retries=0):
+    return make_post(number, 'i.imgur.com', url='https://imgur.com/{}'.format(number),
+                     domain='imgur.com', last_http_status=status,
+                     http_status_token=retries)
+
+
+@pytest.fixture
+def log_path(tmp_path):
+    return str(tmp_path / 'failures.jsonl')
+
+def test_entries_are_buffered(log_path):
+    """
+    Test if entries are written only when the buffer is full.
+    """
+    log = FailureLog(log_path, buffer_size=2, flush_interval=60)
+    log.write(failed_post(1))
+    assert load_failures(log_path) == []
+
+    log.write(failed_post(2))
+    assert len(load_failures(log_path)) == 2
+    log.close()
+
+def test_entries_are_flushed_without_new_entries(log_path, clock, monkeypatch):
+    """
+    Test if a pending entry is written once flush_interval has passed, even
+    if no other failure arrives.
+    """
+    monkeypatch.setattr('utils.failurelog.monotonic', clock)
+    log = FailureLog(log_path, buffer_size=100, flush_interval=5)
+    log.write(failed_post(1))
+    clock.now += 4
+    log.maybe_flush()
+    assert load_failures(log_path) == []
+
+    clock.now += 1
+    log.maybe_flush()
+    assert len(load_failures(log_path)) == 1
+    log.close()
+
+def test_entries_are_written_on_close(log_path):
+    """
+    Test if pending entries are written when the log is closed.
+    """
+    log = FailureLog(log_path, buffer_size=100, flush_interval=60)
+    log.write(failed_post(1, status=500, retries=3), reason='Server Error')
+    log.close()
+
+    failure, = load_failures(log_path)
+    assert failure['post_url'] == 'https://imgur.com/1'
+    assert failure['image_url'] == 'https://i.imgur.com/1.jpg'
+    assert failure['domain'] == 'imgur.com'
+    assert failure['status'] == 500
+    assert failure['retries'] == 3
+    assert failure['reason'] == 'Server Error'
+
+def test_entries_are_appended(log_path):
+    """
+    Test if a later run appends to the log of an earlier one.
+    """
+    for number in range(2):
+        log = FailureLog(log_path)
+        log.write(failed_post(number))
+        log.close()
+
+    assert [f['post_url'] for f in load_failures(log_path)] == [
+        'https://imgur.com/0', 'https://imgur.com/1'
+    ]
+
+def test_no_failures_no_file(tmp_path, log_path):
+    """
+    Test if the file is not created when nothing failed.
+    """
+    FailureLog(log_path).close()
+    assert not (tmp_path / 'failures.jsonl').exists()
+
+def test_load_skips_broken_lines(log_path):
+    """
+    Test if a line cut short by a crash is ignored.
+    """
+    log = FailureLog(log_path)
+    log.write(failed_post(1))
+    log.close()
+    with open(log_path, 'a') as f:
+        f.write('{"post_url": "https://imgur.com/')
+
+    assert len(load_failures(log_path)) == 1
@@ -0,0 +1,122 @@
+#!/usr/bin/python3
+
+
+import os
+import pytest
+import sqlite3
+from benchmarks.fakesite import FakeServer
+from benchmarks.fakesite import FakeSite
+from domainparsers.formats import FormatPolicy
+from domainparsers.reddit_json import RedditJson
+from utils.downloader import Downloader
+from utils.httpclient import default_client
+from utils.politeness import DomainBudgets
+
+
+__author__ = 'petarGitNik'
+__copyright__ = 'Copyright (c) 2017 petarGitNik petargitnik@gmail.com'
+__version__ = 'v0.1.0'
+__license__ = 'MIT'
+__email__ = 'petargitnik@gmail.com'
+__status__ = 'Development'
+
+
+@pytest.fixture
+def site():
+    # seed 1 has a post of every kind
+    return FakeSite(pages=2, posts_per_page=10, min_size=1024, max_size=4096, seed=1)
+
+@pytest.fixture
+def server(site, monkeypatch):
+    server = FakeServer(site)
+    server.start()
+    monkeypatch.setattr(default_client, 'hosts', server.hosts())
+    yield server
+    default_client.close()
+    server.stop()
+
+def expected_files(site):
+    """
+    Return filenames of downloadable media of the site.
+    """
+    filenames = set()
+    for _, url, domain, _, _ in site.posts:
+        name = url.split('/')[-1] if url else None
+        if domain == 'i.imgur.com' and name.endswith('.gifv'):
+            # the default format of a .gifv is the much smaller .mp4
+            filenames.add(name[:-len('.gifv')] + '.mp4')
+        elif domain == 'i.imgur.com':
+            filenames.add(name)
+        elif domain == 'imgur.com' and '/a/' in url:
+            filenames.update('{}-{}{}'.format(part, *image)
+                             for part, image in enumerate(site.albums[name], start=1))
+        elif domain == 'imgur.com':
+            filenames.add(name + site.images[name])
+        elif domain == 'gfycat.com':
+            filenames.add(name + '.webm')
+    return filenames
+
+def test_listing_pages(site):
+    """
+    Test if listing pages follow each other, and the last one has no next page.
+    """
+    html = site.listing_html('fake', None)
+    assert 'next-button' in html
+    assert site.page_posts(None)[1] == site.posts[9][0]
+    assert site.page_posts('t3_' + site.posts[9][0]) == (site.posts[10:], None)
+    assert site.page_posts('t3_unknown') == ([], None)
+
+def test_crawl_against_fake_server(site, server, tmpdir):
+    """
+    Test if a full crawl downloads every downloadable file of the fake site,
+    including every image of an album.
+    """
+    budgets = DomainBudgets(burst=100)
+    reddit = RedditJson('https://www.reddit.com/r/fake/', 2, budgets=budgets)
+    downloader = Downloader(reddit, str(tmpdir), workers=4, budgets=budgets)
+    downloader.download_stream(reddit.iter_posts())
+
+    downloaded = set(os.listdir(str(tmpdir))) - {'db.sqlite', 'failures.jsonl'}
+    assert downloaded == expected_files(site)
+    for filename in downloaded:
+        assert os.path.getsize(str(tmpdir.join(filename))) >= 1024
+
+def test_smallest_format(site, server, tmpdir):
+    """
+    Test if the smallest rendition of every animation is downloaded, and its
+    format is recorded in the database.
+    """
+    budgets = DomainBudgets(burst=100)
+    reddit = RedditJson('https://www.reddit.com/r/fake/', 2, budgets=budgets,
+                        formats=FormatPolicy(smallest=True))
+    downloader = Downloader(reddit, str(tmpdir), workers=4, budgets=budgets)
+    downloader.download_stream(reddit.iter_posts())
+
+    expected = {}
+    for _, url, domain, _, _ in site.posts:
+        if domain == 'gfycat.com':
+            name = url.split('/')[-1]
+            renditions = ['{}{}'.format(name, extension) for extension in ('.webm', '.mp4')]
+            expected[name] = min(renditions, key=lambda filename:
+                                 site.media_size('zippy.gfycat.com', '/' + filename))
+        elif url and url.endswith('.gifv'):
+            expected[url] = url.split('/')[-1][:-len('.gifv')] + '.mp4'
+
+    conn = sqlite3.connect(str(tmpdir.join('db.sqlite')))
+    rows = dict(conn.execute('SELECT Filename, Format FROM images WHERE Downloaded = 1'))
+    conn.close()
+    assert set(expected.values()) <= set(os.listdir(str(tmpdir)))
+    for filename in expected.values():
+        assert rows[filename] == filename.split('.')[-1]
+    assert rows[[name for name in rows if name.endswith('.jpg')][0]] == 'jpg'
+
+def test_injected_errors(site):
+    """
+    Test if the server injects errors and stalls at the given rates.
+    """
+    server = FakeServer(site, error_rate=0.5, stall_rate=0.25)
+    faults = [server.fault() for _ in range(1000)]
+    server.server_close()
+
+    assert 400 < sum(fault in FakeServer.ERROR_STATUSES for fault in faults) < 600
+    assert 150 < faults.count('stall') < 350
@@ -0,0 +1,116 @@
+#!/usr/bin/python3
+
+
+import pytest
+from benchmarks.fakesite import FakeServer
+from benchmarks.fakesite import FakeSite
+from domainparsers.formats import FormatPolicy
+from domainparsers.formats import format_of
+from domainparsers.formats import parse_preference
+from domainparsers.gfycat import Gfycat
+from domainparsers.imgur import gifv_renditions
+from utils.httpclient import default_client
+
+
+__author__ = 'petarGitNik'
+__copyright__ = 'Copyright (c) 2017 petarGitNik petargitnik@gmail.com'
+__version__ = 'v0.1.0'
+__license__ = 'MIT'
+__email__ = 'petargitnik@gmail.com'
+__status__ = 'Development'
+
+
+RENDITIONS = [
+    'https://zippy.gfycat.com/Meme.mp4',
+    'https://zippy.gfycat.com/Meme.webm',
+    'https://zippy.gfycat.com/Meme.gif',
+]
+
+
+@pytest.fixture
+def site():
+    return FakeSite(pages=1, posts_per_page=20, min_size=1024, max_size=4096, seed=1)
+
+@pytest.fixture
+def server(site, monkeypatch):
+    server = FakeServer(site)
+    server.start()
+    monkeypatch.setattr(default_client, 'hosts', server.hosts())
+    yield server
+    default_client.close()
+    server.stop()
+
+def test_preference():
+    """
+    Test if the rendition whose format is preferred the most is chosen, and
+    formats which are not in the preference come last.
+    """
+    assert FormatPolicy().choose(RENDITIONS) == RENDITIONS[1]
+    assert FormatPolicy(['.gif', '.mp4']).choose(RENDITIONS) == RENDITIONS[2]
+    assert FormatPolicy(['.mkv']).choose(RENDITIONS) == RENDITIONS[0]
+    assert FormatPolicy().choose([None]) == None
+
+def test_parse_preference():
+    """
+    Test if a list of formats from the command line is turned into extensions.
+    """
+    assert parse_preference('mp4, .WEBM,gif,') == ['.mp4', '.webm', '.gif']
+
+def test_gifv_renditions():
+    """
+    Test if a .gifv is available as .mp4 and as .gif.
+    """
+    assert gifv_renditions('https://i.imgur.com/jedEzFL.gifv?1') == [
+        'https://i.imgur.com/jedEzFL.mp4', 'https://i.imgur.com/jedEzFL.gif'
+    ]
+    assert gifv_renditions('https://i.imgur.com/jedEzFL.gif') == []
+
+def test_format_of():
+    """
+    Test if the format recorded in the database is taken from the direct link.
+    """
+    assert format_of('https://i.imgur.com/jedEzFL.mp4?1') == 'mp4'
+    assert format_of('https://i.imgur.com/jedEzFL.JPG') == 'jpg'
+    assert format_of('https://imgur.com/jedEzFL') == None
+    assert format_of(None) == None
+
+def test_smallest(site, server):
+    """
+    Test if the smallest rendition is chosen by sizes from HEAD requests,
+    without transferring the renditions.
+    """
+    gifv = [post[1] for post in site.posts if post[1] and post[1].endswith('.gifv')][0]
+    requested = []
+    policy = FormatPolicy(smallest=True)
+
+    chosen = policy.choose(gifv_renditions(gifv), requested.append)
+
+    assert chosen == gifv_renditions(gifv)[0]
+    assert requested == gifv_renditions(gifv)
+    assert server.stats()['bytes'] == 0
+
+def test_unknown_size_falls_back_to_preference(site, server):
+    """
+    Test if renditions whose size is not known are chosen by preference,
+    after renditions of a known size.
+    """
+    gifv = [post[1] for post in site.posts if post[1] and post[1].endswith('.gifv')][0]
+    missing = 'https://i.imgur.com/missing.webm'
+    policy = FormatPolicy(['.webm', '.gif'], smallest=True)
+
+    assert policy.choose([missing] + gifv_renditions(gifv)) == gifv_renditions(gifv)[0]
+    assert policy.choose([missing, 'https://i.imgur.com/missing.mp4']) == missing
+
+def test_gfycat_renditions(site, server):
+    """
+    Test if both full-size renditions of a gfycat video are found, and .webm
+    is chosen by default.
+    """
+    name = sorted(site.gfycats)[0]
+    gfycat = Gfycat('https://gfycat.com/{}'.format(name))
+
+    assert gfycat.renditions() == [
+        'https://zippy.gfycat.com/{}.webm'.format(name),
+        'https://zippy.gfycat.com/{}.mp4'.format(name),
+    ]
+    assert gfycat.parse_gfycat() == 'https://zippy.gfycat.com/{}.webm'.format(name)
@@ -0,0 +1,156 @@
+#!/usr/bin/python3
+
+
+import gzip
+import pytest
+import threading
+from http.server import BaseHTTPRequestHandler
+from http.server import HTTPServer
+from socketserver import ThreadingMixIn
+from time import sleep
+from urllib.error import HTTPError
+from urllib.error import URLError
+from utils.httpclient import HttpClient
+
+
+__author__ = 'petarGitNik'
+__copyright__ = 'Copyright (c) 2017 petarGitNik petargitnik@gmail.com'
+__version__ = 'v0.1.0'
+__license__ = 'MIT'
+__email__ = 'petargitnik@gmail.com'
+__status__ = 'Development'
+
+
+PAGE = b'<html><body>' + b'<p>meme</p>' * 1000 + b'</body></html>'
+
+
+class Handler(BaseHTTPRequestHandler):
+    """
+    Keep-alive server with a page, a redirect, a missing file, a page which
+    never arrives, and a page with the requested host.
+    """
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        if self.path == '/page':
+            body = PAGE
+            headers = {}
+            if 'gzip' in self.headers.get('Accept-Encoding', ''):
+                body = gzip.compress(PAGE)
+                headers['Content-Encoding'] = 'gzip'
+            self.reply(200, body, headers)
+        elif self.path == '/moved':
+            self.reply(301, b'', {'Location' : '/page'})
+        elif self.path == '/host':
+            self.reply(200, self.headers['Host'].encode())
+        elif self.path == '/slow':
+            sleep(1)
+            self.reply(200, b'late')
+        else:
+            self.reply(404, b'not found')
+
+    def reply(self, status, body, headers=None):
+        self.send_response(status)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class Server(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+
+@pytest.fixture(scope='module')
+def server():
+    server = Server(('127.0.0.1', 0), Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield 'http://127.0.0.1:{}'.format(server.server_address[1])
+    server.shutdown()
+    server.server_close()
+
+@pytest.fixture
+def client():
+    client = HttpClient(connect_timeout=1, read_timeout=0.3)
+    yield client
+    client.close()
+
+def test_connections_are_reused(server, client):
+    """
+    Test if consecutive requests to the same host share a connection.
+    """
+    for _ in range(3):
+        with client.open(server + '/page') as r:
+            assert r.read() == PAGE
+
+    stats = client.stats()
+    assert stats['requests'] == 3
+    assert stats['opened'] == 1
+    assert stats['reused'] == 2
+
+def test_compressed_page_is_decompressed(server, client):
+    """
+    Test if a gzip encoded page is decompressed while it is read in chunks.
+    """
+    with client.open(server + '/page', compressed=True) as r:
+        assert r.getheader('Content-Encoding') == 'gzip'
+        chunks = []
+        chunk = r.read(1000)
+        while chunk:
+            chunks.append(chunk)
+            chunk = r.read(1000)
+
+    assert b''.join(chunks) == PAGE
+    assert max(len(chunk) for chunk in chunks) == 1000
+
+def test_redirect_is_followed(server, client):
+    """
+    Test if redirects are followed on the same connection.
+    """
+    with client.open(server + '/moved') as r:
+        assert r.url == server + '/page'
+        assert r.read() == PAGE
+    assert client.stats()['opened'] == 1
+
+def test_error_status(server, client):
+    """
+    Test if error statuses raise the same exception urllib raises.
+    """
+    with pytest.raises(HTTPError) as e:
+        client.open(server + '/missing')
+    assert e.value.code == 404
+
+    # connection is still usable after an error status
+    with client.open(server + '/page') as r:
+        r.read()
+    assert client.stats()['opened'] == 1
+
+def test_read_timeout(server, client):
+    """
+    Test if a server which does not answer in time raises URLError.
+    """
+    with pytest.raises(URLError):
+        client.open(server + '/slow')
+
+def test_unreachable_host(client):
+    """
+    Test if a refused connection raises URLError.
+    """
+    with pytest.raises(URLError):
+        client.open('http://127.0.0.1:1/page')
+
+def test_hosts_are_served_locally(server):
+    """
+    Test if requests to a host from hosts are sent to the given server over
+    plain HTTP, with the original host in the Host header.
+    """
+    address, port = server.split('//')[1].split(':')
+    client = HttpClient(hosts={'i.imgur.com' : (address, int(port))})
+    with client.open('https://i.imgur.com/host') as r:
+        assert r.read() == b'i.imgur.com'
+    client.close()
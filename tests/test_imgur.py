@@ -212,6 +212,17 @@ def test_duplicates(single_image_without_extension, album_gallery):
     assert single_image_without_extension.remove_duplicates(candidate_1) == [('jedEzFL', '.jpg')]
     assert album_gallery.remove_duplicates(candidate_2) == [('jedEzFL', '.jpg'), ('lciC5G8', '.jpg')]
 
+def test_duplicates_keep_album_order(album_gallery):
+    """
+    Test if removing duplicates keeps the first occurrence of every image in
+    its place.
+    """
+    candidate = [('lciC5G8', '.jpg'), ('jedEzFL', '.png'), ('lciC5G8', '.jpg'),
+                 ('aaaaaaa', '.gif'), ('jedEzFL', '.png')]
+    assert album_gallery.remove_duplicates(candidate) == [
+        ('lciC5G8', '.jpg'), ('jedEzFL', '.png'), ('aaaaaaa', '.gif')
+    ]
+
 def test_build_image_links(album_gallery):
     """
     Test if the input list of filename tuples returns direct links to images.
@@ -0,0 +1,194 @@
+#!/usr/bin/python3
+
+
+import pytest
+from collections import deque
+from domainparsers.reddit import Reddit
+from domainparsers.records import MediaItem
+from utils.downloader import Downloader
+from utils.jobqueue import JobQueue
+from tests.helpers import make_post
+
+
+__author__ = 'petarGitNik'
+__copyright__ = 'Copyright (c) 2017 petarGitNik petargitnik@gmail.com'
+__version__ = 'v0.1.0'
+__license__ = 'MIT'
+__email__ = 'petargitnik@gmail.com'
+__status__ = 'Development'
+
+
+# pid of a process which does not exist
+DEAD_PID = 2**30
+
+
+def make_pages(count, size=2):
+    """
+    Make listing pages, each linking to the next one.
+    """
+    pages = {}
+    for number in range(count):
+        url = 'https://www.reddit.com/r/test/?page={}'.format(number)
+        next_page = 'https://www.reddit.com/r/test/?page={}'.format(number + 1)
+        posts = deque(make_post(number * size + i) for i in range(size))
+        pages[url] = (posts, next_page if number + 1 < count else None)
+    return pages
+
+
+@pytest.fixture
+def queue(tmp_path, clock):
+    queue = JobQueue(str(tmp_path / 'queue.sqlite'), lease=60, clock=clock)
+    yield queue
+    queue.close()
+
+def test_known_posts_are_not_discovered_again(queue):
+    """
+    Test if only new posts are returned when a page is discovered.
+    """
+    posts = [make_post(number) for number in range(3)]
+    queue.discover(posts[:2], 'listing', 'page2', 1)
+    new = queue.discover(posts, 'listing', None, 2)
+
+    assert list(new) == [posts[2]]
+    assert queue.frontier('listing') == (None, 2)
+    assert queue.stats()['discovered'] == 3
+
+def test_states(queue):
+    """
+    Test if posts move through states, and keep their changes.
+    """
+    posts = [make_post(number) for number in range(3)]
+    queue.discover(posts, 'listing', None, 1)
+    posts[0]['image'] = MediaItem(None, None)
+    for post in posts:
+        queue.resolve(post)
+    queue.claim(posts[1])
+    queue.done(posts[1])
+    queue.fail(posts[0])
+
+    assert queue.stats() == {'discovered' : 0, 'resolved' : 1, 'downloading' : 0,
+                             'done' : 1, 'failed' : 1}
+    assert list(queue.recover()) == [posts[2]]
+
+def test_lease(queue, clock):
+    """
+    Test if a claimed post is recovered only when its lease expires, or when
+    the process which claimed it is not running.
+    """
+    posts = [make_post(number) for number in range(2)]
+    queue.discover(posts, 'listing', None, 1)
+    queue.claim(posts[0])
+    queue.owner = DEAD_PID
+    queue.claim(posts[1])
+    queue.owner = -1
+
+    assert list(queue.recover()) == [posts[1]]
+    clock.now += 61
+    assert list(queue.recover()) == posts
+
+def test_interrupted_crawl_continues(tmp_path, queue, monkeypatch):
+    """
+    Test if a crawl which was stopped continues from the next page, and starts
+    from the first page once it is finished.
+    """
+    monkeypatch.setattr('domainparsers.reddit.sleep', lambda seconds: None)
+    pages = make_pages(3)
+    fetched = []
+
+    def fetch_page(url):
+        fetched.append(url)
+        posts, next_page = pages[url]
+        return (deque(post.copy() for post in posts), next_page)
+
+    reddit = Reddit('https://www.reddit.com/r/test/?page=0', None, queue=queue)
+    for posts in reddit.crawl_listing(fetch_page):
+        reddit.fetch = False
+
+    reddit = Reddit('https://www.reddit.com/r/test/?page=0', None, queue=queue)
+    crawled = list(reddit.crawl_listing(fetch_page))
+
+    assert fetched == sorted(pages)
+    assert [len(posts) for posts in crawled] == [2, 2]
+    assert queue.frontier(reddit.url) == None
+
+    # the next crawl starts again, and finds no new posts
+    reddit = Reddit('https://www.reddit.com/r/test/?page=0', None, queue=queue)
+    assert [len(posts) for posts in reddit.crawl_listing(fetch_page)] == [0, 0, 0]
+
+def test_downloader_recovers_files(tmp_path, queue):
+    """
+    Test if a restarted downloader downloads files which were resolved, or
+    claimed by a process which stopped.
+    """
+    posts = [make_post(number) for number in range(3)]
+    for number, post in enumerate(posts):
+        # a host each, so politeness does not slow the test down
+        post['image']['url'] = 'https://host{}.com/{}.jpg'.format(number, number)
+    queue.discover(posts, 'listing', None, 1)
+    for post in posts:
+        queue.resolve(post)
+    queue.owner = DEAD_PID
+    queue.claim(posts[0])
+    queue.done(posts[2])
+    queue.owner = -1
+
+    class FakeReddit(object):
+        images = deque()
+        def count_downloadable_images(self):
+            return 0
+
+    downloader = Downloader(FakeReddit(), str(tmp_path), queue=queue)
+    downloaded = []
+
+    def write_file_to_filesystem(url, filename, previous=None):
+        downloaded.append(url)
+
+    downloader.write_file_to_filesystem = write_file_to_filesystem
+    downloader.download_files()
+
+    assert downloaded == [posts[0]['image']['url'], posts[1]['image']['url']]
+    assert downloader.total == 2
+    assert queue.stats()['done'] == 3
+
+def test_crawled_files_are_not_recovered_twice(tmp_path, queue):
+    """
+    Test if files crawled before the downloader is created are not added again
+    from the queue.
+    """
+    posts = [make_post(number) for number in range(3)]
+    queue.discover(posts, 'listing', None, 1)
+    for post in posts:
+        queue.resolve(post)
+
+    class FakeReddit(object):
+        images = deque(posts)
+        def count_downloadable_images(self):
+            return len(self.images)
+
+    downloader = Downloader(FakeReddit(), str(tmp_path), queue=queue)
+
+    assert len(downloader.files) == 3
+    assert downloader.total == 3
+
+def test_album_parts_are_separate_jobs(queue):
+    """
+    Test if every image of an album post becomes a job of its own, and the
+    album post is done.
+    """
+    album = make_post(0)
+    queue.discover([album], 'listing', None, 1)
+    parts = []
+    for part in range(1, 4):
+        post = album.copy()
+        post['part'] = part
+        parts.append(post)
+        queue.resolve(post)
+    # resolving the album again, e.g. after a restart, adds no jobs
+    queue.resolve(parts[0])
+
+    assert queue.stats()['resolved'] == 3
+    assert queue.stats()['done'] == 1
+    assert list(queue.recover()) == parts
+    queue.claim(parts[1])
+    queue.done(parts[1])
+    assert list(queue.recover()) == [parts[0], parts[2]]
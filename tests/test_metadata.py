@@ -0,0 +1,170 @@
+#!/usr/bin/python3
+
+
+import pytest
+import sqlite3
+from utils.metadata import MetadataWriter
+from tests.helpers import count_rows
+
+
+__author__ = 'petarGitNik'
+__copyright__ = 'Copyright (c) 2017 petarGitNik petargitnik@gmail.com'
+__version__ = 'v0.1.0'
+__license__ = 'MIT'
+__email__ = 'petargitnik@gmail.com'
+__status__ = 'Development'
+
+
+OLD_SCHEMA = """
+CREATE TABLE images (
+  PostUrl TEXT,
+  ImageUrl TEXT,
+  Filename TEXT,
+  Domain TEXT,
+  PostTitle TEXT,
+  CommentSectionUrl TEXT,
+  PostedOn TEXT,
+  LastHtmlStatusCode INTEGER,
+  Downloaded INTEGER,
+  DownloadDate TEXT
+);
+"""
+
+
+def make_record(number, downloaded=1):
+    return (
+        'https://imgur.com/{}'.format(number),
+        'https://i.imgur.com/{}.jpg'.format(number),
+        '{}.jpg'.format(number),
+        'i.imgur.com',
+        'Post {}'.format(number),
+        'https://www.reddit.com/r/test/{}'.format(number),
+        None,
+        200,
+        downloaded,
+        '2017-08-01 12:00:00',
+        'digest{}'.format(number),
+        4,
+        '"etag{}"'.format(number),
+        None,
+        'jpg',
+    )
+
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    return str(tmp_path / 'db.sqlite')
+
+def test_old_database_is_migrated(db_path):
+    """
+    Test if a database from an older version keeps its records, and gets
+    indexes.
+    """
+    conn = sqlite3.connect(db_path)
+    conn.executescript(OLD_SCHEMA)
+    conn.execute('INSERT INTO images VALUES(?,?,?,?,?,?,?,?,?,?)', make_record(1)[:10])
+    conn.commit()
+    conn.close()
+
+    MetadataWriter(db_path).close()
+
+    conn = sqlite3.connect(db_path)
+    indexes = {row[0] for row in conn.execute(
+        "SELECT name FROM sqlite_master WHERE type = 'index'"
+    )}
+    version = conn.execute('PRAGMA user_version').fetchone()[0]
+    conn.close()
+
+    assert count_rows(db_path) == 1
+    assert {'images_image_url', 'images_post_url', 'images_downloaded',
+            'images_sha256'} <= indexes
+    assert version == len(MetadataWriter.MIGRATIONS)
+
+def test_reopening_keeps_records(db_path):
+    """
+    Test if opening an existing database never drops its records.
+    """
+    metadata = MetadataWriter(db_path)
+    metadata.write(make_record(1))
+    metadata.close()
+    MetadataWriter(db_path).close()
+
+    assert count_rows(db_path) == 1
+
+def test_records_are_batched(db_path):
+    """
+    Test if records are committed only when a batch is full.
+    """
+    metadata = MetadataWriter(db_path, batch_size=3, commit_interval=60)
+    metadata.write(make_record(1))
+    metadata.write(make_record(2))
+    assert count_rows(db_path) == 0
+
+    metadata.write(make_record(3))
+    assert count_rows(db_path) == 3
+    metadata.close()
+
+def test_records_are_committed_after_interval(db_path):
+    """
+    Test if a record is committed when commit_interval has passed.
+    """
+    metadata = MetadataWriter(db_path, batch_size=100, commit_interval=0)
+    metadata.write(make_record(1))
+    assert count_rows(db_path) == 1
+    metadata.close()
+
+def test_records_are_committed_without_new_records(db_path, clock, monkeypatch):
+    """
+    Test if a pending record is committed once commit_interval has passed,
+    even if no other record arrives.
+    """
+    monkeypatch.setattr('utils.metadata.monotonic', clock)
+    metadata = MetadataWriter(db_path, batch_size=100, commit_interval=5)
+    metadata.write(make_record(1))
+    clock.now += 4
+    metadata.maybe_flush()
+    assert count_rows(db_path) == 0
+
+    clock.now += 1
+    metadata.maybe_flush()
+    assert count_rows(db_path) == 1
+    metadata.close()
+
+def test_write_ahead_logging(db_path):
+    """
+    Test if the database uses write-ahead logging.
+    """
+    metadata = MetadataWriter(db_path)
+    conn = sqlite3.connect(db_path)
+    assert conn.execute('PRAGMA journal_mode').fetchone()[0] == 'wal'
+    conn.close()
+    metadata.close()
+
+def test_is_downloaded(db_path):
+    """
+    Test if downloaded files are found by image url or by filename.
+    """
+    metadata = MetadataWriter(db_path)
+    metadata.write(make_record(1))
+    metadata.write(make_record(2, downloaded=0))
+    metadata.flush()
+
+    assert metadata.is_downloaded('https://i.imgur.com/1.jpg', 'other.jpg') == True
+    assert metadata.is_downloaded('https://i.imgur.com/9.jpg', '1.jpg') == True
+    assert metadata.is_downloaded('https://i.imgur.com/2.jpg', '2.jpg') == False
+    metadata.close()
+
+def test_find_content(db_path):
+    """
+    Test if a downloaded file is found by its digest, before and after it is
+    written.
+    """
+    metadata = MetadataWriter(db_path)
+    metadata.write(make_record(1))
+    assert metadata.find_content('digest1') == '1.jpg'
+
+    metadata.flush()
+    assert metadata.find_content('digest1') == '1.jpg'
+    assert metadata.find_content('digest2') == None
+    metadata.close()
@@ -0,0 +1,112 @@
+#!/usr/bin/python3
+
+
+import json
+import pytest
+from benchmarks.fakesite import FakeServer
+from benchmarks.fakesite import FakeSite
+from domainparsers.reddit_json import RedditJson
+from utils.downloader import Downloader
+from utils.httpclient import default_client
+from utils.metrics import Histogram
+from utils.metrics import Measurement
+from utils.metrics import Metrics
+from utils.metrics import COUNT
+from utils.metrics import OBSERVE
+from utils.politeness import DomainBudgets
+
+
+__author__ = 'petarGitNik'
+__copyright__ = 'Copyright (c) 2017 petarGitNik petargitnik@gmail.com'
+__version__ = 'v0.1.0'
+__license__ = 'MIT'
+__email__ = 'petargitnik@gmail.com'
+__status__ = 'Development'
+
+
+@pytest.fixture
+def metrics():
+    metrics = Metrics()
+    metrics.update(measurement=Measurement(COUNT, 'requests_total', 1, 'download', 'i.imgur.com'))
+    metrics.update(measurement=Measurement(COUNT, 'requests_total', 2, 'download', 'i.imgur.com'))
+    metrics.update(measurement=Measurement(OBSERVE, 'latency_seconds', 0.2, 'parse', None))
+    return metrics
+
+def test_histogram_buckets():
+    """
+    Test if values are counted in cumulative buckets.
+    """
+    histogram = Histogram((1, 5))
+    for value in (0.5, 1, 3, 10):
+        histogram.observe(value)
+
+    assert histogram.buckets() == [(1, 2), (5, 3), (float('inf'), 4)]
+    assert histogram.sum == 14.5
+    assert histogram.count == 4
+
+def test_progress_updates_are_ignored():
+    """
+    Test if metrics can listen to progress updates of Reddit and Downloader.
+    """
+    metrics = Metrics()
+    metrics.update(fetched=True, maximum=10)
+    metrics.update(currently_at=3)
+    assert metrics.as_dict() == {'counters' : [], 'histograms' : []}
+
+def test_counters_add_up(metrics):
+    """
+    Test if counters with the same name, stage and domain add up.
+    """
+    counters = metrics.as_dict()['counters']
+    assert counters == [{'name' : 'requests_total', 'stage' : 'download',
+                         'domain' : 'i.imgur.com', 'value' : 3}]
+    assert json.loads(metrics.to_json()) == metrics.as_dict()
+
+def test_prometheus_format(metrics):
+    """
+    Test if metrics are written in the Prometheus text format.
+    """
+    lines = metrics.to_prometheus().splitlines()
+    assert '# TYPE crawlddit_requests_total counter' in lines
+    assert 'crawlddit_requests_total{stage="download",domain="i.imgur.com"} 3' in lines
+    assert '# TYPE crawlddit_latency_seconds histogram' in lines
+    assert 'crawlddit_latency_seconds_bucket{stage="parse",le="0.25"} 1' in lines
+    assert 'crawlddit_latency_seconds_bucket{stage="parse",le="0.1"} 0' in lines
+    assert 'crawlddit_latency_seconds_bucket{stage="parse",le="+Inf"} 1' in lines
+    assert 'crawlddit_latency_seconds_count{stage="parse"} 1' in lines
+
+def test_crawl_metrics(tmpdir, monkeypatch):
+    """
+    Test if every stage of a crawl is measured.
+    """
+    site = FakeSite(pages=2, posts_per_page=10, min_size=1024, max_size=4096)
+    server = FakeServer(site)
+    server.start()
+    monkeypatch.setattr(default_client, 'hosts', server.hosts())
+
+    metrics = Metrics()
+    budgets = DomainBudgets(burst=100)
+    reddit = RedditJson('https://www.reddit.com/r/fake/', 2, budgets=budgets)
+    downloader = Downloader(reddit, str(tmpdir), workers=4, budgets=budgets)
+    reddit.register(metrics)
+    downloader.register(metrics)
+    try:
+        downloader.download_stream(reddit.iter_posts())
+    finally:
+        default_client.close()
+        server.stop()
+
+    files = [path for path in tmpdir.listdir() if path.ext not in ('.sqlite', '.jsonl')]
+    counters = metrics.as_dict()['counters']
+    requests = {(counter['stage'], counter['domain']) : counter['value']
+                for counter in counters if counter['name'] == 'requests_total'}
+    assert requests[('listing', 'www.reddit.com')] == 2
+    assert ('resolve', 'imgur.com') in requests or ('resolve', 'gfycat.com') in requests
+    assert sum(value for (stage, _), value in requests.items() if stage == 'download') == len(files)
+
+    downloaded = sum(counter['value'] for counter in counters
+                     if counter['name'] == 'bytes_total' and counter['stage'] == 'download')
+    assert downloaded == sum(path.size() for path in files)
+
+    stages = set(histogram['stage'] for histogram in metrics.as_dict()['histograms'])
+    assert stages == {'listing', 'parse', 'resolve', 'download'}
@@ -0,0 +1,99 @@
+#!/usr/bin/python3
+
+
+import os
+import pytest
+from domainparsers.parsing import InlineParser
+from domainparsers.parsing import ProcessParser
+from domainparsers.imgur import Imgur
+from domainparsers.imgur import extract_images
+from domainparsers.reddit import Reddit
+
+
+__author__ = 'petarGitNik'
+__copyright__ = 'Copyright (c) 2017 petarGitNik petargitnik@gmail.com'
+__version__ = 'v0.1.0'
+__license__ = 'MIT'
+__email__ = 'petargitnik@gmail.com'
+__status__ = 'Development'
+
+
+FIXTURES = os.path.join(os.path.dirname(__file__), 'fixtures')
+URL = 'https://www.reddit.com/r/MemeEconomy/'
+ALBUM = (
+    '<script>var album = {"images":['
+    '{"hash":"jedEzFL","title":"","ext":".jpg","size":1},'
+    '{"hash":"lciC5G8","title":"","ext":".png","size":2},'
+    '{"hash":"jedEzFL","title":"","ext":".jpg","size":1}]};</script>'
+)
+
+
+@pytest.fixture
+def listing_page():
+    with open(os.path.join(FIXTURES, 'listing.html')) as f:
+        return f.read()
+
+@pytest.fixture(scope='module')
+def process_parser():
+    parser = ProcessParser(processes=2)
+    yield parser
+    parser.close()
+
+def test_extract_images():
+    """
+    Test if images are extracted from an imgur page in order of appearance.
+    """
+    assert extract_images(ALBUM) == [
+        ('jedEzFL', '.jpg'), ('lciC5G8', '.png'), ('jedEzFL', '.jpg')
+    ]
+
+def test_process_parser_extracts_posts(listing_page, process_parser):
+    """
+    Test if posts extracted in other processes are the same as posts
+    extracted in this one.
+    """
+    posts, next_page = process_parser.extract_posts(listing_page)
+    assert posts
+    assert (posts, next_page) == InlineParser().extract_posts(listing_page)
+
+def test_process_parser_extracts_images(process_parser):
+    """
+    Test if images extracted in other processes are the same as images
+    extracted in this one.
+    """
+    assert process_parser.extract_images(ALBUM) == extract_images(ALBUM)
+
+def test_reddit_uses_parser(listing_page, process_parser):
+    """
+    Test if Reddit builds the same posts with a process parser.
+    """
+    inline, inline_next = Reddit(URL, None).get_files_from_a_page(listing_page, URL)
+    posts, next_page = Reddit(URL, None, parser=process_parser).get_files_from_a_page(
+        listing_page, URL
+    )
+    assert list(posts) == list(inline)
+    assert next_page == inline_next
+
+def test_imgur_uses_parser(monkeypatch):
+    """
+    Test if Imgur extracts images of a fetched page with the given parser.
+    """
+    class Response(object):
+        def __enter__(self): return self
+        def __exit__(self, *args): pass
+        def read(self): return ALBUM.encode()
+
+    class CountingParser(InlineParser):
+        pages = 0
+        def extract_images(self, html):
+            self.pages += 1
+            return super().extract_images(html)
+
+    monkeypatch.setattr('domainparsers.imgur.default_client.open',
+                        lambda url, compressed=False: Response())
+    parser = CountingParser()
+    imgur = Imgur('http://imgur.com/a/vTTHZ', parser=parser)
+    imgur.prepare_images()
+
+    assert parser.pages == 1
+    assert [image['filename'] for image in imgur.images] == ['jedEzFL.jpg', 'lciC5G8.png']
@@ -0,0 +1,69 @@
+#!/usr/bin/python3
+
+
+import pytest
+from time import sleep
+from utils.pipeline import PostFeed
+
+
+__author__ = 'petarGitNik'
+__copyright__ = 'Copyright (c) 2017 petarGitNik petargitnik@gmail.com'
+__version__ = 'v0.1.0'
+__license__ = 'MIT'
+__email__ = 'petargitnik@gmail.com'
+__status__ = 'Development'
+
+
+def test_feed_yields_all_posts():
+    """
+    Test if the feed hands over all posts, and then reports it is exhausted.
+    """
+    feed = PostFeed(iter(range(5)), maxsize=2)
+    feed.start()
+
+    received = []
+    while not feed.exhausted:
+        post = feed.get(timeout=1)
+        if post is not None:
+            received.append(post)
+
+    assert received == list(range(5))
+    assert feed.get() == None
+
+def test_feed_applies_backpressure():
+    """
+    Test if the producer waits while the queue is full.
+    """
+    produced = []
+
+    def produce():
+        for number in range(100):
+            produced.append(number)
+            yield number
+
+    feed = PostFeed(produce(), maxsize=3)
+    feed.start()
+    sleep(0.1)
+
+    # three in the queue, and one waiting to be put
+    assert len(produced) == 4
+    feed.stop()
+    feed.join(timeout=2)
+    assert not feed.is_alive()
+
+def test_feed_keeps_error_of_producer():
+    """
+    Test if the feed ends when the producer fails, and keeps its exception.
+    """
+    def produce():
+        yield 1
+        raise ValueError('page 2 is not a listing')
+
+    feed = PostFeed(produce(), maxsize=2)
+    feed.start()
+    feed.join(timeout=2)
+
+    assert feed.get(timeout=1) == 1
+    assert feed.get(timeout=1) == None
+    assert feed.exhausted
+    assert isinstance(feed.error, ValueError)
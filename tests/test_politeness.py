@@ -3,6 +3,9 @@
 
 import pytest
 from utils.politeness import get_politeness_factor
+from utils.politeness import known_domain
+from utils.politeness import DomainBudgets
+from utils.politeness import PolitenessScheduler
 from domainparsers.common import Domains
 
 
@@ -40,3 +43,76 @@ def test_politeness_for_known_domains():
     assert get_politeness_factor(Domains.GFYCAT) == 4.436989947253095
     assert get_politeness_factor(Domains.TUMBLR) == 3.6724994960588933
     assert get_politeness_factor(Domains.BLOGSPOT) == 3.88348544015422
+
+
+@pytest.fixture
+def scheduler(clock):
+    return PolitenessScheduler(DomainBudgets(clock=clock), domain_limit=2)
+
+def test_known_domain_of_host():
+    """
+    Test if hosts are matched to known domains.
+    """
+    assert known_domain('i.imgur.com') == Domains.IMGUR
+    assert known_domain('thumbs.gfycat.com') == Domains.GFYCAT
+    assert known_domain('example.com') == None
+
+def test_budget_is_seeded_from_politeness(clock):
+    """
+    Test if a host gets one request per politeness period.
+    """
+    budgets = DomainBudgets(clock=clock)
+    assert budgets.try_acquire('i.imgur.com') == True
+    assert budgets.try_acquire('i.imgur.com') == False
+    assert budgets.wait_time('i.imgur.com') == pytest.approx(
+        get_politeness_factor(Domains.IMGUR)
+    )
+
+    clock.now += get_politeness_factor(Domains.IMGUR)
+    assert budgets.try_acquire('i.imgur.com') == True
+
+def test_scheduler_skips_waiting_host(scheduler):
+    """
+    Test if a host without budget does not hold up jobs of other hosts.
+    """
+    scheduler.put('a1', 'i.imgur.com')
+    scheduler.put('a2', 'i.imgur.com')
+    scheduler.put('b1', 'gfycat.com')
+
+    assert scheduler.next_job() == ('a1', 'i.imgur.com')
+    assert scheduler.next_job() == ('b1', 'gfycat.com')
+    assert scheduler.next_job() == None
+    assert len(scheduler) == 1
+
+def test_scheduler_wait_time(scheduler, clock):
+    """
+    Test if the scheduler reports when the next job becomes ready.
+    """
+    assert scheduler.wait_time() == None
+
+    scheduler.put('a1', 'i.imgur.com')
+    scheduler.put('a2', 'i.imgur.com')
+    scheduler.next_job()
+    assert scheduler.wait_time() == pytest.approx(
+        get_politeness_factor(Domains.IMGUR)
+    )
+
+    clock.now += get_politeness_factor(Domains.IMGUR)
+    assert scheduler.next_job() == ('a2', 'i.imgur.com')
+
+def test_scheduler_domain_limit(scheduler, clock):
+    """
+    Test if a host never gets more jobs at a time than its download slots.
+    """
+    for job in ('a1', 'a2', 'a3'):
+        scheduler.put(job, 'example.com')
+
+    for _ in range(2):
+        assert scheduler.next_job() is not None
+        clock.now += get_politeness_factor(None)
+
+    assert scheduler.next_job() == None
+    assert scheduler.wait_time() == None
+
+    scheduler.done('example.com')
+    assert scheduler.next_job() == ('a3', 'example.com')
@@ -0,0 +1,117 @@
+#!/usr/bin/python3
+
+
+import os
+import pstats
+import threading
+import pytest
+from benchmarks.fakesite import FakeServer
+from benchmarks.fakesite import FakeSite
+from domainparsers.reddit_json import RedditJson
+from utils.downloader import Downloader
+from utils.httpclient import default_client
+from utils.politeness import DomainBudgets
+from utils.profiling import StageProfiler
+from utils.profiling import PER_THREAD
+
+
+__author__ = 'petarGitNik'
+__copyright__ = 'Copyright (c) 2017 petarGitNik petargitnik@gmail.com'
+__version__ = 'v0.1.0'
+__license__ = 'MIT'
+__email__ = 'petargitnik@gmail.com'
+__status__ = 'Development'
+
+
+def build_strings():
+    return ['meme {}'.format(number) for number in range(10000)]
+
+def sort_numbers():
+    return sorted(range(10000), key=lambda number: -number)
+
+def test_stages_are_profiled_separately(tmpdir):
+    """
+    Test if functions are attributed to the stage they were run in.
+    """
+    profiler = StageProfiler(str(tmpdir))
+    profiler.run('crawl', build_strings)
+    profiler.run('download', sort_numbers)
+    profiler.write()
+
+    crawl = pstats.Stats(str(tmpdir.join('profile-crawl.prof'))).stats
+    download = pstats.Stats(str(tmpdir.join('profile-download.prof'))).stats
+    assert any(function[2] == 'build_strings' for function in crawl)
+    assert not any(function[2] == 'build_strings' for function in download)
+    assert any(function[2] == 'sort_numbers' for function in download)
+
+@pytest.mark.skipif(not PER_THREAD, reason='a single profile covers all threads')
+def test_threads_of_a_stage_are_merged(tmpdir):
+    """
+    Test if profiles of threads working on the same stage are merged.
+    """
+    profiler = StageProfiler(str(tmpdir))
+    task = profiler.wrap('resolve', sort_numbers)
+    threads = [threading.Thread(target=task) for _ in range(3)]
+    for thread in threads: thread.start()
+    for thread in threads: thread.join()
+
+    calls = [stats[1] for function, stats in profiler.stats('resolve').stats.items()
+             if function[2] == 'sort_numbers']
+    assert calls == [3]
+
+def test_single_profile_of_the_process(tmpdir, monkeypatch):
+    """
+    Test if a stage which starts while another one is profiled is a part of
+    it, where only one profile can be active in the process.
+    """
+    monkeypatch.setattr('utils.profiling.PER_THREAD', False)
+    profiler = StageProfiler(str(tmpdir))
+
+    def crawl():
+        thread = threading.Thread(target=profiler.wrap('resolve', sort_numbers))
+        thread.start()
+        thread.join()
+        return build_strings()
+
+    assert len(profiler.run('crawl', crawl)) == 10000
+    assert sorted(profiler.profiles) == ['crawl']
+    assert profiler.active == None
+
+def test_summary_with_memory(tmpdir):
+    """
+    Test if the summary lists top functions and allocation sites of a stage.
+    """
+    profiler = StageProfiler(str(tmpdir), memory=True, top=5)
+    strings = profiler.run('crawl', build_strings)
+    with open(profiler.write()) as f:
+        summary = f.read()
+
+    assert len(strings) == 10000
+    assert '== crawl: 1 thread run(s)' in summary
+    assert '== crawl: memory, peak' in summary
+    assert 'test_profiling.py' in summary
+
+def test_crawl_stages(tmpdir, monkeypatch):
+    """
+    Test if crawling, resolving and downloading are profiled as stages.
+    """
+    server = FakeServer(FakeSite(pages=1, posts_per_page=20, min_size=1024, max_size=2048))
+    server.start()
+    monkeypatch.setattr(default_client, 'hosts', server.hosts())
+
+    profiler = StageProfiler(str(tmpdir))
+    budgets = DomainBudgets(burst=100)
+    try:
+        reddit = RedditJson('https://www.reddit.com/r/fake/', 1, budgets=budgets,
+                            profiler=profiler)
+        profiler.run('crawl', reddit.get_all_posts)
+        downloader = Downloader(reddit, str(tmpdir), workers=2, budgets=budgets,
+                                profiler=profiler)
+        profiler.run('download', downloader.download_files)
+    finally:
+        default_client.close()
+        server.stop()
+
+    profiler.write()
+    for stage in ('crawl', 'resolve', 'download'):
+        assert os.path.isfile(str(tmpdir.join('profile-{}.prof'.format(stage))))
@@ -0,0 +1,76 @@
+#!/usr/bin/python3
+
+
+import pickle
+import pytest
+from domainparsers.records import MediaItem
+from domainparsers.records import Post
+
+
+__author__ = 'petarGitNik'
+__copyright__ = 'Copyright (c) 2017 petarGitNik petargitnik@gmail.com'
+__version__ = 'v0.1.0'
+__license__ = 'MIT'
+__email__ = 'petargitnik@gmail.com'
+__status__ = 'Development'
+
+
+@pytest.fixture
+def post():
+    return Post(
+        url='https://i.imgur.com/jedEzFL.jpg',
+        image=MediaItem('https://i.imgur.com/jedEzFL.jpg', 'jedEzFL.jpg'),
+        domain='i.imgur.com',
+        http_status_token=0,
+    )
+
+def test_record_is_a_dictionary(post):
+    """
+    Test if a record can be read and changed like a dictionary.
+    """
+    post['http_status_token'] += 1
+    post['image']['filename'] = '1-jedEzFL.jpg'
+
+    assert post.http_status_token == 1
+    assert post.image.filename == '1-jedEzFL.jpg'
+    assert post['posted_on'] == None
+    assert post.get('image')['url'] == 'https://i.imgur.com/jedEzFL.jpg'
+    assert 'domain' in post
+    assert len(post) == 11
+
+def test_record_equals_dictionary(post):
+    """
+    Test if a record is equal to a dictionary with the same items.
+    """
+    image = {'url' : 'https://i.imgur.com/jedEzFL.jpg', 'filename' : 'jedEzFL.jpg'}
+    assert post.image == image
+    assert dict(post.image) == image
+    assert dict(post)['image'] == image
+    assert post.image != {'url' : None, 'filename' : None}
+
+def test_fields_are_fixed(post):
+    """
+    Test if fields which are not declared cannot be used.
+    """
+    with pytest.raises(KeyError):
+        post['score'] = 100
+    with pytest.raises(KeyError):
+        post['score']
+    with pytest.raises(AttributeError):
+        post.score = 100
+
+def test_copy_is_independent(post):
+    """
+    Test if a copy of a record can be changed without changing the record.
+    """
+    image = post.image.copy()
+    image['filename'] = 'other.jpg'
+
+    assert post.image.filename == 'jedEzFL.jpg'
+    assert image == MediaItem('https://i.imgur.com/jedEzFL.jpg', 'other.jpg')
+
+def test_record_can_be_pickled(post):
+    """
+    Test if records can be sent to other processes.
+    """
+    assert pickle.loads(pickle.dumps(post)) == post
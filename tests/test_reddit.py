@@ -1,11 +1,16 @@
 #!/usr/bin/python3
 
 
+import os
 import pytest
+from collections import deque
+from domainparsers.formats import FormatPolicy
 from domainparsers.reddit import Reddit
 from domainparsers.reddit import RedditException
+from domainparsers.reddit import chronological_listing
 from domainparsers.common import FileFormats
 from domainparsers.common import Domains
+from utils.crawlstate import Mark
 
 
 __author__ = 'petarGitNik'
@@ -16,6 +21,14 @@ __email__ = 'petargitnik@gmail.com'
 __status__ = 'Development'
 
 
+FIXTURES = os.path.join(os.path.dirname(__file__), 'fixtures')
+
+
+@pytest.fixture
+def listing_page():
+    with open(os.path.join(FIXTURES, 'listing.html')) as f:
+        return f.read()
+
 @pytest.fixture
 def test_link():
     return Reddit('https://www.reddit.com/r/MemeEconomy/', 15)
@@ -84,3 +97,134 @@ def test_normalization_of_images(test_link):
     """
     assert test_link.pages == 15
     assert Reddit('http://www.reddit.com/', None).pages == 0
+
+def test_needs_resolving(test_link):
+    """
+    Test if only posts linking to pages on resolvable domains need resolving.
+    """
+    direct = {'url' : 'http://i.imgur.com/lciC5G8.jpg',
+              'image' : {'url' : 'http://i.imgur.com/lciC5G8.jpg', 'filename' : 'lciC5G8.jpg'}}
+    imgur_page = {'url' : 'http://imgur.com/lciC5G8',
+                  'image' : {'url' : None, 'filename' : None}}
+    self_post = {'url' : 'https://www.reddit.com/r/MemeEconomy/comments/abc/',
+                 'image' : {'url' : None, 'filename' : None}}
+    assert test_link.needs_resolving(direct) == False
+    assert test_link.needs_resolving(imgur_page) == True
+    assert test_link.needs_resolving(self_post) == False
+
+def test_files_from_a_page(test_link, listing_page):
+    """
+    Test if all posts and the next page are extracted from a listing page.
+    """
+    url = 'https://www.reddit.com/r/MemeEconomy/'
+    posts, next_page = test_link.get_files_from_a_page(listing_page, url)
+    post = posts[0]
+
+    assert len(posts) == 8
+    assert next_page == 'https://www.reddit.com/r/MemeEconomy/?count=33&after=t3_6qbdqk'
+    assert post['url'] == 'https://i.imgur.com/NQTOZmL.jpg'
+    assert post['image'] == {
+        'url' : 'https://i.imgur.com/NQTOZmL.jpg', 'filename' : 'NQTOZmL.jpg'
+    }
+    assert post['domain'] == 'i.imgur.com'
+    assert post['post_title'] == 'Hold hold portfolio moon stonks market meme'
+    assert post['posted_on'] == '2017-07-31T23:30:00+00:00'
+    assert post['link_to_comments'] == (
+        'https://www.reddit.com/r/MemeEconomy/comments/6qotlm/'
+        'hold_hold_portfolio_moon_stonks_market_meme/'
+    )
+    assert post['on_page'] == url
+    assert [test_link.needs_resolving(post) for post in posts] == [
+        False, False, True, True, True, False, False, False
+    ]
+    # the format of a .gifv is chosen without a request
+    assert posts[6]['image'] == {
+        'url' : 'https://i.imgur.com/y2CSDsU.mp4', 'filename' : 'y2CSDsU.mp4'
+    }
+
+def test_gifv_waits_for_resolver_only_for_sizes():
+    """
+    Test if a .gifv is left for the resolver only when the format policy has
+    to ask for the sizes of its renditions.
+    """
+    reddit = Reddit('https://www.reddit.com/r/test/', 1,
+                    formats=FormatPolicy(smallest=True))
+    gifv = {'url' : 'https://i.imgur.com/y2CSDsU.gifv',
+            'image' : reddit.get_image('https://i.imgur.com/y2CSDsU.gifv')}
+
+    assert gifv['image'] == {'url' : None, 'filename' : None}
+    assert reddit.needs_resolving(gifv) == True
+
+def test_last_page(test_link, listing_page):
+    """
+    Test if there is no next page when the next button is missing.
+    """
+    html = listing_page.replace('next-button', 'prev-button')
+    _, next_page = test_link.get_files_from_a_page(html, test_link.url)
+    assert next_page == None
+
+def make_page(hours):
+    """
+    Make posts of a listing page which were posted at given hours.
+    """
+    return deque({
+        'link_to_comments' : 'https://www.reddit.com/r/MemeEconomy/comments/{}/'.format(hour),
+        'posted_on' : '2017-08-01T{:02d}:00:00+00:00'.format(hour),
+    } for hour in hours)
+
+def crawl(reddit, pages):
+    """
+    Crawl listing pages without fetching them. Pages are numbered from 0.
+    """
+    def fetch_page(number):
+        next_page = number + 1 if number + 1 < len(pages) else None
+        return (pages[number], next_page)
+
+    reddit.url = 0
+    return list(reddit.crawl_listing(fetch_page))
+
+def test_crawl_remembers_newest_post(monkeypatch):
+    """
+    Test if the newest crawled post becomes the mark for the next crawl.
+    """
+    monkeypatch.setattr('domainparsers.reddit.sleep', lambda seconds: None)
+    reddit = Reddit('https://www.reddit.com/r/MemeEconomy/new/', None)
+    crawled = crawl(reddit, [make_page([20, 23, 22]), make_page([21, 19])])
+
+    assert [len(page) for page in crawled] == [3, 2]
+    assert reddit.newest == Mark(
+        'https://www.reddit.com/r/MemeEconomy/comments/23/',
+        '2017-08-01T23:00:00+00:00'
+    )
+
+def test_chronological_listing():
+    """
+    Test if an incremental crawl reads the listing sorted by new, and refuses
+    listings in another order.
+    """
+    new = 'https://www.reddit.com/r/MemeEconomy/new/'
+    assert chronological_listing('https://www.reddit.com/r/MemeEconomy/') == new
+    assert chronological_listing('https://www.reddit.com/r/MemeEconomy/hot/') == new
+    assert chronological_listing(new) == new
+    with pytest.raises(RedditException):
+        chronological_listing('https://www.reddit.com/r/MemeEconomy/top/?t=week')
+    with pytest.raises(RedditException):
+        chronological_listing('https://www.reddit.com/')
+
+def test_incremental_crawl_stops_at_mark(monkeypatch):
+    """
+    Test if only newer posts are crawled, and crawling stops at the page with
+    already known posts.
+    """
+    monkeypatch.setattr('domainparsers.reddit.sleep', lambda seconds: None)
+    mark = Mark('https://www.reddit.com/r/MemeEconomy/comments/18/',
+                '2017-08-01T18:00:00+00:00')
+    reddit = Reddit('https://www.reddit.com/r/MemeEconomy/new/', None, stop_at=mark)
+    pages = [make_page([2, 23, 22]), make_page([21, 18, 17]), make_page([16, 15])]
+    crawled = crawl(reddit, pages)
+
+    # pinned post from 02:00 does not stop the crawl on the first page
+    assert [[post['posted_on'][11:13] for post in page] for page in crawled] == [
+        ['23', '22'], ['21']
+    ]
+    assert reddit.newest.posted_on == '2017-08-01T23:00:00+00:00'
@@ -0,0 +1,161 @@
+#!/usr/bin/python3
+
+
+import os
+import json
+import pytest
+from urllib.error import URLError
+from domainparsers.reddit_json import RedditJson
+from utils.jobqueue import JobQueue
+
+
+__author__ = 'petarGitNik'
+__copyright__ = 'Copyright (c) 2017 petarGitNik petargitnik@gmail.com'
+__version__ = 'v0.1.0'
+__license__ = 'MIT'
+__email__ = 'petargitnik@gmail.com'
+__status__ = 'Development'
+
+
+FIXTURES = os.path.join(os.path.dirname(__file__), 'fixtures')
+
+
+def load_fixture(name):
+    with open(os.path.join(FIXTURES, name)) as f:
+        return json.load(f)
+
+
+class RecordedRedditJson(RedditJson):
+    """
+    RedditJson which reads recorded listing pages instead of fetching them.
+    """
+
+    PAGES = {
+        'https://www.reddit.com/r/MemeEconomy/.json?limit=25' : 'listing.json',
+        'https://www.reddit.com/r/MemeEconomy/.json?after=t3_6qx1d4&limit=25' : 'listing_last.json',
+    }
+
+    def fetch_json(self, url):
+        self.fetched.append(url)
+        return load_fixture(self.PAGES[url])
+
+
+@pytest.fixture
+def reddit():
+    reddit = RecordedRedditJson('https://www.reddit.com/r/MemeEconomy/', None)
+    reddit.fetched = []
+    return reddit
+
+@pytest.fixture
+def listing(reddit):
+    return reddit.get_files_from_json(
+        load_fixture('listing.json'), 'https://www.reddit.com/r/MemeEconomy/'
+    )
+
+def test_json_url(reddit):
+    """
+    Test if listing page urls are turned into JSON listing urls.
+    """
+    assert reddit.json_url('https://www.reddit.com/r/MemeEconomy/') == \
+        'https://www.reddit.com/r/MemeEconomy/.json?limit=25'
+    assert reddit.json_url('https://www.reddit.com/r/MemeEconomy/?after=t3_6qx1d4') == \
+        'https://www.reddit.com/r/MemeEconomy/.json?after=t3_6qx1d4&limit=25'
+
+def test_next_page(reddit, listing):
+    """
+    Test if the 'after' cursor is turned into the url of the next page.
+    """
+    posts, next_page = listing
+    assert next_page == 'https://www.reddit.com/r/MemeEconomy/?after=t3_6qx1d4'
+
+def test_post_fields(listing):
+    """
+    Test if posts have the same fields as posts from a rendered listing.
+    """
+    posts, _ = listing
+    post = posts[0]
+    assert len(posts) == 4
+    assert post['url'] == 'https://i.imgur.com/jedEzFL.jpg'
+    assert post['image'] == {
+        'url' : 'https://i.imgur.com/jedEzFL.jpg', 'filename' : 'jedEzFL.jpg'
+    }
+    assert post['domain'] == 'i.imgur.com'
+    assert post['post_title'] == 'Buy buy buy'
+    assert post['posted_on'] == '2017-08-01T12:00:00+00:00'
+    assert post['link_to_comments'] == \
+        'https://www.reddit.com/r/MemeEconomy/comments/6qx1a1/buy_buy_buy/'
+    assert post['on_page'] == 'https://www.reddit.com/r/MemeEconomy/'
+    assert post['http_status_token'] == 0
+
+def test_escaped_fields(listing):
+    """
+    Test if HTML entities in urls and titles are unescaped.
+    """
+    posts, _ = listing
+    assert posts[1]['post_title'] == 'Sell & hold'
+    assert posts[3]['url'] == 'https://gfycat.com/ShinyGoodBass?foo=1&bar=2'
+
+def test_unresolved_posts(reddit, listing):
+    """
+    Test if links to pages are left for the resolver.
+    """
+    posts, _ = listing
+    assert [reddit.needs_resolving(post) for post in posts] == [
+        False, True, False, True
+    ]
+
+def test_crawl_follows_cursor(reddit, monkeypatch):
+    """
+    Test if all pages are crawled by following the 'after' cursor.
+    """
+    monkeypatch.setattr('domainparsers.reddit.sleep', lambda seconds: None)
+    pages = list(reddit.listing_pages())
+
+    assert reddit.fetched == list(RecordedRedditJson.PAGES)
+    assert [len(posts) for posts in pages] == [4, 1]
+
+def test_failed_page_leaves_crawl_incomplete(reddit, monkeypatch, tmp_path):
+    """
+    Test if a listing page which cannot be fetched stops the crawl without
+    moving the frontier past it, so the next crawl fetches it again.
+    """
+    monkeypatch.setattr('domainparsers.reddit.sleep', lambda seconds: None)
+    fetch_json = reddit.fetch_json
+
+    def failing_fetch_json(url):
+        if 'after=' in url:
+            raise URLError('timed out')
+        return fetch_json(url)
+
+    reddit.fetch_json = failing_fetch_json
+    reddit.queue = JobQueue(str(tmp_path / 'queue.sqlite'))
+    pages = list(reddit.listing_pages())
+
+    assert [len(posts) for posts in pages] == [4]
+    assert reddit.complete == False
+    assert reddit.queue.frontier(reddit.url) == (
+        'https://www.reddit.com/r/MemeEconomy/?after=t3_6qx1d4', 1
+    )
+    reddit.queue.close()
+
+def test_crawl_error_leaves_crawl_incomplete(reddit, monkeypatch):
+    """
+    Test if an error other than a failed request, e.g. a page which is not a
+    listing, leaves the crawl incomplete, so the newest post is not saved.
+    """
+    monkeypatch.setattr('domainparsers.reddit.sleep', lambda seconds: None)
+    fetch_json = reddit.fetch_json
+
+    def malformed_fetch_json(url):
+        if 'after=' in url:
+            raise ValueError('Expecting value: line 1 column 1 (char 0)')
+        return fetch_json(url)
+
+    reddit.fetch_json = malformed_fetch_json
+    pages = []
+    with pytest.raises(ValueError):
+        for posts in reddit.listing_pages():
+            pages.append(posts)
+
+    assert [len(posts) for posts in pages] == [4]
+    assert reddit.complete == False
@@ -0,0 +1,265 @@
+#!/usr/bin/python3
+
+
+import pytest
+import threading
+from time import sleep
+from domainparsers.reddit import Reddit
+from domainparsers.resolver import Resolver
+from urllib.error import HTTPError
+from utils.cache import ResolutionCache
+from utils.cache import DeadLinks
+from tests.helpers import make_post
+
+
+__author__ = 'petarGitNik'
+__copyright__ = 'Copyright (c) 2017 petarGitNik petargitnik@gmail.com'
+__version__ = 'v0.1.0'
+__license__ = 'MIT'
+__email__ = 'petargitnik@gmail.com'
+__status__ = 'Development'
+
+
+class FakeReddit(Reddit):
+    """
+    Reddit which resolves links without fetching pages, and keeps track of how
+    many links of a domain are resolved at the same time.
+    """
+
+    def __init__(self, delay=0.02, cache=None, dead_links=None):
+        super().__init__('https://www.reddit.com/r/test/', 1, cache=cache,
+                         dead_links=dead_links)
+        self.delay = delay
+        self.fetched = []
+        self.lock = threading.Lock()
+        self.running = 0
+        self.most_running = 0
+
+    def resolve_image(self, url):
+        with self.lock:
+            self.fetched.append(url)
+            self.running += 1
+            self.most_running = max(self.most_running, self.running)
+        sleep(self.delay)
+        with self.lock:
+            self.running -= 1
+        if url.endswith('/missing'):
+            raise HTTPError(url, 404, 'Not Found', None, None)
+        return self.image_dictionary(url + '.jpg', url.split('/')[-1] + '.jpg')
+
+
+@pytest.fixture
+def posts():
+    return [make_post(number, url='https://imgur.com/{}'.format(number), resolved=False) for number in range(8)]
+
+def test_posts_keep_their_order(posts):
+    """
+    Test if resolved posts are yielded in order of submission.
+    """
+    direct = make_post('a')
+    resolver = Resolver(FakeReddit(), workers=4)
+    for post in [direct] + posts:
+        resolver.submit(post)
+
+    resolved = list(resolver.drain())
+    resolver.close()
+
+    assert resolved == [direct] + posts
+    assert [post['image']['url'] for post in resolved[1:]] == [
+        post['url'] + '.jpg' for post in posts
+    ]
+
+def test_domain_limit(posts):
+    """
+    Test if no more than domain_limit links of a domain are resolved at once.
+    """
+    reddit = FakeReddit()
+    resolver = Resolver(reddit, workers=8, domain_limit=2)
+    for post in posts:
+        resolver.submit(post)
+    list(resolver.drain())
+    resolver.close()
+
+    assert reddit.most_running == 2
+
+def test_timeout_leaves_post_unresolved(posts):
+    """
+    Test if a post which takes too long is yielded without a direct link.
+    """
+    resolver = Resolver(FakeReddit(delay=0.5), workers=1, timeout=0.05)
+    resolver.submit(posts[0])
+
+    resolved = list(resolver.drain())
+    resolver.close()
+
+    assert resolved[0]['image']['url'] == None
+
+def test_waiting_for_a_slot_does_not_time_out(posts):
+    """
+    Test if the timeout of a link starts when it is fetched, not while it
+    waits for a free slot of its domain.
+    """
+    resolver = Resolver(FakeReddit(delay=0.1), workers=4, domain_limit=2, timeout=0.25)
+    for post in posts:
+        resolver.submit(post)
+    assert list(resolver.ready()) == []
+
+    resolved = list(resolver.drain())
+    resolver.close()
+
+    assert [post['image']['url'] for post in resolved] == [
+        post['url'] + '.jpg' for post in posts
+    ]
+
+def test_waiting_for_budget_does_not_time_out(posts):
+    """
+    Test if the timeout of a link starts after the budget of its host allows
+    the request.
+    """
+    class SlowBudgets(object):
+        def acquire(self, host):
+            sleep(0.2)
+
+    reddit = FakeReddit()
+    reddit.budgets = SlowBudgets()
+    resolver = Resolver(reddit, workers=2, timeout=0.1)
+    for post in posts[:2]:
+        resolver.submit(post)
+
+    resolved = list(resolver.drain())
+    resolver.close()
+
+    assert [post['image']['url'] for post in resolved] == [
+        post['url'] + '.jpg' for post in posts[:2]
+    ]
+
+def test_ready_does_not_wait(posts):
+    """
+    Test if ready() yields nothing while the first post is being resolved.
+    """
+    resolver = Resolver(FakeReddit(delay=0.2), workers=1)
+    resolver.submit(posts[0])
+
+    assert list(resolver.ready()) == []
+    assert len(list(resolver.drain())) == 1
+    resolver.close()
+
+def test_repeated_link_is_fetched_once():
+    """
+    Test if a link posted several times is resolved only once.
+    """
+    reddit = FakeReddit()
+    resolver = Resolver(reddit, workers=4)
+    crossposts = [make_post(0, url='https://imgur.com/meme', resolved=False) for _ in range(3)]
+    for post in crossposts:
+        resolver.submit(post)
+    resolved = list(resolver.drain())
+    resolver.close()
+
+    assert reddit.fetched == ['https://imgur.com/meme']
+    assert [post['image']['url'] for post in resolved] == ['https://imgur.com/meme.jpg'] * 3
+    assert resolved[0]['image'] is not resolved[1]['image']
+
+def test_recent_links_are_bounded(posts):
+    """
+    Test if only RECENT_LINKS links are remembered, so memory does not grow
+    with the length of a crawl.
+    """
+    reddit = FakeReddit(delay=0)
+    resolver = Resolver(reddit, workers=4)
+    resolver.RECENT_LINKS = 3
+    for post in posts:
+        resolver.submit(post)
+        list(resolver.ready())
+    list(resolver.drain())
+    resolver.submit(make_post(7, url=posts[-1]['url'], resolved=False))
+    list(resolver.drain())
+    resolver.close()
+
+    assert list(resolver.futures) == [post['url'] for post in posts[-3:]]
+    assert len(resolver.cached) == 3
+    assert reddit.fetched.count(posts[-1]['url']) == 1
+
+def test_cached_links_are_not_fetched(tmp_path, posts):
+    """
+    Test if links resolved by a previous crawl are taken from the cache.
+    """
+    cache = ResolutionCache(str(tmp_path / 'cache.sqlite'))
+    for run in range(2):
+        reddit = FakeReddit(cache=cache)
+        resolver = Resolver(reddit, workers=4)
+        for number, post in enumerate(posts):
+            resolver.submit(make_post(number, url=post['url'], resolved=False))
+        resolved = list(resolver.drain())
+        resolver.close()
+
+    assert reddit.fetched == []
+    assert [post['image']['url'] for post in resolved] == [
+        post['url'] + '.jpg' for post in posts
+    ]
+    assert cache.stats()['hits'] == len(posts)
+    assert cache.stats()['misses'] == len(posts)
+    cache.close()
+
+def test_dead_links_are_not_fetched(tmp_path):
+    """
+    Test if a page which was missing in a previous crawl is not fetched again.
+    """
+    dead_links = DeadLinks(str(tmp_path / 'cache.sqlite'))
+    for run in range(2):
+        reddit = FakeReddit(dead_links=dead_links)
+        resolver = Resolver(reddit)
+        resolver.submit(make_post(0, url='https://imgur.com/missing', resolved=False))
+        resolved = list(resolver.drain())
+        resolver.close()
+
+    assert reddit.fetched == []
+    assert resolved[0]['image']['url'] == None
+    dead_links.close()
+
+def test_album_is_expanded(tmp_path):
+    """
+    Test if an album post is yielded once for every image, with numbered
+    filenames, both when it is fetched and when it is taken from the cache.
+    """
+    cache = ResolutionCache(str(tmp_path / 'cache.sqlite'))
+    for run in range(2):
+        reddit = FakeReddit(cache=cache)
+        reddit.get_album_links = lambda url: [
+            'https://i.imgur.com/{}.jpg'.format(image) for image in 'abc'
+        ]
+        resolver = Resolver(reddit)
+        resolver.submit(make_post(0, url='https://imgur.com/a/album', resolved=False))
+        resolver.submit(make_post(1, url='https://imgur.com/single', resolved=False))
+        resolved = list(resolver.drain())
+        resolver.close()
+
+        assert [post.get('part') for post in resolved] == [1, 2, 3, None]
+        assert [post['image']['filename'] for post in resolved] == [
+            '1-a.jpg', '2-b.jpg', '3-c.jpg', 'single.jpg'
+        ]
+    assert cache.stats()['hits'] == 2
+    cache.close()
+
+def test_failed_task_fails_the_link(posts):
+    """
+    Test if a link fails, and frees its slot, when its task cannot be run,
+    e.g. because another profiler is active.
+    """
+    class BrokenProfiler(object):
+        def wrap(self, name, function):
+            def profiled(*args, **kwargs):
+                raise ValueError('Another profiling tool is already active')
+            return profiled
+
+    reddit = FakeReddit()
+    reddit.profiler = BrokenProfiler()
+    resolver = Resolver(reddit, workers=2, domain_limit=1, timeout=1)
+    for post in posts[:3]:
+        resolver.submit(post)
+
+    resolved = list(resolver.drain())
+    resolver.close()
+
+    assert [post['image']['url'] for post in resolved] == [None] * 3
+    assert sum(resolver.active.values()) == 0
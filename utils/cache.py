@@ -0,0 +1,313 @@
+#!/usr/bin/python3
+
+
+"""
+Caches which spare later crawls from network work. Entries are kept in
+cache.sqlite of the destination directory.
+
+ResolutionCache remembers direct media links of posts which link to a page on
+an allowed domain (e.g. an imgur image page, or a gfycat page), so the pages
+are not fetched again. Example usage:
+
+```python3
+cache = ResolutionCache('~/memes/cache.sqlite')
+media = cache.get('https://imgur.com/NQTOZmL')
+if media is None:
+    media = ['https://i.imgur.com/NQTOZmL.jpg']
+    cache.put('https://imgur.com/NQTOZmL', media)
+cache.close()
+```
+
+Entries expire ttl seconds after they were resolved. When there are more than
+max_entries entries, the least recently used ones are evicted.
+
+DeadLinks remembers links which failed permanently (e.g. 404 or 403), and
+hosts which do not exist, so they are not requested again until the entry
+expires. Example usage:
+
+```python3
+dead_links = DeadLinks('~/memes/cache.sqlite')
+if not dead_links.is_dead(url):
+    ...
+dead_links.add(url, 404)
+```
+"""
+
+
+import json
+import socket
+import sqlite3
+import threading
+from collections import Counter
+from time import time
+from urllib.parse import urlsplit
+
+
+__author__ = 'petarGitNik'
+__copyright__ = 'Copyright (c) 2017 petarGitNik petargitnik@gmail.com'
+__version__ = 'v0.1.0'
+__license__ = 'MIT'
+__email__ = 'petargitnik@gmail.com'
+__status__ = 'Development'
+
+
+class SqliteCache(object):
+    """
+    Base class of caches kept in an SQLite database. The database is opened on
+    first use, when the destination directory has already been validated. A
+    cache can be shared between threads.
+    """
+    DB_TEMPLATE = ""
+
+    def __init__(self, path, ttl, clock=time):
+        self.path = path
+        self.ttl = ttl
+        self.clock = clock
+
+        self.conn = None
+        self.lock = threading.Lock()
+
+    def connection(self):
+        """
+        Return the database connection, and create the database if needed.
+        Lock must be held by the caller.
+        """
+        if self.conn is None:
+            self.conn = sqlite3.connect(self.path, check_same_thread=False)
+            self.conn.execute('PRAGMA journal_mode=WAL')
+            self.conn.execute('PRAGMA synchronous=NORMAL')
+            self.conn.executescript(self.DB_TEMPLATE)
+        return self.conn
+
+    def close(self):
+        """
+        Close the database.
+        """
+        with self.lock:
+            if self.conn is not None:
+                self.conn.close()
+                self.conn = None
+
+
+class ResolutionCache(SqliteCache):
+    """
+    SQLite backed cache from post url to a list of direct media urls.
+    """
+    DB_TEMPLATE = """
+    CREATE TABLE IF NOT EXISTS resolutions (
+      PostUrl TEXT PRIMARY KEY,
+      Media TEXT,
+      ResolvedOn REAL,
+      UsedOn REAL
+    );
+    CREATE INDEX IF NOT EXISTS resolutions_used_on ON resolutions (UsedOn);
+    """
+
+    def __init__(self, path, ttl=7 * 24 * 3600, max_entries=50000, clock=time):
+        super().__init__(path, ttl, clock)
+        self.max_entries = max_entries
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, post_url):
+        """
+        Return the list of media urls of a post, or None if the post is not in
+        the cache, or its entry has expired.
+        """
+        now = self.clock()
+        with self.lock:
+            conn = self.connection()
+            row = conn.execute(
+                'SELECT Media, ResolvedOn FROM resolutions WHERE PostUrl = ?',
+                (post_url,)
+            ).fetchone()
+
+            if row is None or now - row[1] > self.ttl:
+                self.misses += 1
+                return None
+
+            conn.execute(
+                'UPDATE resolutions SET UsedOn = ? WHERE PostUrl = ?',
+                (now, post_url)
+            )
+            conn.commit()
+            self.hits += 1
+            return json.loads(row[0])
+
+    def put(self, post_url, media):
+        """
+        Store the list of media urls of a post, and evict the least recently
+        used entries if the cache is full.
+        """
+        now = self.clock()
+        with self.lock:
+            conn = self.connection()
+            conn.execute(
+                'INSERT OR REPLACE INTO resolutions VALUES(?,?,?,?)',
+                (post_url, json.dumps(media), now, now)
+            )
+            self.evict(conn)
+            conn.commit()
+
+    def evict(self, conn):
+        """
+        Delete expired entries, and least recently used entries above
+        max_entries. Lock must be held by the caller.
+        """
+        expired = conn.execute(
+            'DELETE FROM resolutions WHERE ResolvedOn < ?',
+            (self.clock() - self.ttl,)
+        ).rowcount
+
+        excess = conn.execute('SELECT COUNT(*) FROM resolutions').fetchone()[0] - self.max_entries
+        if excess > 0:
+            conn.execute(
+                """DELETE FROM resolutions WHERE PostUrl IN (
+                     SELECT PostUrl FROM resolutions ORDER BY UsedOn LIMIT ?
+                   )""",
+                (excess,)
+            )
+        self.evictions += expired + max(0, excess)
+
+    def stats(self):
+        """
+        Return cache hits, misses and evicted entries.
+        """
+        return {
+            'hits' : self.hits,
+            'misses' : self.misses,
+            'evictions' : self.evictions,
+        }
+
+
+class DeadLinks(SqliteCache):
+    """
+    SQLite backed negative cache of links which failed permanently, and of
+    hosts which could not be found. Links are compared in canonical form, see
+    canonical_url().
+    """
+    DB_TEMPLATE = """
+    CREATE TABLE IF NOT EXISTS dead_links (
+      Link TEXT PRIMARY KEY,
+      Status INTEGER,
+      FailedOn REAL
+    );
+    """
+
+    # Statuses which will not change if the link is requested again
+    PERMANENT_STATUSES = (403, 404, 410)
+    # Lookups of a host which must fail before the host is taken as missing
+    HOST_FAILURES = 3
+
+    def __init__(self, path, ttl=30 * 24 * 3600, host_ttl=24 * 3600, clock=time):
+        """
+        Dead links expire after ttl seconds, and missing hosts after host_ttl
+        seconds, since domains can be registered again.
+        """
+        super().__init__(path, ttl, clock)
+        self.host_ttl = host_ttl
+        self.hits = 0
+        # failed lookups of hosts which are not taken as missing yet
+        self.host_failures = Counter()
+
+    def is_dead(self, url):
+        """
+        Check if the link, or its host, failed permanently and has not expired.
+        """
+        now = self.clock()
+        with self.lock:
+            rows = self.connection().execute(
+                'SELECT Link, FailedOn FROM dead_links WHERE Link IN (?, ?)',
+                (canonical_url(url), canonical_host(url))
+            ).fetchall()
+
+        for link, failed_on in rows:
+            ttl = self.host_ttl if link == canonical_host(url) else self.ttl
+            if now - failed_on <= ttl:
+                self.hits += 1
+                return True
+        return False
+
+    def add(self, url, status):
+        """
+        Remember a link which failed with a permanent HTTP status.
+        """
+        self.store(canonical_url(url), status)
+
+    def add_host(self, url):
+        """
+        Remember the host of a link which could not be found.
+        """
+        self.store(canonical_host(url), None)
+
+    def store(self, link, status):
+        """
+        Insert or refresh an entry of the negative cache.
+        """
+        with self.lock:
+            conn = self.connection()
+            conn.execute(
+                'INSERT OR REPLACE INTO dead_links VALUES(?,?,?)',
+                (link, status, self.clock())
+            )
+            conn.commit()
+
+    def record(self, url, error):
+        """
+        Remember a link if error is permanent: an HTTPError with a status from
+        PERMANENT_STATUSES, or a URLError caused by a host which does not
+        exist. A host is remembered once HOST_FAILURES lookups found no such
+        name, and temporary lookup failures (e.g. EAI_AGAIN while the network
+        is down) are never remembered. Return True if the link or its host was
+        remembered.
+        """
+        status = getattr(error, 'code', None)
+        if status is not None:
+            if status in self.PERMANENT_STATUSES:
+                self.add(url, status)
+                return True
+        elif is_missing_host(getattr(error, 'reason', None)):
+            host = canonical_host(url)
+            with self.lock:
+                self.host_failures[host] += 1
+                missing = self.host_failures[host] >= self.HOST_FAILURES
+                if missing: del self.host_failures[host]
+            if missing:
+                self.add_host(url)
+            return missing
+        return False
+
+    def stats(self):
+        """
+        Return the number of requests spared by the cache.
+        """
+        return {'hits' : self.hits}
+
+
+def is_missing_host(reason):
+    """
+    Check if the reason of a URLError is a host name which does not exist.
+    """
+    return isinstance(reason, socket.gaierror) and reason.errno == socket.EAI_NONAME
+
+
+def canonical_url(url):
+    """
+    Return the form of a link under which it is cached. Scheme and host are
+    lower-cased, and query and fragment are dropped. Example:
+
+    http://I.imgur.com/jedEzFL.jpg?1   ->  https://i.imgur.com/jedEzFL.jpg
+    """
+    parts = urlsplit(url)
+    return 'https://{}{}'.format(parts.netloc.lower(), parts.path)
+
+
+def canonical_host(url):
+    """
+    Return the form of a host under which it is cached. Example:
+
+    http://I.imgur.com/jedEzFL.jpg   ->  i.imgur.com
+    """
+    return urlsplit(url).netloc.lower()
@@ -0,0 +1,97 @@
+#!/usr/bin/python3
+
+
+"""
+Keeps the newest post seen in each crawled subreddit listing (its high-water
+mark) in the database of the destination directory. An incremental crawl stops
+as soon as it reaches posts which are not newer than the mark. Example usage:
+
+```python3
+state = CrawlState('~/memes')
+reddit = Reddit(url, 0, stop_at=state.load(url))
+...
+state.save(url, reddit.newest)
+```
+"""
+
+
+import os
+import sqlite3
+from collections import namedtuple
+from datetime import datetime
+from urllib.parse import urlsplit
+
+
+__author__ = 'petarGitNik'
+__copyright__ = 'Copyright (c) 2017 petarGitNik petargitnik@gmail.com'
+__version__ = 'v0.1.0'
+__license__ = 'MIT'
+__email__ = 'petargitnik@gmail.com'
+__status__ = 'Development'
+
+
+# url is the link to the comment section of a post, which identifies the post
+Mark = namedtuple('Mark', ['url', 'posted_on'])
+
+
+class CrawlState(object):
+    """
+    Reads and writes high-water marks in db.sqlite of a destination directory.
+    """
+    DB_TEMPLATE = """
+    CREATE TABLE IF NOT EXISTS crawl_state (
+      Listing TEXT PRIMARY KEY,
+      NewestPostUrl TEXT,
+      NewestPostedOn TEXT,
+      UpdatedOn TEXT
+    );
+    """
+
+    def __init__(self, destination):
+        self.db_path = os.path.join(destination, 'db.sqlite')
+
+    def listing_key(self, url):
+        """
+        Identify a listing by its path, so http/https and trailing slashes do
+        not matter. Example:
+
+        https://www.reddit.com/r/MemeEconomy/new/   ->  /r/memeeconomy/new
+        """
+        return urlsplit(url).path.rstrip('/').lower()
+
+    def load(self, url):
+        """
+        Return the mark of a listing, or None if it was never crawled. Nothing
+        is created if the database does not exist yet.
+        """
+        if not os.path.exists(self.db_path):
+            return None
+
+        conn = sqlite3.connect(self.db_path)
+        try:
+            row = conn.execute(
+                'SELECT NewestPostUrl, NewestPostedOn FROM crawl_state WHERE Listing = ?',
+                (self.listing_key(url),)
+            ).fetchone()
+        except sqlite3.OperationalError:
+            # crawl_state table does not exist yet
+            row = None
+        finally:
+            conn.close()
+
+        return Mark(*row) if row else None
+
+    def save(self, url, mark):
+        """
+        Store the mark of a listing, replacing the previous one.
+        """
+        conn = sqlite3.connect(self.db_path)
+        try:
+            conn.executescript(self.DB_TEMPLATE)
+            conn.execute(
+                'INSERT OR REPLACE INTO crawl_state VALUES(?,?,?,?)',
+                (self.listing_key(url), mark.url, mark.posted_on, str(datetime.now()))
+            )
+            conn.commit()
+        finally:
+            conn.close()
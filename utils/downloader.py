@@ -9,9 +9,16 @@ reddit = Reddit('https://www.reddit.com/r/MemeEconomy/', 2)
 reddit.get_all_posts()
 images = reddit.images
 
-downloader = Downloader(reddit, '~/memes', verbose=True)
+downloader = Downloader(reddit, '~/memes', verbose=True, workers=4)
 downloader.download_files()
 ```
+
+To start downloading as soon as the first page is crawled, stream the posts:
+
+```python3
+downloader = Downloader(reddit, '~/memes', verbose=True, workers=4)
+downloader.download_stream(reddit.iter_posts())
+```
 """
 
 
@@ -24,14 +31,29 @@ __status__ = 'Development'
 
 
 import os
-import sqlite3
-from contextlib import suppress
-from urllib.request import urlopen
+import json
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import FIRST_COMPLETED
+from concurrent.futures import wait
+from urllib.parse import urlparse
 from urllib.error import HTTPError
 from urllib.error import URLError
-from shutil import copyfileobj
-from utils.politeness import get_politeness_factor
+from collections import Counter
+from collections import defaultdict
+from collections import deque
+from collections import namedtuple
+from domainparsers.formats import format_of
+from utils.politeness import PolitenessScheduler
+from utils.pipeline import PostFeed
+from utils.httpclient import default_client
+from utils.metadata import MetadataWriter
+from utils.failurelog import FailureLog
+from utils.metrics import Measurement
+from utils.metrics import COUNT
+from utils.metrics import OBSERVE
 from datetime import datetime
+from time import perf_counter
 from time import sleep
 
 
@@ -47,6 +69,11 @@ class DownloaderListener(object):
             setattr(self, key, value)
 
 
+# Outcome of a successful download. Status is 304 if the file did not change
+# since it was downloaded before.
+Content = namedtuple('Content', ['status', 'digest', 'size', 'etag', 'last_modified'])
+
+
 class DownloaderException(Exception):
     """
     Raise this exception if there is something wrong with supplied path or with
@@ -58,31 +85,76 @@ class Downloader(object):
     """
     This class downloads files from provided source.
     """
-    DB_TEMPLATE = """
-    DROP TABLE IF EXISTS images;
-
-    CREATE TABLE images (
-      PostUrl TEXT,
-      ImageUrl TEXT,
-      Filename TEXT,
-      Domain TEXT,
-      PostTitle TEXT,
-      CommentSectionUrl TEXT,
-      PostedOn TEXT,
-      LastHtmlStatusCode INTEGER,
-      Downloaded INTEGER,
-      DownloadDate TEXT
-    );
-    """
+    HTTP_ERROR_MESSAGES = {
+        404 : 'File not found.',
+        429 : 'Too many requests were made to the server',
+        403 : 'Forbidden.',
+    }
 
-    def __init__(self, reddit, destination, verbose=False):
+    # Seconds to wait at most before new posts and pending records are checked
+    POLL_INTERVAL = 0.5
+
+    # Bytes read from the network at once
+    CHUNK_SIZE = 64 * 1024
+
+    # Requests made for a file while each of them makes progress
+    RESUME_ATTEMPTS = 3
+
+    def __init__(self, reddit, destination, verbose=False, workers=1,
+                 domain_limit=1, buffer_size=100, resume=False, dead_links=None,
+                 dedup='link', queue=None, budgets=None, profiler=None):
         """
         If variable self.downloading is set to False, download process is stopped.
+        Workers is the number of files downloaded at the same time, and
+        domain_limit is the number of those files which can come from the same
+        host. Each host is given a rate budget seeded from its politeness factor.
+        Buffer_size is the number of streamed posts which can wait for download.
+        If resume is True, files which were already downloaded to destination
+        are skipped. Dead_links is a DeadLinks cache. Files it contains are not
+        requested, and files which fail permanently are added to it.
+
+        Files are hashed while they are written. If dedup is 'link', a file
+        with the same content as an already downloaded file is replaced with a
+        hard link to it, if it is 'skip', the duplicate is deleted, and if it is
+        None, duplicates are kept.
+
+        If queue is a JobQueue, files are claimed from it before they are
+        downloaded, and marked done or failed. Files left over by an
+        interrupted run are downloaded first. Files which were crawled already
+        (e.g. by reddit.get_all_posts()) are in the queue as well, and are not
+        added again.
+
+        Budgets are DomainBudgets shared with other downloaders, so hosts are
+        limited across all of them. Profiler is a StageProfiler which profiles
+        download threads, see utils.profiling.
         """
         self.files = reddit.images
         self.total = reddit.count_downloadable_images()
         self.destination = self.valid_destination(destination)
         self.verbose = verbose
+        self.workers = max(1, workers)
+        self.domain_limit = max(1, domain_limit)
+        self.scheduler = PolitenessScheduler(budgets, domain_limit=self.domain_limit)
+        self.buffer_size = max(1, buffer_size)
+        self.feed = None
+        self.received = len(self.files)
+        self.resume = resume
+        self.skipped = 0
+        self.dead_links = dead_links
+        self.dead = 0
+        self.dedup = dedup
+        self.duplicates = 0
+        self.bytes_saved = 0
+        self.queue = queue
+        self.profiler = profiler
+        # files queued or downloading, and files waiting for them, by filename
+        self.destinations = Counter()
+        self.held = defaultdict(deque)
+        if queue is not None:
+            crawled = {queue.key(post) for post in self.files}
+            recovered = [post for post in queue.recover() if queue.key(post) not in crawled]
+            self.total += len([post for post in recovered if self.is_downloadable(post)])
+            self.files.extend(recovered)
 
         self.downloading = True
         self.observers = []
@@ -92,110 +164,414 @@ class Downloader(object):
         This function downloads files to a specified directory. Destination
         is a path to a directory where images will be stored. If verbose is
         True, then the download status is displayed.
+
+        Files are downloaded by a pool of self.workers threads. At most
+        self.domain_limit files are downloaded from a single host at the
+        same time, and each host is limited by its politeness budget.
+        Database records and log entries are written only from the calling
+        thread. Records are written in batches by MetadataWriter, and failures
+        are buffered by FailureLog. The working directory is not changed, so
+        several downloaders can run at the same time.
         """
-        current_directory = os.getcwd()
-        os.chdir(self.destination)
+        self.metadata = MetadataWriter(self.path('db.sqlite'))
+        self.failures = FailureLog(self.path('failures.jsonl'))
+        self.currently_downloading = 1
+        try:
+            with ThreadPoolExecutor(max_workers=self.workers) as pool:
+                self.run_downloads(pool)
+        finally:
+            self.metadata.close()
+            self.failures.close()
+
+    def run_downloads(self, pool):
+        """
+        Hand out files to the worker pool and process finished downloads until
+        there is nothing left to download, or downloading is stopped. The
+        scheduler decides which file is downloaded next, so a domain which
+        waits for its politeness budget never holds up other domains.
+        """
+        in_flight = {}
+        download = self.download_file
+        if self.profiler is not None:
+            download = self.profiler.wrap('download', download)
+
+        while self.downloading:
+            self.metadata.maybe_flush()
+            self.failures.maybe_flush()
+            self.fill_scheduler()
+            self.measure(OBSERVE, 'queue_depth', len(self.scheduler), 'download')
+
+            while len(in_flight) < self.workers:
+                job = self.scheduler.next_job()
+                if job is None:
+                    break
+
+                file_obj, host = job
+                if self.verbose:
+                    self.display_status(
+                        file_obj['image']['url'], self.currently_downloading, self.total
+                    )
+                previous = self.previous_download(file_obj)
+                future = pool.submit(download, file_obj, previous)
+                in_flight[future] = (file_obj, host, perf_counter())
+
+            if not in_flight:
+                if self.scheduler:
+                    slept = perf_counter()
+                    sleep(self.time_to_wait())
+                    self.measure(COUNT, 'sleep_seconds_total', perf_counter() - slept, 'download')
+                elif self.is_streaming():
+                    self.receive_files(timeout=self.POLL_INTERVAL)
+                else:
+                    break
+                continue
 
-        db_path = './db.sqlite'
+            done, _ = wait(
+                in_flight,
+                timeout=self.time_to_wait(),
+                return_when=FIRST_COMPLETED
+            )
+            for future in done:
+                file_obj, host, started = in_flight.pop(future)
+                self.scheduler.done(host)
+                if self.observers:
+                    self.measure_download(host, perf_counter() - started, *future.result())
+                self.handle_result(file_obj, *future.result())
+                self.release_destination(file_obj)
+
+    def download_stream(self, posts):
+        """
+        Download posts from an iterable, e.g. Reddit.iter_posts(), while it is
+        still being produced. Posts are produced in a separate thread, and at
+        most self.buffer_size of them wait for download at any time.
 
-        # Check if db exists in destination directory
-        if not self.db_exists(db_path):
-            conn = self.make_connection(db_path)
-            c = conn.cursor()
-            c.executescript(self.DB_TEMPLATE)
-            conn.commit()
+        If producing posts failed, posts produced until then are downloaded,
+        and the exception of the producer is raised.
+        """
+        self.feed = PostFeed(posts, self.buffer_size)
+        self.feed.start()
+        try:
+            self.download_files()
+        finally:
+            self.feed.stop()
 
-        conn = self.make_connection(db_path)
-        c = conn.cursor()
+        if self.feed.error:
+            raise self.feed.error
 
-        # Download, deal with exception, save to db, log things...
-        currently_downloading = 1
-        while self.files and self.downloading:
+    def is_streaming(self):
+        """
+        Check if more posts can arrive from the feed.
+        """
+        return self.feed is not None and not self.feed.exhausted
 
-            if self.observers:
-                self.update_observers(currently_at=currently_downloading)
+    def receive_files(self, timeout=0):
+        """
+        Take posts from the feed while there is room for them. Wait at most
+        timeout seconds for the first post.
+        """
+        while self.feed is not None and len(self.scheduler) < self.buffer_size:
+            file_obj = self.feed.get(timeout)
+            if file_obj is None:
+                break
+
+            timeout = 0
+            self.received += 1
+            if self.is_downloadable(file_obj): self.total += 1
+            self.files.append(file_obj)
+
+    def time_to_wait(self):
+        """
+        Return the number of seconds to wait for a finished download. New posts
+        from the feed, and records and failures which are due to be written,
+        are checked for at least every POLL_INTERVAL.
+        """
+        wait_time = self.scheduler.wait_time()
+        return min(wait_time, self.POLL_INTERVAL) if wait_time else self.POLL_INTERVAL
 
+    def fill_scheduler(self):
+        """
+        Move files waiting in self.files, and new posts from the feed, into the
+        scheduler. Files which cannot be downloaded are only logged. When
+        resuming, files which were already downloaded are skipped before any
+        request is made, and so are dead links.
+        """
+        self.receive_files()
+        while self.files:
             file_obj = self.files.popleft()
+            if self.is_downloadable(file_obj):
+                if self.resume and self.is_downloaded(file_obj):
+                    self.skip_file(file_obj)
+                    continue
+                if self.is_dead(file_obj):
+                    self.skip_dead_file(file_obj)
+                    continue
+                if self.queue is not None: self.queue.claim(file_obj)
+                self.schedule(file_obj)
+            else:
+                # write_a_record_to_db(file_obj, file_obj['last_http_status'], 0)
+                self.write_log(file_obj, 'not downloadable')
+                if self.queue is not None: self.queue.fail(file_obj)
 
-            image_url = file_obj['image']['url']
-            filename = file_obj['image']['filename']
-            token = file_obj['http_status_token']
+    def schedule(self, file_obj):
+        """
+        Queue a file in the scheduler. A file with the same filename as a file
+        which is queued or downloading waits until that one is finished, so two
+        downloads never write the same .part file.
+        """
+        filename = file_obj['image']['filename']
+        if self.destinations[filename]:
+            self.held[filename].append(file_obj)
+            return
+        self.destinations[filename] += 1
+        self.scheduler.put(file_obj, self.get_host(file_obj['image']['url']))
+
+    def release_destination(self, file_obj):
+        """
+        Forget a finished file, and queue the next file waiting for its
+        filename.
+        """
+        filename = file_obj['image']['filename']
+        self.destinations[filename] -= 1
+        if self.destinations[filename] <= 0:
+            del self.destinations[filename]
+        held = self.held.get(filename)
+        if held:
+            self.schedule(held.popleft())
+            if not held:
+                del self.held[filename]
+
+    def is_downloaded(self, file_obj):
+        """
+        Check if the image url, or the filename, of a file was already
+        downloaded.
+        """
+        return self.metadata.is_downloaded(
+            file_obj['image']['url'], file_obj['image']['filename']
+        )
 
-            # to implement: check in db if file was downloaded already
-            if image_url and token < 3:
-                if self.verbose:
-                    self.display_status(file_obj['image']['url'], currently_downloading, self.total)
-
-                sldn = file_obj['second_level_domain_name']
-                crawl_time = get_politeness_factor(sldn)
-
-                try:
-                    self.write_file_to_filesystem(image_url, filename)
-                except HTTPError as e:
-                    status = e.code
-                    print('Could not download, error status:', status)
-
-                    if status == 404:
-                        if self.verbose: print('File not found.')
-                        file_obj['last_http_status'] = status
-
-                        self.write_a_record_to_db(c, file_obj, status, 0)
-                        self.write_log(file_obj)
-                        currently_downloading += 1
-                    elif status == 429:
-                        if self.verbose: print('Too many requests were made to the server')
-                        file_obj['last_http_status'] = status
-
-                        self.write_a_record_to_db(c, file_obj, status, 0)
-                        self.write_log(file_obj)
-                        currently_downloading += 1
-                    elif status == 403:
-                        if self.verbose: print('Forbidden.')
-                        file_obj['last_http_status'] = status
-
-                        self.write_a_record_to_db(c, file_obj, status, 0)
-                        self.write_log(file_obj)
-                        currently_downloading += 1
-                    else:
-                        if self.verbose and token < 2: print('Downloading will be retried later.')
-                        if self.verbose and token == 2: print('Could not download.')
-                        file_obj['last_http_status'] = status
-                        file_obj['http_status_token'] += 1
-
-                        if token < 3:
-                            self.files.append(file_obj)
-                        else:
-                            self.write_a_record_to_db(c, file_obj, status, 0)
-                            self.write_log(file_obj)
-                except URLError as e:
-                    if self.verbose: print('Something went wrong.')
-                    if self.verbose: print(e.reason)
-
-                    self.write_a_record_to_db(c, file_obj, file_obj['last_http_status'], 0)
-                    self.write_log(file_obj)
-                    currently_downloading += 1
+    def skip_file(self, file_obj):
+        """
+        Count a file which was already downloaded as done.
+        """
+        if self.verbose: print('Already downloaded:', file_obj['image']['url'])
+        self.skipped += 1
+        self.file_done(file_obj)
+
+    def is_dead(self, file_obj):
+        """
+        Check if the file, or its host, failed permanently in a previous
+        download.
+        """
+        return (self.dead_links is not None and
+                self.dead_links.is_dead(file_obj['image']['url']))
+
+    def skip_dead_file(self, file_obj):
+        """
+        Log a dead link as failed without requesting it.
+        """
+        if self.verbose: print('Dead link:', file_obj['image']['url'])
+        self.dead += 1
+        self.write_log(file_obj, 'dead link')
+        self.file_done(file_obj, failed=True)
+
+    def get_host(self, url):
+        """
+        Return the host a url points to. Politeness is enforced per host.
+        """
+        return urlparse(url).netloc
+
+    def is_downloadable(self, file_obj):
+        """
+        Check if the file has a direct link, and has not run out of retries.
+        """
+        return file_obj['image']['url'] and file_obj['http_status_token'] < 3
+
+    def previous_download(self, file_obj):
+        """
+        Return the Content of an earlier download of a file which is still in
+        the destination directory, or None.
+        """
+        if not os.path.isfile(self.path(file_obj['image']['filename'])):
+            return None
+        row = self.metadata.find_download(file_obj['image']['url'])
+        return Content(304, *row) if row else None
+
+    def download_file(self, file_obj, previous=None):
+        """
+        Download a single file. This method runs in a worker thread, so it
+        returns the exception instead of raising it. Returns a pair of the
+        exception, or None, and the Content of the file.
+
+        If the connection drops after a part of the file was written, the rest
+        is requested again, up to RESUME_ATTEMPTS times. A file which cannot be
+        written (OSError) fails, and does not stop other downloads.
+        """
+        url = file_obj['image']['url']
+        filename = self.path(file_obj['image']['filename'])
+        for attempt in range(1, self.RESUME_ATTEMPTS + 1):
+            written = self.partial_size(filename)
+            try:
+                return (None, self.write_file_to_filesystem(url, filename, previous))
+            except URLError as e:
+                if attempt == self.RESUME_ATTEMPTS or self.partial_size(filename) <= written:
+                    return (e, None)
+                if self.verbose: print('Resuming download:', url)
+            except OSError as e:
+                return (e, None)
+
+    def partial_size(self, filename):
+        """
+        Return the number of bytes of a file which were written so far.
+        """
+        part = self.partial_filename(filename)
+        return os.path.getsize(part) if os.path.isfile(part) else 0
+
+    def partial_filename(self, filename):
+        """
+        Return the name of the temporary file a file is written to.
+        """
+        return filename + '.part'
+
+    def validators_filename(self, filename):
+        """
+        Return the name of the file which keeps the url, ETag and Last-Modified
+        of the response a .part file was written from.
+        """
+        return self.partial_filename(filename) + '.json'
+
+    def save_validators(self, filename, url, etag, last_modified):
+        """
+        Remember which response the .part file of a file is written from.
+        """
+        with open(self.validators_filename(filename), 'w') as f:
+            json.dump({'url' : url, 'etag' : etag, 'last_modified' : last_modified}, f)
+
+    def resume_validator(self, filename, url):
+        """
+        Return the validator which is sent in If-Range to continue the .part
+        file of a file, or None if it is not known which response of url the
+        .part file came from. A weak ETag cannot be used in If-Range.
+        """
+        try:
+            with open(self.validators_filename(filename)) as f:
+                saved = json.load(f)
+        except (OSError, ValueError):
+            return None
+
+        if saved.get('url') != url:
+            return None
+        etag = saved.get('etag')
+        if etag and not etag.startswith('W/'):
+            return etag
+        return saved.get('last_modified')
+
+    def discard_partial(self, filename):
+        """
+        Remove the .part file of a file, and its validators.
+        """
+        for name in (self.partial_filename(filename), self.validators_filename(filename)):
+            if os.path.isfile(name): os.remove(name)
+
+    def handle_result(self, file_obj, error, content=None):
+        """
+        Save to db and log the outcome of a download, or queue the file again if
+        the download should be retried.
+        """
+        if error is not None and self.dead_links is not None:
+            self.dead_links.record(file_obj['image']['url'], error)
+
+        if error is None:
+            if content is not None and content.status != 304 and self.dedup:
+                self.deduplicate(file_obj, content.digest, content.size)
+            status = content.status if content is not None else 200
+            self.write_a_record_to_db(file_obj, status, 1, content)
+            self.file_done(file_obj)
+        elif isinstance(error, HTTPError):
+            status = error.code
+            print('Could not download, error status:', status)
+            file_obj['last_http_status'] = status
+
+            if status in (404, 429, 403):
+                if self.verbose: print(self.HTTP_ERROR_MESSAGES[status])
+
+                self.write_a_record_to_db(file_obj, status, 0)
+                self.write_log(file_obj, error.reason)
+                self.file_done(file_obj, failed=True)
+            else:
+                token = file_obj['http_status_token']
+                if self.verbose and token < 2: print('Downloading will be retried later.')
+                if self.verbose and token == 2: print('Could not download.')
+                file_obj['http_status_token'] += 1
+
+                if file_obj['http_status_token'] < 3:
+                    self.measure(COUNT, 'retries_total', 1, 'download',
+                                 urlparse(file_obj['image']['url']).netloc)
+                    self.files.append(file_obj)
+                    if self.queue is not None: self.queue.release(file_obj)
                 else:
-                    # This is else from try/except - a bit unreadable
-                    self.write_a_record_to_db(c, file_obj, 200, 1)
-                    currently_downloading += 1
-
-                # If two consecutive domains are different, there is no need to
-                # wait for the next download
-                with suppress(IndexError):
-                    if file_obj['domain'] == self.files[1]['domain']:
-                        sleep(crawl_time)
+                    self.write_a_record_to_db(file_obj, status, 0)
+                    self.write_log(file_obj, error.reason)
+                    self.file_done(file_obj, failed=True)
+        else:
+            reason = getattr(error, 'reason', error)
+            if self.verbose: print('Something went wrong.')
+            if self.verbose: print(reason)
+
+            self.write_a_record_to_db(file_obj, file_obj['last_http_status'], 0)
+            self.write_log(file_obj, str(reason))
+            self.file_done(file_obj, failed=True)
+
+    def deduplicate(self, file_obj, digest, size):
+        """
+        Replace a downloaded file with a hard link to an earlier file with the
+        same content, or delete it if self.dedup is 'skip'. If the file system
+        does not support hard links, the copy is kept.
+        """
+        duplicate = file_obj['image']['filename']
+        filename = self.path(duplicate)
+        original = self.metadata.find_content(digest)
+        if original is None:
+            return
+        original_path = self.path(original)
+        if not os.path.isfile(original_path) or os.path.samefile(original_path, filename):
+            return
+
+        if self.dedup == 'skip':
+            os.remove(filename)
+            file_obj['image']['filename'] = original
+        else:
+            link = filename + '.link'
+            try:
+                os.link(original_path, link)
+            except OSError:
+                return
+            os.replace(link, filename)
+
+        if self.verbose: print('Duplicate of {}: {}'.format(original, duplicate))
+        self.duplicates += 1
+        self.bytes_saved += size
+
+    def file_done(self, file_obj=None, failed=False):
+        """
+        Advance download progress, and notify observers about it. The file is
+        marked done, or failed, in the queue.
+        """
+        if self.queue is not None and file_obj is not None:
+            if failed:
+                self.queue.fail(file_obj)
             else:
-                # write_a_record_to_db(c, file_obj, file_obj['last_http_status'], 0)
-                self.write_log(file_obj)
+                self.queue.done(file_obj)
 
-        conn.commit()
-        conn.close()
-        os.chdir(current_directory)
+        self.currently_downloading += 1
+        if self.observers:
+            self.update_observers(currently_at=self.currently_downloading)
 
-    def write_a_record_to_db(self, cursor, file_obj, status, downloaded):
+    def write_a_record_to_db(self, file_obj, status, downloaded, content=None):
         """
-        Insert metadata into database.
+        Insert metadata into database. Records are written in batches. Content
+        describes a downloaded file.
         """
+        content = content or Content(status, None, None, None, None)
         image = (
             file_obj['url'],
             file_obj['image']['url'],
@@ -207,15 +583,118 @@ class Downloader(object):
             status,
             downloaded,
             str(datetime.now()),
+            content.digest,
+            content.size,
+            content.etag,
+            content.last_modified,
+            format_of(file_obj['image']['url']),
         )
-        cursor.execute("INSERT INTO images VALUES(?,?,?,?,?,?,?,?,?,?)", image)
+        self.metadata.write(image)
+
+    def write_file_to_filesystem(self, url, filename, previous=None):
+        """
+        Write a file to a file system, and return its Content. The file is
+        requested on a pooled connection of the shared HTTP client.
+
+        The file is written to a temporary .part file, which is renamed when
+        the whole file has arrived, so an interrupted download never looks
+        complete. A .part file left by an interrupted download is continued
+        with a Range request, and with the ETag or Last-Modified of the
+        interrupted response in If-Range, so a file which changed since is
+        sent whole. A .part file whose response is not known, or a range which
+        does not start at its end, starts the download over. If previous is
+        the Content of an earlier download, the file is requested only if it
+        changed since.
+        """
+        part = self.partial_filename(filename)
+        offset = self.partial_size(filename)
+        validator = self.resume_validator(filename, url) if offset else None
+        if offset and validator is None:
+            self.discard_partial(filename)
+            offset = 0
+
+        headers = {}
+        if offset:
+            headers['Range'] = 'bytes={}-'.format(offset)
+            headers['If-Range'] = validator
+        elif previous is not None:
+            if previous.etag: headers['If-None-Match'] = previous.etag
+            if previous.last_modified: headers['If-Modified-Since'] = previous.last_modified
+
+        try:
+            r = default_client.open(url, headers)
+        except HTTPError as e:
+            if e.code != 416 or not offset:
+                raise
+            # The .part file does not fit the file on the server any more
+            self.discard_partial(filename)
+            return self.write_file_to_filesystem(url, filename, previous)
+
+        with r:
+            if r.status == 304 and previous is not None:
+                return previous
+
+            if r.status == 206 and self.range_start(r) != offset:
+                self.discard_partial(filename)
+                return self.write_file_to_filesystem(url, filename, previous)
+
+            sha256 = hashlib.sha256()
+            if r.status == 206:
+                with open(part, 'rb') as f:
+                    self.copy_file(f, None, sha256)
+            else:
+                offset = 0
+                self.save_validators(filename, url, r.getheader('ETag'),
+                                     r.getheader('Last-Modified'))
+
+            with open(part, 'ab' if offset else 'wb') as f:
+                digest, size = self.copy_file(r, f, sha256)
+            size += offset
+
+            expected = self.expected_size(r, offset)
+            if expected is not None and size != expected:
+                raise URLError('Incomplete file, {} of {} bytes: {}'.format(size, expected, url))
+
+            os.replace(part, filename)
+            self.discard_partial(filename)
+            return Content(r.status, digest, size, r.getheader('ETag'),
+                           r.getheader('Last-Modified'))
+
+    def range_start(self, response):
+        """
+        Return the first byte of a partial response from its Content-Range,
+        e.g. 'bytes 1000-4999/5000', or None if it is not known.
+        """
+        content_range = response.getheader('Content-Range') or ''
+        unit, _, positions = content_range.partition(' ')
+        start = positions.split('-')[0]
+        return int(start) if unit == 'bytes' and start.isdigit() else None
 
-    def write_file_to_filesystem(self, url, filename):
+    def expected_size(self, response, offset):
         """
-        Write a file to a file system.
+        Return the full size of a file from response headers, or None if it is
+        not known.
         """
-        with urlopen(url) as r, open(filename, 'wb') as f:
-            copyfileobj(r, f)
+        length = response.getheader('Content-Length')
+        if length is None or response.getheader('Content-Encoding'):
+            return None
+        return offset + int(length)
+
+    def copy_file(self, source, target, sha256=None):
+        """
+        Copy a file object in chunks, and return the SHA-256 digest and the size
+        of the copied bytes. Bytes are hashed while they are written, so the
+        file is never read again. If target is None, bytes are only hashed.
+        """
+        if sha256 is None: sha256 = hashlib.sha256()
+        size = 0
+        chunk = source.read(self.CHUNK_SIZE)
+        while chunk:
+            sha256.update(chunk)
+            if target is not None: target.write(chunk)
+            size += len(chunk)
+            chunk = source.read(self.CHUNK_SIZE)
+        return (sha256.hexdigest(), size)
 
     def display_status(self, url, currently_at, total):
         """
@@ -228,17 +707,11 @@ class Downloader(object):
             )
         )
 
-    def make_connection(self, path):
+    def path(self, filename):
         """
-        Make connection to database.
+        Return the path of a file in the destination directory.
         """
-        return sqlite3.connect(path)
-
-    def db_exists(self, path):
-        """
-        Checks if the directory/file exists on a given path.
-        """
-        return os.path.exists(path)
+        return os.path.join(self.destination, filename)
 
     def valid_destination(self, path):
         """
@@ -248,16 +721,11 @@ class Downloader(object):
             return path
         raise DownloaderException('Destination directory does not exist.')
 
-    def write_log(self, post):
+    def write_log(self, post, reason=None):
         """
-        Write to a log file.
+        Write to the failure log. Entries are buffered, see FailureLog.
         """
-        with open('download.log', 'a') as f:
-            f.write(''.join(['-'*15, ' ', str(datetime.now()), ' ', '-'*15, '\n']))
-            f.write(''.join(['Post URL -> ', post['url'], '\n']))
-            f.write(''.join(['Post Comments -> ', post['link_to_comments'], '\n']))
-            f.write(''.join(['Last HTTP status -> ', str(post['last_http_status']), '\n']))
-            f.write('\n')
+        self.failures.write(post, reason)
 
     def register(self, observer):
         """
@@ -280,3 +748,21 @@ class Downloader(object):
         """
         for observer in self.observers:
             observer.update(**kwargs)
+
+    def measure(self, kind, name, value, stage, domain=None):
+        """
+        Report a measurement to observers, see utils.metrics.
+        """
+        if self.observers:
+            self.update_observers(measurement=Measurement(kind, name, value, stage, domain))
+
+    def measure_download(self, host, elapsed, error, content=None):
+        """
+        Report the duration and size of a finished download.
+        """
+        self.measure(COUNT, 'requests_total', 1, 'download', host)
+        self.measure(OBSERVE, 'latency_seconds', elapsed, 'download', host)
+        if error is not None:
+            self.measure(COUNT, 'errors_total', 1, 'download', host)
+        elif content is not None and content.status != 304:
+            self.measure(COUNT, 'bytes_total', content.size, 'download', host)
@@ -0,0 +1,130 @@
+#!/usr/bin/python3
+
+
+"""
+Logs posts which could not be downloaded into failures.jsonl of the destination
+directory, one JSON object per line. The file is opened once per run, and
+entries are buffered and written every buffer_size entries or every
+flush_interval seconds, whichever comes first. Example usage:
+
+```python3
+log = FailureLog('./failures.jsonl')
+log.write(post, reason='Not Found')
+log.close()
+
+for failure in load_failures('./failures.jsonl'):
+    print(failure['post_url'], failure['status'])
+```
+"""
+
+
+import json
+from datetime import datetime
+from time import monotonic
+
+
+__author__ = 'petarGitNik'
+__copyright__ = 'Copyright (c) 2017 petarGitNik petargitnik@gmail.com'
+__version__ = 'v0.1.0'
+__license__ = 'MIT'
+__email__ = 'petargitnik@gmail.com'
+__status__ = 'Development'
+
+
+class FailureLog(object):
+    """
+    Buffered writer of the failure log.
+    """
+
+    def __init__(self, path, buffer_size=100, flush_interval=5):
+        self.path = path
+        self.buffer_size = buffer_size
+        self.flush_interval = flush_interval
+
+        # the file is created only when the first failure is written
+        self.f = None
+        self.pending = []
+        self.flushed_at = monotonic()
+        self.count = 0
+
+    def entry(self, post, reason=None):
+        """
+        Return the log entry of a post. Example:
+
+        {"logged_on": "2017-08-01 12:00:00.000000",
+         "post_url": "https://imgur.com/a/abc", "image_url": null,
+         "link_to_comments": "https://www.reddit.com/r/...", "domain": "imgur.com",
+         "status": 404, "retries": 0, "reason": "Not Found"}
+        """
+        image = post.get('image') or {}
+        return {
+            'logged_on' : str(datetime.now()),
+            'post_url' : post['url'],
+            'image_url' : image.get('url'),
+            'link_to_comments' : post['link_to_comments'],
+            'domain' : post['domain'],
+            'status' : post['last_http_status'],
+            'retries' : post['http_status_token'],
+            'reason' : reason,
+        }
+
+    def write(self, post, reason=None):
+        """
+        Queue a log entry of a post. Pending entries are written when the
+        buffer is full, or when flush_interval seconds passed since the last
+        flush.
+        """
+        self.pending.append(json.dumps(self.entry(post, reason)))
+        self.count += 1
+        if len(self.pending) >= self.buffer_size:
+            self.flush()
+        else:
+            self.maybe_flush()
+
+    def maybe_flush(self):
+        """
+        Write pending entries if flush_interval seconds passed since the last
+        flush. Call this periodically, so entries are written in time even
+        when no new failure arrives.
+        """
+        if self.pending and monotonic() - self.flushed_at >= self.flush_interval:
+            self.flush()
+
+    def flush(self):
+        """
+        Write all pending entries to the file.
+        """
+        if self.pending:
+            if self.f is None:
+                self.f = open(self.path, 'a')
+            self.f.write('\n'.join(self.pending) + '\n')
+            self.f.flush()
+            del self.pending[:]
+        self.flushed_at = monotonic()
+
+    def close(self):
+        """
+        Write pending entries and close the file.
+        """
+        self.flush()
+        if self.f is not None:
+            self.f.close()
+            self.f = None
+
+
+def load_failures(path):
+    """
+    Return a list of entries from a failure log, oldest first. A missing file
+    is an empty log, and a line cut short by a crash is ignored.
+    """
+    failures = []
+    try:
+        with open(path) as f:
+            for line in f:
+                try:
+                    failures.append(json.loads(line))
+                except ValueError:
+                    continue
+    except FileNotFoundError:
+        pass
+    return failures
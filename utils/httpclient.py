@@ -0,0 +1,302 @@
+#!/usr/bin/python3
+
+
+"""
+Shared HTTP client used by the downloader and by domain parsers. Connections
+are kept alive and pooled per host, so consecutive requests to the same host
+skip the TCP/TLS handshake. HTML pages can be requested compressed, and are
+decompressed while they are read. Example usage:
+
+```python3
+from utils.httpclient import default_client
+
+with default_client.open('https://imgur.com/a/vTTHZ?grid', compressed=True) as r:
+    html = r.read().decode('utf-8')
+
+print(default_client.stats())
+```
+
+Errors are reported with the same exceptions urllib uses: HTTPError for error
+statuses, and URLError for everything else, including timeouts.
+"""
+
+
+import socket
+import threading
+import zlib
+from collections import defaultdict
+from collections import deque
+from http.client import HTTPConnection
+from http.client import HTTPSConnection
+from http.client import HTTPException
+from urllib.parse import urljoin
+from urllib.parse import urlsplit
+from urllib.error import HTTPError
+from urllib.error import URLError
+
+
+__author__ = 'petarGitNik'
+__copyright__ = 'Copyright (c) 2017 petarGitNik petargitnik@gmail.com'
+__version__ = 'v0.1.0'
+__license__ = 'MIT'
+__email__ = 'petargitnik@gmail.com'
+__status__ = 'Development'
+
+
+class HttpResponse(object):
+    """
+    File-like body of a response. Compressed bodies are decompressed while they
+    are read. When the response is closed after its body was read completely,
+    its connection goes back to the pool.
+    """
+
+    CHUNK_SIZE = 64 * 1024
+
+    def __init__(self, client, key, connection, response, url):
+        self.client = client
+        self.key = key
+        self.connection = connection
+        self.response = response
+        self.url = url
+        self.status = response.status
+        self.headers = response.headers
+        self.decompressor = self.make_decompressor(
+            response.getheader('Content-Encoding', '')
+        )
+        self.buffer = b''
+        self.closed = False
+
+    def make_decompressor(self, encoding):
+        """
+        Return a streaming decompressor for gzip or deflate encoded bodies, or
+        None if the body is not compressed.
+        """
+        encoding = encoding.strip().lower()
+        if encoding == 'gzip':
+            return zlib.decompressobj(16 + zlib.MAX_WBITS)
+        if encoding == 'deflate':
+            return zlib.decompressobj()
+        return None
+
+    def getheader(self, name, default=None):
+        return self.response.getheader(name, default)
+
+    def read(self, size=-1):
+        """
+        Read up to size bytes of the (decompressed) body. If size is negative,
+        read the whole body.
+        """
+        try:
+            if self.decompressor is None:
+                return self.response.read() if size < 0 else self.response.read(size)
+            return self.read_decompressed(size)
+        except (socket.timeout, OSError, HTTPException) as e:
+            self.close()
+            raise URLError(e)
+
+    def read_decompressed(self, size):
+        """
+        Decompress raw chunks until size bytes are available, or the body ends.
+        """
+        while size < 0 or len(self.buffer) < size:
+            chunk = self.response.read(self.CHUNK_SIZE)
+            if not chunk:
+                self.buffer += self.decompressor.flush()
+                break
+            self.buffer += self.decompressor.decompress(chunk)
+
+        if size < 0:
+            data, self.buffer = self.buffer, b''
+        else:
+            data, self.buffer = self.buffer[:size], self.buffer[size:]
+        return data
+
+    def close(self):
+        """
+        Return the connection to the pool if the body was read completely, and
+        close it otherwise.
+        """
+        if self.closed:
+            return
+        self.closed = True
+
+        reusable = self.response.isclosed() and not self.response.will_close
+        self.response.close()
+        if reusable:
+            self.client.release(self.key, self.connection)
+        else:
+            self.connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class HttpClient(object):
+    """
+    HTTP client with per-host connection pooling. Connect_timeout limits
+    establishing a connection, and read_timeout limits waiting for data on an
+    established connection. The client is thread-safe, but a single response
+    must be read by one thread.
+
+    Hosts maps host names to (address, port) of a server which serves them
+    over plain HTTP, like /etc/hosts does for addresses. It is used to run a
+    crawl against a local stand-in of the real sites, see benchmarks.fakesite.
+    """
+
+    USER_AGENT = 'reddit-image-downloader/0.1 (by /u/petarGitNik)'
+
+    # Errors of a pooled connection which was closed by the server while idle
+    STALE_CONNECTION_ERRORS = (HTTPException, ConnectionError)
+
+    def __init__(self, connect_timeout=10, read_timeout=30, max_idle_per_host=4,
+                 max_redirects=5, hosts=None):
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.max_idle_per_host = max_idle_per_host
+        self.max_redirects = max_redirects
+        self.hosts = dict(hosts or {})
+
+        self.lock = threading.Lock()
+        self.idle = defaultdict(deque)
+        self.counters = defaultdict(int)
+
+    def open(self, url, headers=None, compressed=False, method='GET'):
+        """
+        Send a request, and return an HttpResponse. Redirects are followed. If
+        compressed is True, the server is asked to compress the body. Raises
+        HTTPError for statuses of 400 and above, and URLError when the server
+        cannot be reached.
+        """
+        request_headers = {'User-Agent' : self.USER_AGENT}
+        request_headers['Accept-Encoding'] = 'gzip, deflate' if compressed else 'identity'
+        request_headers.update(headers or {})
+
+        for _ in range(self.max_redirects + 1):
+            response = self.request(method, url, request_headers)
+
+            location = response.getheader('Location')
+            if response.status in (301, 302, 303, 307, 308) and location:
+                response.read()
+                response.close()
+                url = urljoin(url, location)
+                if response.status == 303:
+                    method = 'GET'
+                continue
+
+            if response.status >= 400:
+                response.read()
+                response.close()
+                raise HTTPError(url, response.status, response.response.reason,
+                                response.headers, None)
+            return response
+
+        raise URLError('Too many redirects: {}'.format(url))
+
+    def request(self, method, url, headers):
+        """
+        Send a single request on a pooled connection. A pooled connection which
+        turns out to be closed by the server is replaced once by a new one.
+        """
+        parts = urlsplit(url)
+        key = (parts.scheme, parts.hostname, parts.port)
+        path = parts.path or '/'
+        if parts.query:
+            path = '?'.join([path, parts.query])
+        if parts.hostname in self.hosts:
+            headers = dict(headers, Host=parts.netloc)
+
+        connection, reused = self.acquire(key)
+        try:
+            try:
+                connection.request(method, path, headers=headers)
+                response = connection.getresponse()
+            except self.STALE_CONNECTION_ERRORS:
+                connection.close()
+                if not reused:
+                    raise
+                connection, reused = self.connect(key), False
+                connection.request(method, path, headers=headers)
+                response = connection.getresponse()
+        except (socket.timeout, OSError, HTTPException) as e:
+            connection.close()
+            raise URLError(e)
+
+        self.count('requests')
+        self.count('reused' if reused else 'opened')
+        return HttpResponse(self, key, connection, response, url)
+
+    def acquire(self, key):
+        """
+        Take an idle connection to a host from the pool, or open a new one.
+        Return the connection, and whether it was reused.
+        """
+        with self.lock:
+            if self.idle[key]:
+                return (self.idle[key].pop(), True)
+        return (self.connect(key), False)
+
+    def connect(self, key):
+        """
+        Open a new connection to a host.
+        """
+        scheme, host, port = key
+        if host in self.hosts:
+            connection = HTTPConnection(*self.hosts[host], timeout=self.connect_timeout)
+        elif scheme == 'https':
+            connection = HTTPSConnection(host, port, timeout=self.connect_timeout)
+        elif scheme == 'http':
+            connection = HTTPConnection(host, port, timeout=self.connect_timeout)
+        else:
+            raise URLError('Unsupported scheme: {}'.format(scheme))
+
+        try:
+            connection.connect()
+        except (socket.timeout, OSError) as e:
+            connection.close()
+            raise URLError(e)
+        connection.sock.settimeout(self.read_timeout)
+        return connection
+
+    def release(self, key, connection):
+        """
+        Put a connection back into the pool, or close it if the pool is full.
+        """
+        with self.lock:
+            if len(self.idle[key]) < self.max_idle_per_host:
+                self.idle[key].append(connection)
+                return
+        connection.close()
+
+    def count(self, name, value=1):
+        with self.lock:
+            self.counters[name] += value
+
+    def stats(self):
+        """
+        Return the number of requests, and of connections which were opened or
+        reused for them.
+        """
+        with self.lock:
+            return {
+                'requests' : self.counters['requests'],
+                'opened' : self.counters['opened'],
+                'reused' : self.counters['reused'],
+                'idle' : sum(len(pool) for pool in self.idle.values()),
+            }
+
+    def close(self):
+        """
+        Close all idle connections.
+        """
+        with self.lock:
+            pools = list(self.idle.values())
+            self.idle.clear()
+        for pool in pools:
+            for connection in pool:
+                connection.close()
+
+
+default_client = HttpClient()
@@ -0,0 +1,276 @@
+#!/usr/bin/python3
+
+
+"""
+Persistent queue of crawled posts, kept in queue.sqlite of the destination
+directory. Every post is a job which goes through these states:
+
+discovered  ->  resolved  ->  downloading  ->  done
+                                           ->  failed
+
+Reddit adds posts as they are discovered on listing pages, together with the
+listing page where crawling continues (the frontier), and marks them resolved
+once their direct links are known. An album post is resolved into one job per
+image, and the album post itself is done. Downloader claims resolved posts, and
+marks them done or failed. A claimed post is leased to the claiming process.
+Example usage:
+
+```python3
+queue = JobQueue('~/memes/queue.sqlite')
+reddit = Reddit(url, 0, queue=queue)
+downloader = Downloader(reddit, '~/memes', queue=queue)
+downloader.download_stream(reddit.iter_posts())
+```
+
+If the process crashes, or is stopped, a new process with the same queue
+continues crawling from the frontier, resolves discovered posts again, and
+downloads resolved posts and posts whose lease has expired.
+"""
+
+
+import json
+import os
+import sqlite3
+import threading
+from collections import deque
+from time import time
+from domainparsers.records import MediaItem
+from domainparsers.records import Post
+
+
+__author__ = 'petarGitNik'
+__copyright__ = 'Copyright (c) 2017 petarGitNik petargitnik@gmail.com'
+__version__ = 'v0.1.0'
+__license__ = 'MIT'
+__email__ = 'petargitnik@gmail.com'
+__status__ = 'Development'
+
+
+DISCOVERED = 'discovered'
+RESOLVED = 'resolved'
+DOWNLOADING = 'downloading'
+DONE = 'done'
+FAILED = 'failed'
+
+
+class JobQueue(object):
+    """
+    SQLite backed queue of posts. It can be shared between threads. Lease is
+    the number of seconds for which a claimed post belongs to the claiming
+    process. Leases of processes which are not running any more expire
+    immediately.
+    """
+    DB_TEMPLATE = """
+    CREATE TABLE IF NOT EXISTS jobs (
+      Key TEXT PRIMARY KEY,
+      Post TEXT,
+      State TEXT,
+      Owner INTEGER,
+      LeasedUntil REAL,
+      UpdatedOn REAL
+    );
+    CREATE INDEX IF NOT EXISTS jobs_state ON jobs (State);
+    CREATE TABLE IF NOT EXISTS frontier (
+      Listing TEXT PRIMARY KEY,
+      NextPage TEXT,
+      Pages INTEGER
+    );
+    """
+
+    def __init__(self, path, lease=600, clock=time):
+        self.lease = lease
+        self.clock = clock
+        self.owner = os.getpid()
+
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA synchronous=NORMAL')
+        self.conn.executescript(self.DB_TEMPLATE)
+
+    def key(self, post, part=True):
+        """
+        Return the key of a post. Posts are identified by their comment
+        section, since the same link can be posted many times. Images of an
+        album post are identified by their part as well, unless part is False.
+        """
+        key = post['link_to_comments'] or post['url']
+        if part and post.get('part'):
+            key = '{}#{}'.format(key, post['part'])
+        return key
+
+    def discover(self, posts, listing, next_page, pages):
+        """
+        Add posts of a listing page, and move the frontier of the listing to
+        next_page, after pages crawled pages, in a single transaction. Return
+        posts which were not in the queue before.
+        """
+        now = self.clock()
+        new = deque()
+        with self.lock, self.conn:
+            for post in posts:
+                inserted = self.conn.execute(
+                    'INSERT OR IGNORE INTO jobs VALUES(?,?,?,NULL,NULL,?)',
+                    (self.key(post), dumps(post), DISCOVERED, now)
+                ).rowcount
+                if inserted: new.append(post)
+
+            self.conn.execute(
+                'INSERT OR REPLACE INTO frontier VALUES(?,?,?)',
+                (listing, next_page, pages)
+            )
+        return new
+
+    def frontier(self, listing):
+        """
+        Return (next_page, pages) where an unfinished crawl of a listing
+        continues, or None if the listing should be crawled from the start.
+        """
+        with self.lock:
+            row = self.conn.execute(
+                'SELECT NextPage, Pages FROM frontier WHERE Listing = ?', (listing,)
+            ).fetchone()
+        return tuple(row) if row else None
+
+    def finish_listing(self, listing):
+        """
+        Forget the frontier of a listing whose crawl is finished, so the next
+        crawl starts from the first page.
+        """
+        with self.lock, self.conn:
+            self.conn.execute('DELETE FROM frontier WHERE Listing = ?', (listing,))
+
+    def unresolved(self):
+        """
+        Return discovered posts whose direct links are not known yet.
+        """
+        return self.select('State = ?', (DISCOVERED,))
+
+    def resolve(self, post):
+        """
+        Store the direct link of a discovered post. An image of an album post
+        is added as a job of its own, unless it was added before.
+        """
+        if not post.get('part'):
+            self.update(post, RESOLVED)
+            return
+
+        now = self.clock()
+        with self.lock, self.conn:
+            self.conn.execute(
+                'INSERT OR IGNORE INTO jobs VALUES(?,?,?,NULL,NULL,?)',
+                (self.key(post), dumps(post), RESOLVED, now)
+            )
+            self.conn.execute(
+                'UPDATE jobs SET State = ?, UpdatedOn = ? WHERE Key = ?',
+                (DONE, now, self.key(post, part=False))
+            )
+
+    def claim(self, post):
+        """
+        Lease a post to this process for downloading.
+        """
+        self.update(post, DOWNLOADING, self.owner, self.clock() + self.lease)
+
+    def release(self, post):
+        """
+        Return a claimed post to the queue, e.g. to retry it later.
+        """
+        self.update(post, RESOLVED)
+
+    def done(self, post):
+        self.update(post, DONE)
+
+    def fail(self, post):
+        self.update(post, FAILED)
+
+    def recover(self):
+        """
+        Return resolved posts, and posts whose lease has expired, claimed by a
+        process which is not running any more. Posts are returned in order of
+        discovery.
+        """
+        now = self.clock()
+        posts = deque()
+        with self.lock:
+            rows = self.conn.execute(
+                'SELECT Post, State, Owner, LeasedUntil FROM jobs '
+                'WHERE State IN (?, ?) ORDER BY rowid',
+                (RESOLVED, DOWNLOADING)
+            ).fetchall()
+        for post, state, owner, leased_until in rows:
+            if (state == RESOLVED or leased_until < now or
+                    (owner != self.owner and not process_exists(owner))):
+                posts.append(loads(post))
+        return posts
+
+    def update(self, post, state, owner=None, leased_until=None):
+        """
+        Store a post in a new state.
+        """
+        with self.lock, self.conn:
+            self.conn.execute(
+                'UPDATE jobs SET Post = ?, State = ?, Owner = ?, LeasedUntil = ?, '
+                'UpdatedOn = ? WHERE Key = ?',
+                (dumps(post), state, owner, leased_until, self.clock(), self.key(post))
+            )
+
+    def select(self, condition, parameters):
+        """
+        Return posts of jobs which match an SQL condition, in order of
+        discovery.
+        """
+        with self.lock:
+            rows = self.conn.execute(
+                'SELECT Post FROM jobs WHERE {} ORDER BY rowid'.format(condition),
+                parameters
+            ).fetchall()
+        return deque(loads(row[0]) for row in rows)
+
+    def stats(self):
+        """
+        Return the number of jobs in each state.
+        """
+        with self.lock:
+            rows = self.conn.execute(
+                'SELECT State, COUNT(*) FROM jobs GROUP BY State'
+            ).fetchall()
+        counts = {state : 0 for state in (DISCOVERED, RESOLVED, DOWNLOADING, DONE, FAILED)}
+        counts.update(rows)
+        return counts
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+
+def dumps(post):
+    """
+    Serialize a post, or a post dictionary, to JSON.
+    """
+    fields = dict(post)
+    fields['image'] = dict(post['image'])
+    return json.dumps(fields)
+
+
+def loads(text):
+    """
+    Deserialize a post from JSON.
+    """
+    fields = json.loads(text)
+    fields['image'] = MediaItem(**fields['image'])
+    return Post(**fields)
+
+
+def process_exists(pid):
+    """
+    Check if a process with the given pid is running.
+    """
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        # the process exists, but belongs to another user
+        return True
+    return True
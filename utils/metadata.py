@@ -0,0 +1,187 @@
+#!/usr/bin/python3
+
+
+"""
+Writes download metadata into db.sqlite of the destination directory. Records
+are inserted in batches, and committed every batch_size records or every
+commit_interval seconds, whichever comes first, so a crash loses little work.
+The database uses write-ahead logging, so it can be read while it is written.
+Example usage:
+
+```python3
+metadata = MetadataWriter('./db.sqlite')
+metadata.write(record)
+metadata.close()
+```
+
+The schema is versioned with PRAGMA user_version. Databases created by older
+versions are migrated in place, and no records are ever dropped.
+"""
+
+
+import sqlite3
+from time import monotonic
+
+
+__author__ = 'petarGitNik'
+__copyright__ = 'Copyright (c) 2017 petarGitNik petargitnik@gmail.com'
+__version__ = 'v0.1.0'
+__license__ = 'MIT'
+__email__ = 'petargitnik@gmail.com'
+__status__ = 'Development'
+
+
+class MetadataWriter(object):
+    """
+    Batched writer of the images table.
+    """
+
+    # Each migration upgrades the schema by one version. Never change one that
+    # was released, append a new one instead.
+    MIGRATIONS = [
+        """
+        CREATE TABLE IF NOT EXISTS images (
+          PostUrl TEXT,
+          ImageUrl TEXT,
+          Filename TEXT,
+          Domain TEXT,
+          PostTitle TEXT,
+          CommentSectionUrl TEXT,
+          PostedOn TEXT,
+          LastHtmlStatusCode INTEGER,
+          Downloaded INTEGER,
+          DownloadDate TEXT
+        );
+        CREATE INDEX IF NOT EXISTS images_image_url ON images (ImageUrl);
+        CREATE INDEX IF NOT EXISTS images_filename ON images (Filename);
+        CREATE INDEX IF NOT EXISTS images_post_url ON images (PostUrl);
+        CREATE INDEX IF NOT EXISTS images_downloaded ON images (Downloaded);
+        """,
+        """
+        ALTER TABLE images ADD COLUMN Sha256 TEXT;
+        ALTER TABLE images ADD COLUMN Size INTEGER;
+        CREATE INDEX IF NOT EXISTS images_sha256 ON images (Sha256);
+        """,
+        """
+        ALTER TABLE images ADD COLUMN ETag TEXT;
+        ALTER TABLE images ADD COLUMN LastModified TEXT;
+        """,
+        """
+        ALTER TABLE images ADD COLUMN Format TEXT;
+        """,
+    ]
+
+    COLUMNS = [
+        'PostUrl', 'ImageUrl', 'Filename', 'Domain', 'PostTitle',
+        'CommentSectionUrl', 'PostedOn', 'LastHtmlStatusCode', 'Downloaded',
+        'DownloadDate', 'Sha256', 'Size', 'ETag', 'LastModified', 'Format',
+    ]
+
+    def __init__(self, path, batch_size=100, commit_interval=5):
+        self.batch_size = batch_size
+        self.commit_interval = commit_interval
+
+        self.conn = sqlite3.connect(path)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA synchronous=NORMAL')
+        self.migrate()
+
+        self.pending = []
+        self.committed_at = monotonic()
+        self.insert = 'INSERT INTO images ({}) VALUES({})'.format(
+            ','.join(self.COLUMNS), ','.join('?' * len(self.COLUMNS))
+        )
+
+    def migrate(self):
+        """
+        Apply migrations which were not applied to this database yet.
+        """
+        version = self.conn.execute('PRAGMA user_version').fetchone()[0]
+        for number, migration in enumerate(self.MIGRATIONS[version:], start=version + 1):
+            self.conn.executescript(migration)
+            self.conn.execute('PRAGMA user_version = {:d}'.format(number))
+            self.conn.commit()
+
+    def write(self, record):
+        """
+        Queue a record, a tuple of values in order of self.COLUMNS. Pending
+        records are written when the batch is full, or when commit_interval
+        seconds passed since the last commit.
+        """
+        self.pending.append(record)
+        if len(self.pending) >= self.batch_size:
+            self.flush()
+        else:
+            self.maybe_flush()
+
+    def maybe_flush(self):
+        """
+        Write pending records if commit_interval seconds passed since the last
+        commit. Call this periodically, so records are committed in time even
+        when no new record arrives.
+        """
+        if self.pending and monotonic() - self.committed_at >= self.commit_interval:
+            self.flush()
+
+    def flush(self):
+        """
+        Insert and commit all pending records.
+        """
+        if self.pending:
+            self.conn.executemany(self.insert, self.pending)
+            del self.pending[:]
+        self.conn.commit()
+        self.committed_at = monotonic()
+
+    def is_downloaded(self, image_url, filename):
+        """
+        Check if the image url, or the filename, was already downloaded. Both
+        columns are indexed, so the lookup does not depend on the number of
+        records.
+        """
+        row = self.conn.execute(
+            """SELECT 1 FROM images
+               WHERE Downloaded = 1 AND (ImageUrl = ? OR Filename = ?)
+               LIMIT 1""",
+            (image_url, filename)
+        ).fetchone()
+        return row is not None
+
+    def find_content(self, digest):
+        """
+        Return the filename of a downloaded file with the given SHA-256 digest,
+        or None. Records which are not written yet are searched as well.
+        """
+        for record in reversed(self.pending):
+            if record[10] == digest and record[8] == 1:
+                return record[2]
+
+        row = self.conn.execute(
+            'SELECT Filename FROM images WHERE Sha256 = ? AND Downloaded = 1 LIMIT 1',
+            (digest,)
+        ).fetchone()
+        return row[0] if row else None
+
+    def find_download(self, image_url):
+        """
+        Return (sha256, size, etag, last_modified) of the latest download of an
+        image url, or None if it was never downloaded.
+        """
+        for record in reversed(self.pending):
+            if record[1] == image_url and record[8] == 1:
+                return tuple(record[10:14])
+
+        row = self.conn.execute(
+            """SELECT Sha256, Size, ETag, LastModified FROM images
+               WHERE ImageUrl = ? AND Downloaded = 1
+               ORDER BY rowid DESC LIMIT 1""",
+            (image_url,)
+        ).fetchone()
+        return tuple(row) if row else None
+
+    def close(self):
+        """
+        Write pending records and close the database.
+        """
+        self.flush()
+        self.conn.close()
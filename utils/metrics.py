@@ -0,0 +1,196 @@
+#!/usr/bin/python3
+
+
+"""
+Metrics of a crawl, per stage (listing, parse, resolve, download) and per
+domain. Reddit and Downloader report measurements to their observers, so a
+Metrics object is registered like any other listener. Example usage:
+
+```python3
+metrics = Metrics()
+reddit.register(metrics)
+downloader.register(metrics)
+downloader.download_stream(reddit.iter_posts())
+
+print(metrics.to_prometheus())
+```
+
+Measurements are Measurement tuples, passed to update() as 'measurement'.
+Counters add up their values, and histograms count values in buckets:
+
+requests_total          requests made
+bytes_total             bytes transferred
+retries_total           downloads queued again
+errors_total            failed requests
+sleep_seconds_total     time spent sleeping for politeness
+latency_seconds         histogram of request and parse durations
+queue_depth             histogram of posts waiting in a stage
+"""
+
+
+import json
+import threading
+from bisect import bisect_left
+from collections import namedtuple
+
+
+__author__ = 'petarGitNik'
+__copyright__ = 'Copyright (c) 2017 petarGitNik petargitnik@gmail.com'
+__version__ = 'v0.1.0'
+__license__ = 'MIT'
+__email__ = 'petargitnik@gmail.com'
+__status__ = 'Development'
+
+
+# Kind is COUNT or OBSERVE. Domain is None for measurements of a whole stage.
+Measurement = namedtuple('Measurement', ['kind', 'name', 'value', 'stage', 'domain'])
+
+COUNT = 'count'
+OBSERVE = 'observe'
+
+
+class Histogram(object):
+    """
+    Counts of observed values in cumulative buckets, with their sum, as in
+    Prometheus. Bounds are the upper bounds of the buckets, the last bucket
+    (+Inf) is implied.
+    """
+
+    def __init__(self, bounds):
+        self.bounds = tuple(bounds)
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.sum = 0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def buckets(self):
+        """
+        Return (upper bound, cumulative count) of every bucket.
+        """
+        cumulative, total = [], 0
+        for bound, count in zip(self.bounds + (float('inf'),), self.counts):
+            total += count
+            cumulative.append((bound, total))
+        return cumulative
+
+
+class Metrics(object):
+    """
+    Thread-safe collection of counters and histograms, keyed by name, stage
+    and domain. It is an observer of Reddit and Downloader, see update().
+    """
+    LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+    DEPTH_BUCKETS = (0, 1, 2, 5, 10, 25, 50, 100, 250, 500, 1000)
+    BUCKETS = {
+        'latency_seconds' : LATENCY_BUCKETS,
+        'queue_depth' : DEPTH_BUCKETS,
+    }
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.counters = {}
+        self.histograms = {}
+
+    def update(self, measurement=None, **kwargs):
+        """
+        Record a measurement. Progress updates of Reddit and Downloader (e.g.
+        fetched, or currently_at) are ignored.
+        """
+        if measurement is None:
+            return
+        if measurement.kind == COUNT:
+            self.count(measurement.name, measurement.value, measurement.stage,
+                       measurement.domain)
+        else:
+            self.observe(measurement.name, measurement.value, measurement.stage,
+                         measurement.domain)
+
+    def count(self, name, value, stage, domain=None):
+        key = (name, stage, domain)
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def observe(self, name, value, stage, domain=None):
+        key = (name, stage, domain)
+        with self.lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = Histogram(
+                    self.BUCKETS.get(name, self.LATENCY_BUCKETS)
+                )
+            histogram.observe(value)
+
+    def as_dict(self):
+        """
+        Return counters and histograms as lists of dictionaries, sorted by
+        name, stage and domain.
+        """
+        with self.lock:
+            counters = [
+                {'name' : name, 'stage' : stage, 'domain' : domain, 'value' : value}
+                for (name, stage, domain), value in sorted(self.counters.items(), key=sort_key)
+            ]
+            histograms = [
+                {'name' : name, 'stage' : stage, 'domain' : domain,
+                 'count' : histogram.count, 'sum' : histogram.sum,
+                 'buckets' : [[bound if bound != float('inf') else '+Inf', count]
+                              for bound, count in histogram.buckets()]}
+                for (name, stage, domain), histogram in sorted(self.histograms.items(), key=sort_key)
+            ]
+        return {'counters' : counters, 'histograms' : histograms}
+
+    def to_json(self):
+        return json.dumps(self.as_dict(), indent=2)
+
+    def to_prometheus(self, prefix='crawlddit_'):
+        """
+        Return metrics in the Prometheus text exposition format.
+        """
+        metrics = self.as_dict()
+        lines = []
+        declared = set()
+
+        def declare(name, kind):
+            if name not in declared:
+                declared.add(name)
+                lines.append('# TYPE {}{} {}'.format(prefix, name, kind))
+
+        for counter in metrics['counters']:
+            declare(counter['name'], 'counter')
+            lines.append('{}{}{{{}}} {}'.format(
+                prefix, counter['name'], labels(counter), counter['value']
+            ))
+
+        for histogram in metrics['histograms']:
+            name = histogram['name']
+            declare(name, 'histogram')
+            for bound, count in histogram['buckets']:
+                lines.append('{}{}_bucket{{{},le="{}"}} {}'.format(
+                    prefix, name, labels(histogram), bound, count
+                ))
+            lines.append('{}{}_sum{{{}}} {}'.format(prefix, name, labels(histogram), histogram['sum']))
+            lines.append('{}{}_count{{{}}} {}'.format(prefix, name, labels(histogram), histogram['count']))
+
+        return '\n'.join(lines) + '\n'
+
+
+def sort_key(item):
+    """
+    Sort metrics by name, stage and domain, with whole stages first.
+    """
+    name, stage, domain = item[0]
+    return (name, stage, domain or '')
+
+
+def labels(metric):
+    """
+    Return Prometheus labels of a metric.
+    """
+    pairs = [('stage', metric['stage'])]
+    if metric['domain'] is not None:
+        pairs.append(('domain', metric['domain']))
+    return ','.join('{}="{}"'.format(name, value) for name, value in pairs)
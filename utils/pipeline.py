@@ -0,0 +1,104 @@
+#!/usr/bin/python3
+
+
+"""
+Connects a producer of posts (e.g. Reddit.iter_posts()) with the Downloader.
+Posts are produced in a separate thread and handed over through a bounded
+queue. When the queue is full, the producer waits, so crawling never runs far
+ahead of downloading. Example usage:
+
+```python3
+feed = PostFeed(reddit.iter_posts(), maxsize=100)
+feed.start()
+
+post = feed.get(timeout=0.5)
+```
+"""
+
+
+import threading
+from queue import Queue
+from queue import Empty
+from queue import Full
+
+
+__author__ = 'petarGitNik'
+__copyright__ = 'Copyright (c) 2017 petarGitNik petargitnik@gmail.com'
+__version__ = 'v0.1.0'
+__license__ = 'MIT'
+__email__ = 'petargitnik@gmail.com'
+__status__ = 'Development'
+
+
+class PostFeed(threading.Thread):
+    """
+    Thread which moves posts from an iterable into a bounded queue. If variable
+    self.running is set to False, producing is stopped. An exception raised by
+    the iterable ends the feed, and is kept in self.error.
+    """
+
+    # Marks the end of the feed in the queue
+    END = object()
+
+    # Seconds to wait for free space in the queue before checking self.running
+    PUT_INTERVAL = 0.5
+
+    def __init__(self, posts, maxsize=100):
+        super().__init__(daemon=True)
+        self.posts = posts
+        self.queue = Queue(maxsize=maxsize)
+        self.running = True
+        self.exhausted = False
+        self.error = None
+
+    def run(self):
+        """
+        Produce posts until the iterable is exhausted, or the feed is stopped.
+        """
+        try:
+            for post in self.posts:
+                if not self.put(post):
+                    break
+        except Exception as e:
+            self.error = e
+        finally:
+            close = getattr(self.posts, 'close', None)
+            if close: close()
+            self.put(self.END)
+
+    def put(self, item):
+        """
+        Wait for free space in the queue, and put an item in it. Return False
+        if the feed was stopped in the meantime.
+        """
+        while self.running:
+            try:
+                self.queue.put(item, timeout=self.PUT_INTERVAL)
+                return True
+            except Full:
+                continue
+        return False
+
+    def get(self, timeout=0):
+        """
+        Return the next post. Return None if no post arrived within timeout
+        seconds, or if the feed is exhausted.
+        """
+        if self.exhausted:
+            return None
+
+        try:
+            item = self.queue.get(block=timeout > 0, timeout=timeout or None)
+        except Empty:
+            return None
+
+        if item is self.END:
+            self.exhausted = True
+            return None
+        return item
+
+    def stop(self):
+        """
+        Stop producing posts.
+        """
+        self.running = False
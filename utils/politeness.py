@@ -1,8 +1,14 @@
 #!/usr/bin/python3
 
 
+import threading
 from math import log
 from math import exp
+from collections import Counter
+from collections import deque
+from itertools import count
+from time import monotonic
+from time import sleep
 from domainparsers.common import Domains
 
 
@@ -32,3 +38,162 @@ def get_politeness_factor(domain):
     if domain_size <= 5: domain_size = 5
     minimal_crawl_time = min(exp(2.52166863221 + -0.530185027289 * log(domain_size)), 5)
     return minimal_crawl_time
+
+
+class TokenBucket(object):
+    """
+    Rate budget of a single host. Tokens are added at 'rate' tokens per second,
+    up to 'capacity' tokens. Every request to the host takes one token.
+    """
+
+    def __init__(self, rate, capacity, now):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = now
+
+    def refill(self, now):
+        """
+        Add tokens earned since the last refill.
+        """
+        elapsed = max(0, now - self.updated)
+        self.tokens = min(self.capacity, self.tokens + elapsed * self.rate)
+        self.updated = now
+
+    def wait_time(self, now):
+        """
+        Return the number of seconds until a token is available.
+        """
+        self.refill(now)
+        if self.tokens >= 1:
+            return 0
+        return (1 - self.tokens) / self.rate
+
+    def take(self, now):
+        """
+        Take a token if one is available. Return True on success.
+        """
+        self.refill(now)
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return True
+        return False
+
+
+class DomainBudgets(object):
+    """
+    Keeps one token bucket per host. The rate of a host is seeded from the
+    politeness factor of its domain, so by default one request is allowed per
+    politeness period. Budgets are thread-safe, and can be shared by several
+    schedulers to enforce a global per-host limit.
+    """
+
+    def __init__(self, burst=1, clock=monotonic):
+        self.burst = burst
+        self.clock = clock
+        self.buckets = {}
+        self.lock = threading.Lock()
+
+    def bucket(self, host):
+        """
+        Return the bucket of a host, and create it if it does not exist.
+        """
+        if host not in self.buckets:
+            rate = 1 / get_politeness_factor(known_domain(host))
+            self.buckets[host] = TokenBucket(rate, self.burst, self.clock())
+        return self.buckets[host]
+
+    def try_acquire(self, host):
+        """
+        Take a token from host's bucket without waiting. Return True on success.
+        """
+        with self.lock:
+            return self.bucket(host).take(self.clock())
+
+    def wait_time(self, host):
+        """
+        Return the number of seconds until host has spare budget.
+        """
+        with self.lock:
+            return self.bucket(host).wait_time(self.clock())
+
+    def acquire(self, host):
+        """
+        Wait until host has spare budget, and take a token from it.
+        """
+        while not self.try_acquire(host):
+            sleep(self.wait_time(host))
+
+
+class PolitenessScheduler(object):
+    """
+    Queue of jobs grouped by host. next_job() hands out the oldest queued job
+    among the hosts which have spare budget and a free download slot, so jobs
+    for a host which has to wait never hold up jobs for other hosts. This class
+    is not thread-safe, only its budgets are.
+    """
+
+    def __init__(self, budgets=None, domain_limit=1):
+        self.budgets = budgets if budgets is not None else DomainBudgets()
+        self.domain_limit = domain_limit
+        self.queues = {}
+        self.active = Counter()
+        self.sequence = count()
+
+    def put(self, job, host):
+        """
+        Queue a job for a host.
+        """
+        self.queues.setdefault(host, deque()).append((next(self.sequence), job))
+
+    def next_job(self):
+        """
+        Remove and return the oldest job whose host is ready, together with its
+        host. Return None if no host is ready.
+        """
+        candidates = sorted(
+            (queue[0][0], host) for host, queue in self.queues.items()
+            if self.active[host] < self.domain_limit
+        )
+        for _, host in candidates:
+            if self.budgets.try_acquire(host):
+                queue = self.queues[host]
+                _, job = queue.popleft()
+                if not queue:
+                    del self.queues[host]
+                self.active[host] += 1
+                return (job, host)
+        return None
+
+    def done(self, host):
+        """
+        Release the download slot taken by a job of a host.
+        """
+        self.active[host] -= 1
+        if self.active[host] <= 0:
+            del self.active[host]
+
+    def wait_time(self):
+        """
+        Return the number of seconds until the next queued job is ready. Return
+        None if every host with queued jobs is waiting for a free slot, or if
+        there are no queued jobs.
+        """
+        waiting = [
+            self.budgets.wait_time(host) for host in self.queues
+            if self.active[host] < self.domain_limit
+        ]
+        return min(waiting) if waiting else None
+
+    def __len__(self):
+        return sum(len(queue) for queue in self.queues.values())
+
+
+def known_domain(url):
+    """
+    Return the known domain a url (or a host name) belongs to, or None.
+    """
+    for domain in Domains.domains():
+        if domain in url:
+            return domain
+    return None
@@ -0,0 +1,205 @@
+#!/usr/bin/python3
+
+
+"""
+Profiles a run per stage, so CPU time and memory can be attributed to the
+right subsystem. Every thread which works on a stage is profiled separately
+with cProfile, and profiles of a stage are merged when they are written.
+Example usage:
+
+```python3
+profiler = StageProfiler('~/memes', memory=True)
+reddit = Reddit(url, pages, profiler=profiler)
+profiler.run('crawl', reddit.get_all_posts)
+
+downloader = Downloader(reddit, '~/memes', profiler=profiler)
+profiler.run('download', downloader.download_files)
+profiler.write()
+```
+
+Stages are 'crawl' (fetching and parsing listing pages), 'resolve' (fetching
+pages on allowed domains, in Resolver threads) and 'download' (the dispatcher
+and download threads). For each stage, profile-<stage>.prof is written to the
+destination directory, and can be read with pstats or snakeviz. A summary of
+the top functions of every stage is written to profile-summary.txt.
+
+If memory is True, tracemalloc records allocations. Memory is attributed to
+the stages run by run(), as the growth between the start and the end of the
+stage. Resolution runs in the background of the crawl, so its allocations are
+part of the crawl.
+
+Since Python 3.12 cProfile is built on sys.monitoring, which allows a single
+profiler in the process, and it profiles every thread. There a single profile
+is enabled at a time, and a stage which starts while another stage is being
+profiled (e.g. resolution during the crawl) is counted as a part of it.
+"""
+
+
+import cProfile
+import io
+import os
+import pstats
+import sys
+import threading
+import tracemalloc
+from collections import defaultdict
+from contextlib import contextmanager
+from functools import wraps
+
+
+__author__ = 'petarGitNik'
+__copyright__ = 'Copyright (c) 2017 petarGitNik petargitnik@gmail.com'
+__version__ = 'v0.1.0'
+__license__ = 'MIT'
+__email__ = 'petargitnik@gmail.com'
+__status__ = 'Development'
+
+
+# Profiles are enabled per thread, and may be active in several threads at once
+PER_THREAD = sys.version_info < (3, 12)
+
+
+class StageProfiler(object):
+    """
+    Collects cProfile profiles, and optionally tracemalloc statistics, per
+    stage. It can be shared between threads. Top is the number of functions,
+    and of allocation sites, listed in the summary.
+    """
+
+    def __init__(self, destination, memory=False, top=20):
+        self.destination = destination
+        self.memory = memory
+        self.top = top
+
+        self.lock = threading.Lock()
+        self.profiles = defaultdict(list)
+        self.allocations = {}
+        # profile of the whole process, if profiles are not per thread
+        self.active = None
+
+    @contextmanager
+    def stage(self, name):
+        """
+        Profile the calling thread while it works on a stage.
+        """
+        if not PER_THREAD:
+            with self.process_stage(name):
+                yield
+            return
+
+        profile = cProfile.Profile()
+        profile.enable()
+        try:
+            yield
+        finally:
+            profile.disable()
+            with self.lock:
+                self.profiles[name].append(profile)
+
+    @contextmanager
+    def process_stage(self, name):
+        """
+        Profile the whole process while it works on a stage, unless another
+        stage is being profiled already.
+        """
+        with self.lock:
+            owner = self.active is None
+            if owner:
+                self.active = cProfile.Profile()
+                self.active.enable()
+            profile = self.active
+        try:
+            yield
+        finally:
+            if owner:
+                profile.disable()
+                with self.lock:
+                    self.active = None
+                    self.profiles[name].append(profile)
+
+    def wrap(self, name, function):
+        """
+        Return function, profiled as a part of a stage in whichever thread it
+        is called, e.g. in a thread pool.
+        """
+        @wraps(function)
+        def profiled(*args, **kwargs):
+            with self.stage(name):
+                return function(*args, **kwargs)
+        return profiled
+
+    def run(self, name, function, *args, **kwargs):
+        """
+        Call function as a stage, and return its result. If memory is
+        profiled, allocations which remain at the end of the stage are
+        recorded.
+        """
+        if not self.memory:
+            with self.stage(name):
+                return function(*args, **kwargs)
+
+        started = not tracemalloc.is_tracing()
+        if started: tracemalloc.start()
+        before = tracemalloc.take_snapshot()
+        try:
+            with self.stage(name):
+                return function(*args, **kwargs)
+        finally:
+            after = tracemalloc.take_snapshot()
+            peak = tracemalloc.get_traced_memory()[1]
+            if started: tracemalloc.stop()
+            with self.lock:
+                self.allocations[name] = (after.compare_to(before, 'lineno'), peak)
+
+    def stats(self, name):
+        """
+        Return merged pstats.Stats of all threads of a stage.
+        """
+        with self.lock:
+            profiles = list(self.profiles[name])
+        stats = pstats.Stats(profiles[0], stream=io.StringIO())
+        for profile in profiles[1:]:
+            stats.add(profile)
+        return stats
+
+    def write(self):
+        """
+        Write profiles of all stages, and the summary, to the destination
+        directory. Return the path of the summary.
+        """
+        with self.lock:
+            names = sorted(self.profiles)
+
+        summary = []
+        for name in names:
+            stats = self.stats(name)
+            stats.dump_stats(os.path.join(self.destination, 'profile-{}.prof'.format(name)))
+            summary.append(self.cpu_summary(name, stats))
+            if name in self.allocations:
+                summary.append(self.memory_summary(name, *self.allocations[name]))
+
+        path = os.path.join(self.destination, 'profile-summary.txt')
+        with open(path, 'w') as f:
+            f.write('\n'.join(summary))
+        return path
+
+    def cpu_summary(self, name, stats):
+        """
+        Return the top functions of a stage by cumulative time.
+        """
+        stream = io.StringIO()
+        stats.stream = stream
+        stats.sort_stats('cumulative').print_stats(self.top)
+        threads = len(self.profiles[name])
+        return '== {}: {} thread run(s), {:.3f} s of CPU and waiting ==\n{}'.format(
+            name, threads, stats.total_tt, stream.getvalue().strip('\n')
+        )
+
+    def memory_summary(self, name, differences, peak):
+        """
+        Return the allocation sites of a stage which grew the most.
+        """
+        lines = ['== {}: memory, peak {:.1f} MiB =='.format(name, peak / 2**20)]
+        for difference in differences[:self.top]:
+            lines.append(str(difference))
+        return '\n'.join(lines) + '\n'